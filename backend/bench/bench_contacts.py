@@ -0,0 +1,73 @@
+"""
+Бенчмарк utils.contacts: прежний способ (json.dumps всего элемента +
+PhoneNumberMatcher и почтовый regex по всему тексту) против одного
+обхода с предфильтром (extract_contacts).
+
+Запуск из backend/:
+    python -m bench.bench_contacts                       # bench/fixtures/usersbox_search.json
+    python -m bench.bench_contacts ответ.json … --repeat 50
+
+Файлы — сохранённые ответы Usersbox /v1/search ({"status", "data": {"items"}})
+или списки таких ответов. Элементы разворачиваются так же, как в
+parser.userboxParser, — каждый элемент data.items и есть payload.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, List, Set, Tuple
+
+from parser.userboxParser import UsersboxParser
+from utils.contacts import EMAIL_RE, MAX_PHONES, _phones_in, extract_contacts
+
+FIXTURE = Path(__file__).parent / "fixtures" / "usersbox_search.json"
+
+
+def _legacy(payload: Any) -> Tuple[List[str], List[str]]:
+    blob = json.dumps(payload, ensure_ascii=False)
+    phones: Set[str] = set()
+    for ph in _phones_in(blob, "RU"):
+        phones.add(ph)
+        if len(phones) >= MAX_PHONES:
+            break
+    return sorted(phones), sorted({m.group(0).lower() for m in EMAIL_RE.finditer(blob)})
+
+
+def _load(paths: List[Path]) -> List[Any]:
+    responses = []
+    for path in paths:
+        doc = json.loads(path.read_text(encoding="utf-8"))
+        responses += doc if isinstance(doc, list) else [doc]
+    return [info.payload for info in UsersboxParser().parse(responses)]
+
+
+def _timed(fn, payloads: List[Any], repeat: int) -> Tuple[float, list]:
+    t = time.perf_counter()
+    for _ in range(repeat):
+        out = [fn(p) for p in payloads]
+    return time.perf_counter() - t, out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Бенчмарк извлечения контактов из ответов Usersbox")
+    ap.add_argument("files", nargs="*", type=Path, default=[FIXTURE])
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    payloads = _load(args.files)
+    size = sum(len(json.dumps(p, ensure_ascii=False)) for p in payloads)
+    print(f"payloads: {len(payloads)}, json size: {size:,} chars, repeat: {args.repeat}")
+
+    t_old, old = _timed(_legacy, payloads, args.repeat)
+    t_new, new = _timed(extract_contacts, payloads, args.repeat)
+
+    same = sum(o == n for o, n in zip(old, new))
+    print(f"legacy      {t_old * 1000:8.0f} ms")
+    print(f"single-pass {t_new * 1000:8.0f} ms   x{t_old / t_new:.1f}")
+    print(f"identical results: {same}/{len(payloads)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Бенчмарк utils.rowpack: размер и скорость упаковки строк результата
+(SellerOut) против JSON, в котором они хранились раньше.
+
+Запуск из backend/:
+    python -m bench.bench_rowpack [--rows 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from utils.rowpack import pack_rows, unpack_rows
+
+
+def _rows(n: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "seller_id": 100000 + i,
+            "store_name": f"Магазин {i}",
+            "inn": f"77{i:010d}",
+            "url": f"https://www.wildberries.ru/seller/{100000 + i}",
+            "saleCount": i * 7 % 50000,
+            "reg_date": datetime(2023, 1 + i % 12, 1 + i % 28),
+            "tax_office": "Инспекция ФНС России № 46 по г. Москве",
+            "director": None,
+            "ogrn": f"1{i:012d}" if i % 2 else None,
+            "ogrnip": None if i % 2 else f"3{i:014d}",
+            "phone": [f"+7999{i:07d}"],
+            "email": [f"shop{i}@example.com"] if i % 3 else [],
+            "categories": "Платья, Юбки" if i % 5 else "Платья",
+        }
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Бенчмарк упаковки строк результата")
+    ap.add_argument("--rows", type=int, default=20_000)
+    args = ap.parse_args()
+
+    rows = _rows(args.rows)
+    js = json.dumps(rows, ensure_ascii=False, default=str).encode()
+    t = time.perf_counter()
+    blob = pack_rows(rows)
+    t_pack = time.perf_counter() - t
+    t = time.perf_counter()
+    back = unpack_rows(blob)
+    t_unpack = time.perf_counter() - t
+    assert len(back) == len(rows) and back[5]["inn"] == rows[5]["inn"]
+    print(f"json {len(js):>10,} B")
+    print(f"pack {len(blob):>10,} B  ({len(blob) / len(js):.1%})  pack {t_pack * 1000:.0f} ms, unpack {t_unpack * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
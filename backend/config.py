@@ -3,7 +3,7 @@ from pydantic import Field, field_validator
 from datetime import timedelta
 import os
 from dotenv import load_dotenv
-from typing import Union, List
+from typing import Dict, Union, List
 
 load_dotenv()
 
@@ -32,6 +32,21 @@ class Settings(BaseSettings):
     PROXY_KEY: str
     USERBOX_KEY: str
 
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+
+    SEARCH_STATS_TTL: int = 300
+
+    # очередь фоновых задач (services.job_queue, worker.py)
+    JOB_VISIBILITY_TIMEOUT: int = 300
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_DELAY: int = 30
+    JOB_KIND_LIMITS: Dict[str, int] = {"parse": 2, "cat_parse": 4, "refresh_sale_counts": 1}
+    WORKER_CONCURRENCY: int = 2
+    JOB_RESULT_CHUNK: int = 500
+    JOB_RESULT_TTL: int = 86400
+
     CORS_ORIGINS: Union[List[str], str] = Field(default="")
 
     @field_validator("CORS_ORIGINS", mode="after")
@@ -45,6 +60,10 @@ class Settings(BaseSettings):
     def DATABASE_URL(self):
         return f"postgresql+psycopg2://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def ASYNC_DATABASE_URL(self):
+        return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
     class Config:
         env_file = ".env"
 
@@ -1,26 +1,41 @@
-from typing import Generator
-from fastapi import Depends, HTTPException, status
+from typing import AsyncGenerator
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from config import settings
-from database import SessionLocal
+from database import AsyncSessionLocal
 from models.user import User as UserModel
 from schemas.auth import UserRead
+from parser.client_registry import HttpClientRegistry
+from services.job_queue import JobQueue
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+def get_http(request: Request) -> HttpClientRegistry:
+    """Общие HTTP-клиенты приложения (см. main.on_startup)."""
+    return request.app.state.http
+
+def get_redis(request: Request):
+    return request.app.state.redis
+
+def get_redis_bin(request: Request):
+    """Redis без decode_responses — для бинарных значений (результаты задач)."""
+    return request.app.state.redis_bin
+
+def get_job_queue(request: Request) -> JobQueue:
+    """Очередь фоновых задач (выполняет worker.py)."""
+    return request.app.state.jobs
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> UserRead:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -34,7 +49,7 @@ async def get_current_user(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(UserModel).filter(UserModel.username == username).first()
+    user = await db.scalar(select(UserModel).where(UserModel.username == username))
     if not user:
         raise credentials_exception
     return UserRead(username=user.username)
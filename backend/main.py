@@ -1,9 +1,15 @@
 from fastapi import FastAPI
 from config import settings
 from middleware import register_middleware
-from routers import wb, auth, search, userbox, parse_bg, parse_data
+from routers import wb, auth, search, userbox, parse_bg, parse_data, proxy, categories
 import os
 import redis.asyncio as aioredis
+from parser.client_registry import HttpClientRegistry
+from parser.cpu_pool import parse_pool
+from proxy.scheduler import scheduler
+from database import async_engine
+from services.job_queue import JobQueue
+from utils.category_index import category_index
 
 
 app = FastAPI(
@@ -20,10 +26,20 @@ async def on_startup():
         os.getenv("REDIS_URL", "redis://localhost:6379/0"),
         decode_responses=True
     )
+   # бинарные значения (упакованные результаты задач, services.job_progress)
+   app.state.redis_bin = aioredis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+   app.state.jobs = JobQueue(app.state.redis)
+   app.state.http = await HttpClientRegistry().start()
+   await scheduler.refresh()
+   category_index.load()
 
 @app.on_event("shutdown")
 async def on_shutdown():
+    await app.state.http.close()
+    parse_pool.shutdown()
     await app.state.redis.close()
+    await app.state.redis_bin.close()
+    await async_engine.dispose()
 
 register_middleware(app)
 
@@ -33,4 +49,6 @@ app.include_router(wb.router, prefix="/wb", tags=["wb"])
 app.include_router(search.router, prefix="/search", tags=['search'])
 app.include_router(userbox.router, prefix = "/usersbox", tags = ["usersbox"])
 app.include_router(parse_bg.router, prefix = "/parse", tags = ["jobs"])
-app.include_router(parse_data.router, prefix = "/parse-data", tags = ["parse-data"])
\ No newline at end of file
+app.include_router(parse_data.router, prefix = "/parse-data", tags = ["parse-data"])
+app.include_router(proxy.router, prefix = "/proxy", tags = ["proxy"])
+app.include_router(categories.router, prefix = "/categories", tags = ["categories"])
\ No newline at end of file
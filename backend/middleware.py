@@ -4,6 +4,7 @@ from fastapi import Request, FastAPI
 from fastapi.responses import JSONResponse, FileResponse
 from uvicorn.logging import AccessFormatter
 from config import settings
+from utils.streaming import STREAMED_HEADER
 import json
 from fastapi.middleware.cors import CORSMiddleware
 import logging
@@ -28,6 +29,8 @@ def register_middleware(app: FastAPI):
         response = await call_next(request)
         if request.url.path.startswith(("/docs", "/openapi", "/redoc", "/auth/token", "/parse", "/wb")): # Эндпоинты, которые игнорируются
             return response
+        if STREAMED_HEADER in response.headers:   # стрим уже в обёртке, не буферизуем
+            return response
         duration_ms = int((time.time() - start) * 1000)
         if response.headers.get("content-type", "").startswith("application/json"):
             body = b""
@@ -0,0 +1,38 @@
+"""supplier_info: кэш реквизитов supplier-by-id
+
+Revision ID: 0001_supplier_info
+Revises:
+Create Date: 2026-10-17 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_supplier_info"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "supplier_info",
+        sa.Column("supplier_id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("inn", sa.String(12), nullable=False),
+        sa.Column("ogrn", sa.String(13), nullable=True),
+        sa.Column("ogrnip", sa.String(15), nullable=True),
+        sa.Column("trademark", sa.String(), nullable=True),
+        sa.Column("fetched_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_supplier_info_fetched_at", "supplier_info", ["fetched_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_supplier_info_fetched_at", table_name="supplier_info")
+    op.drop_table("supplier_info")
@@ -0,0 +1,39 @@
+"""sellers.supplier_id: уникальный индекс для INSERT … ON CONFLICT
+
+Revision ID: 0002_sellers_supplier_unique
+Revises: 0001_supplier_info
+Create Date: 2026-10-17 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_sellers_supplier_unique"
+down_revision: Union[str, None] = "0001_supplier_info"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # merge() по pk вставлял дубликаты — оставляем самую свежую запись
+    op.execute(
+        """
+        DELETE FROM sellers a
+        USING sellers b
+        WHERE a.supplier_id = b.supplier_id
+          AND a.id < b.id
+        """
+    )
+    op.drop_index("ix_sellers_supplier_id", table_name="sellers", if_exists=True)
+    op.create_index("ix_sellers_supplier_id", "sellers", ["supplier_id"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_sellers_supplier_id", table_name="sellers")
+    op.create_index("ix_sellers_supplier_id", "sellers", ["supplier_id"])
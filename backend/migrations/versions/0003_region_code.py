@@ -0,0 +1,45 @@
+"""sellers / seller_contacts_cache: материализованный region_code + индекс
+
+Revision ID: 0003_region_code
+Revises: 0002_sellers_supplier_unique
+Create Date: 2026-10-18 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_region_code"
+down_revision: Union[str, None] = "0002_sellers_supplier_unique"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_TABLES = ("sellers", "seller_contacts_cache")
+
+# те же правила, что utils.wb_utils.region_code
+_BACKFILL = """
+    UPDATE {table} SET region_code = CASE
+        WHEN length(ogrn) >= 5   THEN substr(ogrn, 4, 2)
+        WHEN length(ogrnip) >= 5 THEN substr(ogrnip, 4, 2)
+        WHEN length(inn) >= 2    THEN substr(inn, 1, 2)
+    END
+    WHERE region_code IS NULL
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in _TABLES:
+        op.add_column(table, sa.Column("region_code", sa.String(length=2), nullable=True))
+        op.execute(_BACKFILL.format(table=table))
+        op.create_index(f"ix_{table}_region_code", table, ["region_code"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in _TABLES:
+        op.drop_index(f"ix_{table}_region_code", table_name=table)
+        op.drop_column(table, "region_code")
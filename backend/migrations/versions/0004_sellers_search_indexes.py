@@ -0,0 +1,56 @@
+"""sellers: pg_trgm GIN по названию и префиксные индексы для автодополнения
+
+Revision ID: 0004_sellers_search_indexes
+Revises: 0003_region_code
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_sellers_search_indexes"
+down_revision: Union[str, None] = "0003_region_code"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_PREFIX = ("inn", "ogrn", "ogrnip")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY — таблица большая, запись во время сборки не блокируем
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_sellers_store_name_trgm", "sellers", ["store_name"],
+            postgresql_using="gin",
+            postgresql_ops={"store_name": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_sellers_store_name_lower_prefix", "sellers",
+            [sa.text("lower(store_name) text_pattern_ops")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        for col in _PREFIX:
+            op.create_index(
+                f"ix_sellers_{col}_prefix", "sellers", [col],
+                postgresql_ops={col: "varchar_pattern_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for col in _PREFIX:
+            op.drop_index(f"ix_sellers_{col}_prefix", table_name="sellers", postgresql_concurrently=True)
+        op.drop_index("ix_sellers_store_name_lower_prefix", table_name="sellers", postgresql_concurrently=True)
+        op.drop_index("ix_sellers_store_name_trgm", table_name="sellers", postgresql_concurrently=True)
@@ -0,0 +1,36 @@
+"""sellers: составные индексы под фильтры поиска
+
+Revision ID: 0005_sellers_filter_indexes
+Revises: 0004_sellers_search_indexes
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_sellers_filter_indexes"
+down_revision: Union[str, None] = "0004_sellers_search_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_INDEXES = {
+    "ix_sellers_sale_count_reg_date": ["sale_count", "reg_date"],
+    "ix_sellers_categories_created_at": ["categories", "created_at"],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, cols in _INDEXES.items():
+            op.create_index(name, "sellers", cols, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name in _INDEXES:
+            op.drop_index(name, table_name="sellers", postgresql_concurrently=True)
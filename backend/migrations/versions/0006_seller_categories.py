@@ -0,0 +1,39 @@
+"""seller_categories: справочник категорий вместо DISTINCT по sellers
+
+Revision ID: 0006_seller_categories
+Revises: 0005_sellers_filter_indexes
+Create Date: 2026-10-18 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_seller_categories"
+down_revision: Union[str, None] = "0005_sellers_filter_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "seller_categories",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("first_seen_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.execute(
+        """
+        INSERT INTO seller_categories (name)
+        SELECT DISTINCT categories FROM sellers
+        WHERE categories IS NOT NULL AND categories <> ''
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("seller_categories")
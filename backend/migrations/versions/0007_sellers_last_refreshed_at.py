@@ -0,0 +1,38 @@
+"""sellers.last_refreshed_at для инкрементального обновления sale_count
+
+Revision ID: 0007_sellers_last_refreshed_at
+Revises: 0006_seller_categories
+Create Date: 2026-10-18 18:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_sellers_last_refreshed_at"
+down_revision: Union[str, None] = "0006_seller_categories"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("sellers", sa.Column("last_refreshed_at", sa.DateTime(timezone=True), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_sellers_last_refreshed_at",
+            "sellers",
+            [sa.text("last_refreshed_at NULLS FIRST"), "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_sellers_last_refreshed_at", table_name="sellers", postgresql_concurrently=True)
+    op.drop_column("sellers", "last_refreshed_at")
@@ -0,0 +1,135 @@
+"""parse_data: row_count и компактный payload вместо JSON data
+
+Revision ID: 0008_parse_data_payload
+Revises: 0007_sellers_last_refreshed_at
+Create Date: 2026-10-18 20:00:00
+
+"""
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, Dict, List, Sequence, Union
+
+from alembic import context, op
+import msgpack
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_parse_data_payload"
+down_revision: Union[str, None] = "0007_sellers_last_refreshed_at"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BATCH = 100
+
+
+# ───────── формат payload, версия 1 ─────────────────────────────
+# Замороженная копия utils.rowpack на момент этой ревизии: миграция
+# должна писать и читать ровно этот формат, как бы ни менялся модуль.
+_VERSION = 1
+_LEVEL = 6
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return str(obj)
+
+
+def _pack_rows(rows: List[Dict[str, Any]]) -> bytes:
+    columns: Dict[str, None] = {}
+    for r in rows:
+        for k in r:
+            if k not in columns:
+                columns[k] = None
+    names = list(columns)
+    data = [[r.get(k) for r in rows] for k in names]
+    raw = msgpack.packb([_VERSION, names, len(rows), *data], default=_default, use_bin_type=True)
+    return zlib.compress(raw, _LEVEL)
+
+
+def _unpack_rows(blob: bytes) -> List[Dict[str, Any]]:
+    if not blob:
+        return []
+    version, names, n, *data = msgpack.unpackb(zlib.decompress(blob), raw=False)
+    if version != _VERSION:
+        raise ValueError(f"unsupported rowpack version {version}")
+    if not names:
+        return [{} for _ in range(n)]
+    return [dict(zip(names, values)) for values in zip(*data)]
+
+
+def _repack_existing() -> None:
+    """JSON data → payload пачками; в offline-режиме (--sql) пропускаем."""
+    if context.is_offline_mode():
+        return
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text(
+                "SELECT id, data FROM parse_data "
+                "WHERE id > :last AND payload IS NULL AND data IS NOT NULL "
+                "ORDER BY id LIMIT :n"
+            ),
+            {"last": last_id, "n": _BATCH},
+        ).all()
+        if not rows:
+            return
+        for row_id, data in rows:
+            if isinstance(data, str):
+                data = json.loads(data)
+            conn.execute(
+                sa.text("UPDATE parse_data SET payload = :p, data = NULL WHERE id = :id"),
+                {"p": _pack_rows(data or []), "id": row_id},
+            )
+        last_id = rows[-1][0]
+
+
+def _unpack_existing() -> None:
+    """payload → JSON data пачками (обратно к _repack_existing)."""
+    if context.is_offline_mode():
+        # в --sql развернуть payload нельзя: записи без data не дадут
+        # вернуть NOT NULL, и скрипт упадёт — а не потеряет данные молча
+        return
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text(
+                "SELECT id, payload FROM parse_data "
+                "WHERE id > :last AND payload IS NOT NULL AND data IS NULL "
+                "ORDER BY id LIMIT :n"
+            ),
+            {"last": last_id, "n": _BATCH},
+        ).all()
+        if not rows:
+            return
+        for row_id, payload in rows:
+            conn.execute(
+                sa.text("UPDATE parse_data SET data = CAST(:d AS json) WHERE id = :id"),
+                {"d": json.dumps(_unpack_rows(bytes(payload)), ensure_ascii=False, default=str), "id": row_id},
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("parse_data", sa.Column("row_count", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("parse_data", sa.Column("payload", sa.LargeBinary(), nullable=True))
+    # payload уже сжат — pglz в TOAST его не уменьшит, только потратит CPU
+    op.execute("ALTER TABLE parse_data ALTER COLUMN payload SET STORAGE EXTERNAL")
+    op.alter_column("parse_data", "data", existing_type=sa.JSON(), nullable=True)
+    op.execute("UPDATE parse_data SET row_count = json_array_length(data) WHERE data IS NOT NULL")
+    _repack_existing()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _unpack_existing()
+    # пустых записей (ни data, ни payload) быть не должно, но NOT NULL вернуть надо
+    op.execute("UPDATE parse_data SET data = '[]'::json WHERE data IS NULL AND payload IS NULL")
+    op.alter_column("parse_data", "data", existing_type=sa.JSON(), nullable=False)
+    op.drop_column("parse_data", "payload")
+    op.drop_column("parse_data", "row_count")
@@ -0,0 +1,40 @@
+"""company_info: кэш карточек rusprofile (в т.ч. «не найдено»)
+
+Revision ID: 0009_company_info
+Revises: 0008_parse_data_payload
+Create Date: 2026-10-18 22:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009_company_info"
+down_revision: Union[str, None] = "0008_parse_data_payload"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "company_info",
+        sa.Column("query", sa.String(15), primary_key=True),
+        sa.Column("found", sa.Boolean(), nullable=False),
+        sa.Column("inn", sa.String(12), nullable=True),
+        sa.Column("ogrn", sa.String(13), nullable=True),
+        sa.Column("ogrnip", sa.String(15), nullable=True),
+        sa.Column("tax_office", sa.String(), nullable=True),
+        sa.Column("director", sa.String(), nullable=True),
+        sa.Column("fetched_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_company_info_fetched_at", "company_info", ["fetched_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_company_info_fetched_at", table_name="company_info")
+    op.drop_table("company_info")
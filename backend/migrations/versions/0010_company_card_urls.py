@@ -0,0 +1,33 @@
+"""company_card_urls: ОГРН/ОГРНИП/ИНН → адрес карточки rusprofile
+
+Revision ID: 0010_company_card_urls
+Revises: 0009_company_info
+Create Date: 2026-10-18 23:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010_company_card_urls"
+down_revision: Union[str, None] = "0009_company_info"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "company_card_urls",
+        sa.Column("query", sa.String(15), primary_key=True),
+        sa.Column("card_url", sa.String(), nullable=False),
+        sa.Column("learned_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("company_card_urls")
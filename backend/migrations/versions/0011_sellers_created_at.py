@@ -0,0 +1,34 @@
+"""sellers: индекс по created_at под фильтр «добавлен в базу» без категории
+
+Revision ID: 0011_sellers_created_at
+Revises: 0010_company_card_urls
+Create Date: 2026-10-19 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011_sellers_created_at"
+down_revision: Union[str, None] = "0010_company_card_urls"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # (categories, created_at) диапазон только по created_at не обслуживает
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_sellers_created_at", "sellers", ["created_at"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_sellers_created_at", table_name="sellers", postgresql_concurrently=True)
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Boolean, String, DateTime, func
+from database import Base
+
+
+class CompanyRecord(Base):
+    """
+    Кэш карточек rusprofile по нормализованному запросу (ОГРН/ОГРНИП/ИНН).
+    found=False — компания не нашлась; такие записи живут короче.
+    """
+    __tablename__ = "company_info"
+
+    query = Column(String(15), primary_key=True)
+    found = Column(Boolean, nullable=False)
+    inn = Column(String(12), nullable=True)
+    ogrn = Column(String(13), nullable=True)
+    ogrnip = Column(String(15), nullable=True)
+    tax_office = Column(String, nullable=True)
+    director = Column(String, nullable=True)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+
+class CompanyCardUrl(Base):
+    """
+    Адрес карточки rusprofile (/id/NNN) по нормализованному запросу —
+    из редиректов поиска и поисковых страниц. Карточки не переезжают,
+    поэтому без TTL; запись удаляется, если карточка перестала открываться.
+    """
+    __tablename__ = "company_card_urls"
+
+    query = Column(String(15), primary_key=True)
+    card_url = Column(String, nullable=False)
+    learned_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, func
+from sqlalchemy import Column, Integer, String, DateTime, JSON, LargeBinary, func
 from database import Base
 from sqlalchemy.dialects.postgresql import ARRAY
+from utils.rowpack import unpack_rows
 
 
 class ParseData(Base):
@@ -15,4 +16,13 @@ class ParseData(Base):
     max_sale_count = Column(Integer, nullable=False)
     reg_date = Column(DateTime(timezone=True), nullable=False)
     max_reg_date = Column(DateTime(timezone=True), nullable=False)
-    data = Column(JSON, nullable=False)
\ No newline at end of file
+    row_count = Column(Integer, nullable=False, server_default="0")
+    # строки результата в utils.rowpack (msgpack по колонкам + zlib)
+    payload = Column(LargeBinary, nullable=True)
+    # старый формат — список SellerOut.dict(); у новых записей NULL
+    data = Column(JSON, nullable=True)
+
+    def rows(self) -> list:
+        if self.payload is not None:
+            return unpack_rows(self.payload)
+        return list(self.data or [])
\ No newline at end of file
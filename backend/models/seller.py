@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, func
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index, func, text
 from database import Base
 from sqlalchemy.dialects.postgresql import ARRAY
 
@@ -7,7 +7,7 @@ class Seller(Base):
     __tablename__ = "sellers"
 
     id = Column(Integer, primary_key=True, index=True)
-    supplier_id = Column(Integer, nullable=False, index=True)
+    supplier_id = Column(Integer, nullable=False, unique=True, index=True)
     store_name = Column(String, nullable=True)
     inn = Column(String(12), nullable=False, index=True)
     url = Column(String, nullable=False)
@@ -17,7 +17,30 @@ class Seller(Base):
     director = Column(String, nullable=True)
     ogrn = Column(String(13), nullable=True)
     ogrnip = Column(String(15), nullable=True)
+    region_code = Column(String(2), nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     phone = Column(ARRAY(String), nullable=True)
     email = Column(ARRAY(String), nullable=True)
-    categories = Column(String, nullable=True)
\ No newline at end of file
+    categories = Column(String, nullable=True)
+    last_refreshed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # автодополнение: ILIKE '%q%' и similarity() по названию
+        Index(
+            "ix_sellers_store_name_trgm", "store_name",
+            postgresql_using="gin",
+            postgresql_ops={"store_name": "gin_trgm_ops"},
+        ),
+        # короткие запросы: lower(store_name) LIKE 'q%'
+        Index("ix_sellers_store_name_lower_prefix", text("lower(store_name) text_pattern_ops")),
+        # поиск по началу реквизитов
+        Index("ix_sellers_inn_prefix", "inn", postgresql_ops={"inn": "varchar_pattern_ops"}),
+        Index("ix_sellers_ogrn_prefix", "ogrn", postgresql_ops={"ogrn": "varchar_pattern_ops"}),
+        Index("ix_sellers_ogrnip_prefix", "ogrnip", postgresql_ops={"ogrnip": "varchar_pattern_ops"}),
+        # фильтры поиска (services.seller_filter)
+        Index("ix_sellers_sale_count_reg_date", "sale_count", "reg_date"),
+        Index("ix_sellers_categories_created_at", "categories", "created_at"),
+        Index("ix_sellers_created_at", "created_at"),
+        # инкрементальное обновление sale_count: сначала самые несвежие
+        Index("ix_sellers_last_refreshed_at", text("last_refreshed_at NULLS FIRST"), "id"),
+    )
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, DateTime, func
+from database import Base
+
+
+class SellerCategory(Base):
+    """
+    Справочник значений sellers.categories для фильтра на фронте.
+    Пополняется при сохранении продавцов — DISTINCT по sellers не нужен.
+    """
+    __tablename__ = "seller_categories"
+
+    name = Column(String, primary_key=True)
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -24,6 +24,7 @@ class SellerContactCache(Base):
     director = Column(String, nullable=True)
     ogrn = Column(String(13), nullable=True)
     ogrnip = Column(String(15), nullable=True)
+    region_code = Column(String(2), nullable=True, index=True)
 
     first_seen_at = Column(DateTime(timezone=True),
                             server_default=func.now(), nullable=False)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, func
+from database import Base
+
+
+class SupplierInfo(Base):
+    """
+    Реквизиты продавца из supplier-by-id (ИНН, ОГРН/ОГРНИП, название).
+    Меняются крайне редко, поэтому храним долго и не перезапрашиваем.
+    """
+    __tablename__ = "supplier_info"
+
+    supplier_id = Column(Integer, primary_key=True, autoincrement=False)
+    inn = Column(String(12), nullable=False)
+    ogrn = Column(String(13), nullable=True)
+    ogrnip = Column(String(15), nullable=True)
+    trademark = Column(String, nullable=True)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
@@ -3,43 +3,51 @@ from __future__ import annotations
 import asyncio
 import logging
 import time
-from collections import deque
-from threading import Lock
+from contextvars import ContextVar
 from typing import Any, Dict, Protocol, Optional
+from urllib.parse import urlsplit
 
 import aiohttp
 from aiohttp import ClientTimeout, ClientResponseError
 from fake_useragent import UserAgent
 
 from parser.parser_cfg import settings as ParserConfig
-from proxy.manager import get_all_proxies
+from parser.rate_limiter import limiter
+from proxy.scheduler import scheduler, _canon
 
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
-_PROXY_POOL: deque[str] = deque()
-_POOL_LOCK = Lock()
+class RequestCounter:
+    """Сколько HTTP-попыток сделано в рамках одной задачи (все апстримы)."""
+    __slots__ = ("n",)
 
-_BAD_TTL = 60
-_BAD: dict[str, float] = {}
+    def __init__(self) -> None:
+        self.n = 0
 
 
-def _canon(px: str | None) -> str:
-    """user:pass@ip:port (lower-case, без схемы)."""
-    if not px:
-        return ""
-    px = px.lower()
-    for p in ("http://", "https://", "socks5://"):
-        if px.startswith(p):
-            return px[len(p) :]
-    return px
+# Задача кладёт сюда свой счётчик; дочерние asyncio-задачи наследуют
+# контекст и считают в тот же объект. Вне задачи — None, не считаем.
+request_counter: ContextVar[Optional[RequestCounter]] = ContextVar("request_counter", default=None)
+
+
+class HttpNotFound(Exception):
+    """Апстрим ответил 400/404/422 — ресурса нет (fetch_text(strict=True))."""
+
+
+class HttpUnavailable(Exception):
+    """Попытки кончились (429/403, таймауты, ошибки прокси) — ответа нет (fetch_text(strict=True))."""
+
 
 def _wrap(px: str | None) -> str | None:
     """Добавляем http://, если нужно, иначе None."""
     return None if not px else (px if "://" in px else f"http://{px}")
 
+def _host(url: str) -> str:
+    return urlsplit(url).hostname or ""
+
 class UserAgentProvider(Protocol):
     def get(self) -> str: ...
 
@@ -50,36 +58,6 @@ class RandomUserAgentProvider:
     def get(self) -> str:
         return self._ua.random
 
-def _next_proxy(last: str | None) -> str | None:
-    """
-    round-robin без повторов (кроме last, если очередь «замкнулась»);
-    пропускаем IP из бан-листа.
-    """
-    now = time.time()
-    with _POOL_LOCK:
-
-        if not _PROXY_POOL:
-            _PROXY_POOL.extend(get_all_proxies())
-            if not _PROXY_POOL:
-                return None
-
-
-        for k, ts in list(_BAD.items()):
-            if now > ts:
-                _BAD.pop(k, None)
-
-        tries = len(_PROXY_POOL)
-        while tries:
-            px = _PROXY_POOL[0]
-            _PROXY_POOL.rotate(-1)
-            key = _canon(px)
-            if key in _BAD or key == (last or ""):
-                tries -= 1
-                continue
-            return px
-
-        return None
-
 class AsyncHttpClient:
     """aiohttp-обёртка с прокси и retry."""
 
@@ -91,6 +69,8 @@ class AsyncHttpClient:
         proxy: str | None = ParserConfig.PROXY_URL,   # None | "random" | конкретный
         ua_provider: UserAgentProvider | None = None,
         headers: dict | None = None,
+        conn_limit: int = ParserConfig.CONN_LIMIT,
+        per_host_limit: int = ParserConfig.PER_HOST_LIMIT,
     ) -> None:
         self._timeout_cfg = ClientTimeout(total=timeout)
         self._retries = retries
@@ -100,14 +80,16 @@ class AsyncHttpClient:
         self._session: aiohttp.ClientSession | None = None
         self._headers = headers or {}
         self._last_proxy: str | None = None
+        self._conn_limit = conn_limit
+        self._per_host_limit = per_host_limit
 
     # ───────── context mgr ──────────────────────────────────────
     async def __aenter__(self) -> "AsyncHttpClient":
         self._session = aiohttp.ClientSession(
             timeout=self._timeout_cfg,
             connector=aiohttp.TCPConnector(
-                limit=ParserConfig.CONN_LIMIT,
-                limit_per_host=ParserConfig.PER_HOST_LIMIT,
+                limit=self._conn_limit,
+                limit_per_host=self._per_host_limit,
                 ttl_dns_cache=600,
                 enable_cleanup_closed=True,
             ),
@@ -119,27 +101,41 @@ class AsyncHttpClient:
         if self._session and not self._session.closed:
             await self._session.close()
 
-    def _pick_proxy(self) -> str | None:
+    def _pick_proxy(self, host: str) -> str | None:
         if self._proxy_cfg and self._proxy_cfg not in ("random",):
             return _wrap(self._proxy_cfg)
 
         if (self._proxy_cfg == "random") or ParserConfig.USE_PROXY:
-            px = _next_proxy(self._last_proxy)
+            px = scheduler.acquire(host, exclude=self._last_proxy)
             self._last_proxy = _canon(px)
             return _wrap(px)
         return None
 
+    @staticmethod
+    def _count() -> None:
+        """Попытка получила слот лимитера и уходит в сеть — считаем её в метриках задачи."""
+        counter = request_counter.get()
+        if counter is not None:
+            counter.n += 1
 
-    def _ban(self, proxy_url: str | None) -> None:
-        if proxy_url:
-            _BAD[_canon(proxy_url)] = time.time() + _BAD_TTL
+    @staticmethod
+    def _release(proxy_url: str | None, host: str, status: int | None, started: float) -> None:
+        """Отчитываемся планировщику прокси и лимитеру об исходе попытки."""
+        scheduler.release(proxy_url, host, status=status, latency=time.monotonic() - started)
+        limiter.feedback(host, _canon(proxy_url), status)
 
     async def _request_json(self, url: str) -> Dict[str, Any]:
         """GET JSON с retry/back-off."""
+        host = _host(url)
         for att in range(1, self._retries + 1):
-            proxy_url = self._pick_proxy()
+            proxy_url = self._pick_proxy(host)
             #logger.warning(f"JSON {proxy_url} {url}")
+            status: int | None = None
+            started = time.monotonic()
             try:
+                await limiter.wait(host, _canon(proxy_url))
+                self._count()
+                started = time.monotonic()
                 async with self._session.get(
                     url,
                     headers={
@@ -150,6 +146,7 @@ class AsyncHttpClient:
                     },
                     proxy=proxy_url,
                 ) as resp:
+                    status = resp.status
                     if resp.status == 200:
                         return await resp.json(content_type=None)
 
@@ -159,25 +156,33 @@ class AsyncHttpClient:
                     if resp.status in (429, 403):
                         logger.warning("🚫 %s (%s/%s) %s via %s",
                                        resp.status, att, self._retries, url, proxy_url)
-                        self._ban(proxy_url)
-                        await asyncio.sleep(self._backoff * att)
-                        continue
-
-                    resp.raise_for_status()
+                    else:
+                        resp.raise_for_status()
 
             except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
-                await asyncio.sleep(self._backoff * att)
+                status = None
+            except asyncio.CancelledError:
+                status = 0      # запрос отменили сверху (limit) — прокси не виноват
+                raise
             except ClientResponseError as exc:
                 if exc.status in (400, 404, 422):
                     return {}
-                await asyncio.sleep(self._backoff * att)
+            finally:
+                self._release(proxy_url, host, status, started)
+            await asyncio.sleep(self._backoff * att)
         return {}
 
-    async def _request_text(self, url: str, headers: dict | None = None) -> str:
+    async def _request_text(self, url: str, headers: dict | None = None, strict: bool = False) -> str:
+        host = _host(url)
         for att in range(1, self._retries + 1):
-            proxy_url = self._pick_proxy()
+            proxy_url = self._pick_proxy(host)
             #logger.warning(f"TEXT {proxy_url} {url}")
+            status: int | None = None
+            started = time.monotonic()
             try:
+                await limiter.wait(host, _canon(proxy_url))
+                self._count()
+                started = time.monotonic()
                 async with self._session.get(
                     url,
                     headers=headers
@@ -187,30 +192,45 @@ class AsyncHttpClient:
                     },
                     proxy=proxy_url,
                 ) as resp:
+                    status = resp.status
                     if resp.status == 200:
                         return await resp.text()
 
                     if resp.status in (400, 404, 422):
+                        if strict:
+                            raise HttpNotFound(f"not found: {url}")
                         return ""
 
-                    if resp.status in (429, 403):
-                        self._ban(proxy_url)
-                        await asyncio.sleep(self._backoff * att)
-                        continue
-                    resp.raise_for_status()
+                    if resp.status not in (429, 403):
+                        resp.raise_for_status()
             except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
-                await asyncio.sleep(self._backoff * att)
+                status = None
+            except asyncio.CancelledError:
+                status = 0      # запрос отменили сверху (limit) — прокси не виноват
+                raise
             except ClientResponseError as exc:
                 if exc.status in (400, 404, 422):
+                    if strict:
+                        raise HttpNotFound(f"not found: {url}") from exc
                     return ""
-                await asyncio.sleep(self._backoff * att)
+            finally:
+                self._release(proxy_url, host, status, started)
+            await asyncio.sleep(self._backoff * att)
+        if strict:
+            raise HttpUnavailable(f"no response: {url}")
         return ""
 
     async def _request_head(self, url: str, allow_redirects: bool) -> aiohttp.ClientResponse:
+        host = _host(url)
         for att in range(1, self._retries + 1):
-            proxy_url = self._pick_proxy()
+            proxy_url = self._pick_proxy(host)
             #logger.warning(f"HEAD {proxy_url} {url}")
+            status: int | None = None
+            started = time.monotonic()
             try:
+                await limiter.wait(host, _canon(proxy_url))
+                self._count()
+                started = time.monotonic()
                 async with self._session.head(
                     url,
                     headers={
@@ -219,12 +239,17 @@ class AsyncHttpClient:
                     allow_redirects=allow_redirects,
                     proxy=proxy_url,
                 ) as resp:
+                    status = resp.status
                     if resp.status not in (429, 403):
                         return resp
-                    self._ban(proxy_url)
-                    await asyncio.sleep(self._backoff * att)
             except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
-                await asyncio.sleep(self._backoff * att)
+                status = None
+            except asyncio.CancelledError:
+                status = 0      # запрос отменили сверху (limit) — прокси не виноват
+                raise
+            finally:
+                self._release(proxy_url, host, status, started)
+            await asyncio.sleep(self._backoff * att)
 
         return await self._session.head(url, allow_redirects=allow_redirects)
 
@@ -233,10 +258,14 @@ class AsyncHttpClient:
             raise RuntimeError("use 'async with'")
         return await self._request_json(url)
 
-    async def fetch_text(self, url: str, *, headers: dict | None = None) -> str:
+    async def fetch_text(self, url: str, *, headers: dict | None = None, strict: bool = False) -> str:
+        """
+        Текст ответа. По умолчанию и «нет ресурса», и «попытки кончились»
+        дают "". strict=True различает их: HttpNotFound / HttpUnavailable.
+        """
         if not self._session:
             raise RuntimeError("use 'async with'")
-        return await self._request_text(url, headers=headers)
+        return await self._request_text(url, headers=headers, strict=strict)
 
     async def head(self, url: str, *, allow_redirects: bool = False) -> aiohttp.ClientResponse:
         if not self._session:
@@ -1,10 +1,13 @@
-from typing import Optional, Union, List, Dict, Tuple, Sequence, Iterable, Mapping, Any
+from typing import Optional, Union, List, Dict, Tuple, Sequence, Iterable, Mapping, Any, AsyncIterator
 import asyncio
+import logging
 import aiohttp
 
 from .HTTPClient import AsyncHttpClient
 from .WbModels import SellerStats
 
+logger = logging.getLogger(__name__)
+
 
 class WBProductFetcher:
     _BASE_URL = "https://catalog.wb.ru/catalog/{shard}/v2/catalog?{category}"
@@ -51,6 +54,23 @@ class WBProductFetcher:
             results.extend(await asyncio.gather(*batch))
         return results
 
+    async def iter_pages(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Отдаёт страницы по мере готовности (без ожидания самой медленной).
+        """
+        async def _one(url: str) -> Dict[str, Any]:
+            async with self._sem:
+                return await self._client.fetch_json(url)
+
+        tasks = [asyncio.create_task(_one(u)) for u in self._build_urls()]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield await fut
+        finally:
+            for t in tasks:
+                if not t.done():
+                    t.cancel()
+
 
 
 class WBProductParser:
@@ -69,12 +89,14 @@ class WBSellerInnFetcher:
         self._ids = list(seller_ids)
         self._client = client
 
+    async def fetch_one(self, sid: int) -> Dict[str, Any]:
+        return await self._client.fetch_json(self._URL.format(sellerId=sid))
+
     async def fetch(self) -> List[Dict[str, Any]]:
         sem = asyncio.Semaphore(self._CONCURRENCY)
         async def one(sid: int) -> Dict[str, Any]:
-            url = self._URL.format(sellerId=sid)
             async with sem:
-                return await self._client.fetch_json(url)
+                return await self.fetch_one(sid)
         return await asyncio.gather(*(one(s) for s in self._ids))
 
 
@@ -104,12 +126,14 @@ class WBSellerFetcher:
         self._ids = list(seller_ids)
         self._client = client
 
+    async def fetch_one(self, sid: int) -> Dict[str, Any]:
+        return await self._client.fetch_json(self._URL.format(sellerId=sid))
+
     async def fetch(self) -> List[Dict[str, Any]]:
         sem = asyncio.Semaphore(self._CONCURRENCY)
         async def one(sid: int) -> Dict[str, Any]:
-            url = self._URL.format(sellerId=sid)
             async with sem:
-                return await self._client.fetch_json(url)
+                return await self.fetch_one(sid)
         return await asyncio.gather(*(one(s) for s in self._ids))
 
 
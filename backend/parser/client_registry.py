@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict
+
+from config import USERBOX_KEY
+from parser.HTTPClient import AsyncHttpClient
+from parser.parser_cfg import settings as ParserConfig
+
+logger = logging.getLogger(__name__)
+
+# профиль → параметры AsyncHttpClient (лимиты соединений берутся из CLIENT_LIMITS)
+_PROFILES: Dict[str, Dict[str, Any]] = {
+    "wb_catalog": {"proxy": "random"},                       # catalog.wb.ru
+    "wb_basket": {"proxy": "random"},                        # static-basket-01.wbbasket.ru
+    "wb_shipment": {"proxy": "random"},                      # suppliers-shipment-2.wildberries.ru
+    "rusprofile": {"proxy": "random"},                       # www.rusprofile.ru
+    "usersbox": {"headers": {"Authorization": USERBOX_KEY}},  # api.usersbox.ru
+}
+
+
+class HttpClientRegistry:
+    """
+    Долгоживущие AsyncHttpClient по одному на апстрим.
+    Создаётся в startup-хуке приложения, закрывается в shutdown —
+    соединения, TLS-сессии и DNS-кэш переживают отдельные запросы.
+    """
+
+    def __init__(self) -> None:
+        self._clients: Dict[str, AsyncHttpClient] = {}
+
+    async def start(self) -> "HttpClientRegistry":
+        for name, kwargs in _PROFILES.items():
+            limit, per_host = ParserConfig.CLIENT_LIMITS.get(
+                name, (ParserConfig.CONN_LIMIT, ParserConfig.PER_HOST_LIMIT)
+            )
+            client = AsyncHttpClient(conn_limit=limit, per_host_limit=per_host, **kwargs)
+            self._clients[name] = await client.__aenter__()
+        return self
+
+    async def close(self) -> None:
+        for name, client in self._clients.items():
+            try:
+                await client.__aexit__(None, None, None)
+            except Exception as e:
+                logger.warning("Failed to close %s client: %s", name, e)
+        self._clients.clear()
+
+    def get(self, name: str) -> AsyncHttpClient:
+        try:
+            return self._clients[name]
+        except KeyError:
+            raise RuntimeError(f"HTTP client '{name}' is not started") from None
+
+    @property
+    def wb_catalog(self) -> AsyncHttpClient:
+        return self.get("wb_catalog")
+
+    @property
+    def wb_basket(self) -> AsyncHttpClient:
+        return self.get("wb_basket")
+
+    @property
+    def wb_shipment(self) -> AsyncHttpClient:
+        return self.get("wb_shipment")
+
+    @property
+    def rusprofile(self) -> AsyncHttpClient:
+        return self.get("rusprofile")
+
+    @property
+    def usersbox(self) -> AsyncHttpClient:
+        return self.get("usersbox")
+
+
+__all__ = ["HttpClientRegistry"]
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, TypeVar
+
+from .parser_cfg import settings as ParserConfig
+from .RusprofileFetcher import RPCardParser, RPSearchParser
+from utils.contacts import collect_contacts
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+# ───────── результаты ───────────────────────────────────────────
+# Из дочернего процесса возвращаются маленькие dataclass'ы, а не
+# pydantic-модели и не деревья HTML — pickle дешёвый в обе стороны.
+@dataclass(frozen=True, slots=True)
+class CardData:
+    """Реквизиты с карточки rusprofile (поля CompanyInfo без seller_id)."""
+    tax_office: str
+    inn: Optional[str] = None
+    ogrn: Optional[str] = None
+    ogrnip: Optional[str] = None
+    director: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class Contacts:
+    phones: Tuple[str, ...] = ()
+    emails: Tuple[str, ...] = ()
+
+
+# ───────── функции разбора (выполняются в пуле) ─────────────────
+# Только функции уровня модуля: ProcessPoolExecutor передаёт их по имени.
+def parse_card(html: str) -> Optional[CardData]:
+    infos = RPCardParser().parse([html])
+    if not infos:
+        return None
+    return CardData(**infos[0].model_dump(exclude={"seller_id"}))
+
+
+def parse_search(html: str) -> List[str]:
+    return RPSearchParser().parse([html])
+
+
+def parse_contacts(payloads: List[Mapping[str, Any]]) -> Contacts:
+    phones, emails = collect_contacts(payloads)
+    return Contacts(tuple(sorted(phones)), tuple(sorted(emails)))
+
+
+# ───────── пул ──────────────────────────────────────────────────
+class ParsePool:
+    """
+    Исполнитель для CPU-тяжёлого разбора (HTML rusprofile, ответы Usersbox).
+
+    Пока одна большая карточка разбирается прямо в event loop, стоят все
+    aiohttp-запросы процесса; здесь разбор уходит в пул, а loop только ждёт
+    future. Режимы (ParserConfig.PARSE_EXECUTOR):
+    ▸ process — пул процессов (spawn: дочерние процессы не наследуют
+      event loop и соединения родителя), разбор масштабируется по ядрам;
+    ▸ thread  — пул потоков: loop отзывчив, но разбор упирается в GIL;
+    ▸ inline  — прямо в loop, как раньше (отладка).
+    Если пул процессов не поднимается или падает, пул переключается
+    на потоки — разбор не должен ронять сбор данных.
+    Пул создаётся при первом вызове, так что скриптам ничего запускать не нужно.
+    """
+
+    def __init__(
+        self,
+        mode: str = ParserConfig.PARSE_EXECUTOR,
+        workers: int = ParserConfig.PARSE_WORKERS,
+    ) -> None:
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self._executor: Executor | None = None
+
+    def _get(self) -> Executor | None:
+        if self.mode == "inline":
+            return None
+        if self._executor is None:
+            if self.mode == "process":
+                try:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                except (OSError, NotImplementedError, ImportError) as e:
+                    logger.warning("Process pool unavailable (%s), parsing in threads", e)
+                    self.mode = "thread"
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="parse"
+                )
+            logger.info("Parse pool started: %s x%s", self.mode, self.workers)
+        return self._executor
+
+    def _fallback(self, broken: Executor) -> None:
+        if self._executor is broken:
+            logger.error("Process pool is broken, parsing in threads from now on")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self.mode = "thread"
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        executor = self._get()
+        if executor is None:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # дочерний процесс убит (OOM и т.п.) — пул уже непригоден.
+            # Этот вызов не повторяем: вход мог и убить процесс.
+            self._fallback(executor)
+            raise
+
+    async def card(self, html: str) -> Optional[CardData]:
+        return await self.run(parse_card, html)
+
+    async def search(self, html: str) -> List[str]:
+        return await self.run(parse_search, html)
+
+    async def contacts(self, payloads: List[Dict[str, Any]]) -> Contacts:
+        if not payloads:
+            return Contacts()
+        return await self.run(parse_contacts, payloads)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+parse_pool = ParsePool()
+
+__all__ = ["CardData", "Contacts", "ParsePool", "parse_pool"]
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Literal, Optional, Tuple
 
 from pydantic import HttpUrl, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -11,11 +11,120 @@ class ParserConfig(BaseSettings):
         description="Максимум одновременных HEAD/GET запросов к search",
         ge=1,
     )
+    SEARCH_HEDGE_DELAY: float = Field(
+        0.5,
+        description="Через сколько секунд без ответа на HEAD к search параллельно запрашивать страницу поиска",
+        ge=0,
+    )
     CARD_CONCURRENCY: int = Field(
         50,
         description="Максимум параллельных запросов к карточкам",
         ge=1,
     )
+    CATALOG_CONCURRENCY: int = Field(
+        10,
+        description="Одновременных запросов к страницам каталога WB",
+        ge=1,
+    )
+    INN_CONCURRENCY: int = Field(
+        50,
+        description="Одновременных запросов supplier-by-id (ИНН/ОГРН)",
+        ge=1,
+    )
+    SHIPMENT_CONCURRENCY: int = Field(
+        50,
+        description="Одновременных запросов suppliers-shipment",
+        ge=1,
+    )
+    REFRESH_BATCH: int = Field(
+        500,
+        description="Продавцов в одной пачке инкрементального обновления sale_count",
+        ge=1,
+    )
+    REFRESH_BUDGET: int = Field(
+        100_000,
+        description="Запросов suppliers-shipment на один прогон обновления sale_count",
+        ge=1,
+    )
+    PIPELINE_QUEUE_SIZE: int = Field(
+        200,
+        description="Размер очереди между стадиями конвейера (backpressure)",
+        ge=1,
+    )
+    ENRICH_CONCURRENCY: int = Field(
+        25,
+        description="Продавцов одновременно в обогащении через rusprofile",
+        ge=1,
+    )
+    SUPPLIER_INFO_TTL_DAYS: int = Field(
+        90,
+        description="Сколько дней доверять сохранённым реквизитам supplier-by-id",
+        ge=1,
+    )
+    SUPPLIER_INFO_LRU_SIZE: int = Field(
+        100_000,
+        description="Размер in-process LRU реквизитов supplier-by-id",
+        ge=0,
+    )
+    PARSE_EXECUTOR: Literal["process", "thread", "inline"] = Field(
+        "process",
+        description="Где разбирать HTML rusprofile и ответы Usersbox: пул процессов, пул потоков или прямо в event loop",
+    )
+    PARSE_WORKERS: int = Field(
+        0,
+        description="Размер пула разбора (0 — по числу ядер)",
+        ge=0,
+    )
+    COMPANY_CACHE_TTL_DAYS: int = Field(
+        90,
+        description="Сколько дней доверять сохранённой карточке rusprofile",
+        ge=1,
+    )
+    COMPANY_NEGATIVE_TTL_DAYS: int = Field(
+        3,
+        description="Сколько дней не переспрашивать rusprofile о ненайденной компании",
+        ge=0,
+    )
+    COMPANY_CACHE_LRU_SIZE: int = Field(
+        100_000,
+        description="Размер in-process LRU карточек rusprofile",
+        ge=0,
+    )
+    USERSBOX_CACHE_TTL_HOURS: int = Field(
+        24,
+        description="Сколько часов не переспрашивать Usersbox об одном ИНН",
+        ge=0,
+    )
+    USERSBOX_CACHE_SIZE: int = Field(
+        50_000,
+        description="Размер in-process LRU контактов Usersbox по ИНН",
+        ge=0,
+    )
+    USERSBOX_BATCH_SIZE: int = Field(
+        50,
+        description="ИНН в одной пачке запросов к Usersbox",
+        ge=1,
+    )
+    USERSBOX_BATCH_WINDOW: float = Field(
+        0.05,
+        description="Сколько секунд копить ИНН перед отправкой пачки в Usersbox",
+        ge=0,
+    )
+    USERSBOX_MIN_BALANCE: float = Field(
+        1.0,
+        description="Не тратить запросы Usersbox, если баланс ниже (0 — не проверять)",
+        ge=0,
+    )
+    USERSBOX_QUERY_COST: float = Field(
+        1.0,
+        description="Сколько баланса Usersbox списывает один запрос /search",
+        ge=0,
+    )
+    USERSBOX_BALANCE_TTL: int = Field(
+        60,
+        description="Как часто (секунды) перечитывать баланс Usersbox через /getMe",
+        ge=1,
+    )
     COMPANY_TIMEOUT: int = Field(
         5,
         description="Таймаут запроса (секунды) к rusprofile",
@@ -48,6 +157,46 @@ class ParserConfig(BaseSettings):
         description="Одновременных соединений на один хост | Default: 50",
         ge=1,
     )
+    CLIENT_LIMITS: Dict[str, Tuple[int, int]] = Field(
+        {
+            "wb_catalog": (100, 50),
+            "wb_basket": (100, 50),
+            "wb_shipment": (100, 50),
+            "rusprofile": (100, 50),
+            "usersbox": (50, 50),
+        },
+        description="Лимиты (всего, на хост) TCP-соединений для общих клиентов по профилям",
+    )
+
+    RATE_LIMIT_RPS: float = Field(
+        10.0,
+        description="Запросов в секунду на пару (хост, прокси) по умолчанию",
+        gt=0,
+    )
+    RATE_LIMIT_BURST: int = Field(
+        20,
+        description="Размер «ведра» (burst) на пару (хост, прокси) по умолчанию",
+        ge=1,
+    )
+    RATE_LIMITS: Dict[str, Tuple[float, int]] = Field(
+        {
+            "catalog.wb.ru": (3.0, 6),
+            "www.rusprofile.ru": (1.0, 3),
+        },
+        description="Переопределения (rps, burst) по хосту апстрима",
+    )
+    RATE_MIN_FACTOR: float = Field(
+        0.1,
+        description="Нижняя граница автоснижения темпа после 429 (доля от rps)",
+        gt=0,
+        le=1,
+    )
+    RATE_RECOVERY_STEP: float = Field(
+        0.02,
+        description="На сколько (доля от rps) темп восстанавливается после каждого успешного ответа",
+        gt=0,
+        le=1,
+    )
 
     USE_PROXY: bool = Field(
         True,
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Dict, Tuple
+
+from parser.parser_cfg import settings as ParserConfig
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Ведро токенов с самонастройкой (AIMD):
+    429 — темп падает вдвое (не чаще раза в секунду, не ниже RATE_MIN_FACTOR),
+    каждый успешный ответ — темп растёт на RATE_RECOVERY_STEP.
+    """
+
+    DECREASE = 0.5
+    DECREASE_INTERVAL = 1.0
+
+    def __init__(self, rps: float, burst: int) -> None:
+        self.base_rps = rps
+        self.burst = burst
+        self.factor = 1.0
+        self.tokens = float(burst)
+        self._last = time.monotonic()
+        self._last_decrease = 0.0
+
+    @property
+    def rps(self) -> float:
+        return self.base_rps * self.factor
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rps)
+        self._last = now
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rps)
+
+    def on_throttled(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.DECREASE_INTERVAL:
+            return
+        self._refill(now)
+        self._last_decrease = now
+        self.factor = max(ParserConfig.RATE_MIN_FACTOR, self.factor * self.DECREASE)
+        self.tokens = min(self.tokens, 0.0)
+
+    def on_success(self) -> None:
+        if self.factor < 1.0:
+            self._refill(time.monotonic())
+            self.factor = min(1.0, self.factor + ParserConfig.RATE_RECOVERY_STEP)
+
+
+class RateLimiter:
+    """Проактивное ограничение темпа по паре (хост апстрима, прокси)."""
+
+    def __init__(self) -> None:
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def _bucket(self, host: str, proxy: str | None) -> TokenBucket:
+        key = (host, proxy or "")
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rps, burst = ParserConfig.RATE_LIMITS.get(
+                host, (ParserConfig.RATE_LIMIT_RPS, ParserConfig.RATE_LIMIT_BURST)
+            )
+            bucket = self._buckets[key] = TokenBucket(rps, burst)
+        return bucket
+
+    async def wait(self, host: str, proxy: str | None) -> None:
+        await self._bucket(host, proxy).acquire()
+
+    def feedback(self, host: str, proxy: str | None, status: int | None) -> None:
+        bucket = self._bucket(host, proxy)
+        if status == 429:
+            bucket.on_throttled()
+        elif status and status < 400:
+            bucket.on_success()
+
+
+limiter = RateLimiter()
+
+__all__ = ["RateLimiter", "TokenBucket", "limiter"]
@@ -3,10 +3,11 @@ from __future__ import annotations
 import asyncio
 import logging
 import re
+from dataclasses import asdict
 from typing import Iterable, List, Sequence
 
 from .parser_cfg import settings as ParserConfig
-from .HTTPClient import AsyncHttpClient
+from .HTTPClient import AsyncHttpClient, HttpNotFound, HttpUnavailable
 from utils.decorators import log_elapsed
 from .RusprofileFetcher import (
     RPCardParser,
@@ -15,6 +16,8 @@ from .RusprofileFetcher import (
     RPSearchFetcher
 )
 from .RusprofileModels import CompanyInfo
+from .cpu_pool import parse_pool
+from services.company_cache import CompanyInfoCache, company_cache
 from utils.rusprofile_utils import _is_valid_inn, _css_first, _prepare_ids
 
 logger = logging.getLogger(__name__)
@@ -23,8 +26,139 @@ def _is_valid_inn(value: str) -> bool:
     """ИНН = только цифры и длина 10 (юр.лицо) или 12 (физ.лицо)."""
     return value.isdigit() and len(value) in (10, 12, 13, 15)
 
+class CompanyLookup:
+    """
+    Поиск карточки компании на rusprofile через общий клиент.
+    Семафоры общие на все запросы, поэтому один экземпляр можно
+    использовать для всей пачки продавцов сразу.
+    Перед сетью смотрит в кэш карточек (services.company_cache) —
+    повторный обход категории почти не ходит в rusprofile.
+    """
+
+    def __init__(self, client: AsyncHttpClient, cache: CompanyInfoCache | None = company_cache) -> None:
+        self._client = client
+        self._cache = cache
+        self._sem_search = asyncio.Semaphore(ParserConfig.SEARCH_CONCURRENCY)
+        self._sem_card = asyncio.Semaphore(ParserConfig.CARD_CONCURRENCY)
+        self._timeout = ParserConfig.COMPANY_TIMEOUT
+        self._hedge_delay = ParserConfig.SEARCH_HEDGE_DELAY
+
+    async def _from_search(self, query: str) -> str | None:
+        """
+        Адрес карточки через поиск: сначала HEAD (ждём редирект на карточку).
+        GET поисковой страницы уходит, только если редиректа нет или HEAD
+        не ответил за `SEARCH_HEDGE_DELAY` — тогда запросы идут наперегонки,
+        и редирект отменяет GET. Так обычный поиск занимает один слот
+        `_sem_search`, а не два.
+        None — только если страница получена и ссылок в ней нет;
+        не получилось получить страницу — исключение (в кэш не попадёт).
+        """
+        client = self._client
+        search_url = f"https://www.rusprofile.ru/search?query={query}"
+
+        head_sent = asyncio.Event()
+
+        async def head():
+            async with self._sem_search:
+                head_sent.set()
+                return await client.head(search_url, allow_redirects=False)
+
+        async def page() -> str:
+            async with self._sem_search:
+                html = await client.fetch_text(search_url, headers={"Accept": "text/html"}, strict=True)
+            if not html:
+                raise HttpUnavailable(f"empty page: {search_url}")
+            return html
+
+        head_task = asyncio.create_task(head())
+        sent_task = asyncio.create_task(head_sent.wait())
+        page_task: asyncio.Task[str] | None = None
+        try:
+            # задержка считается с момента, когда HEAD получил слот, а не
+            # с постановки в очередь семафора — иначе под нагрузкой GET
+            # уходил бы на каждый поиск
+            await asyncio.wait({head_task, sent_task}, return_when=asyncio.FIRST_COMPLETED)
+            done, _ = await asyncio.wait({head_task}, timeout=self._hedge_delay)
+            if not done:
+                page_task = asyncio.create_task(page())
+            try:
+                resp = await head_task
+            except Exception as e:
+                logger.debug("HEAD %s failed: %s", search_url, e)
+                resp = None
+            loc = resp.headers.get("Location") if resp is not None else None
+            if resp is not None and resp.status in (301, 302) and loc:
+                return loc if loc.startswith("http") else f"https://www.rusprofile.ru{loc}"
+
+            if page_task is None:
+                page_task = asyncio.create_task(page())
+            links = await parse_pool.search(await page_task)
+            return links[0] if links else None
+        finally:
+            for t in (head_task, sent_task, page_task):
+                if t is not None:
+                    t.cancel()
+
+    async def _fetch_card(self, card_url: str, strict: bool = False) -> str:
+        async with self._sem_card:
+            return await self._client.fetch_text(card_url, headers={"Accept": "text/html"}, strict=strict)
+
+    @staticmethod
+    async def _parse_card(card_html: str) -> CompanyInfo | None:
+        card = await parse_pool.card(card_html)
+        return CompanyInfo(**asdict(card)) if card else None
+
+    async def _resolve(self, query: str) -> CompanyInfo | None:
+        # известный адрес карточки — сразу в неё, без поиска.
+        # 404 — адрес устарел: забываем и ищем заново. Прочие сбои
+        # (429, таймауты, прокси) пробрасываются — адрес остаётся.
+        if self._cache is not None:
+            card_url = await self._cache.get_card_url(query)
+            if card_url:
+                try:
+                    card_html = await self._fetch_card(card_url, strict=True)
+                except HttpNotFound:
+                    await self._cache.forget_card_url(query)
+                else:
+                    if not card_html:
+                        raise HttpUnavailable(f"empty page: {card_url}")
+                    return await self._parse_card(card_html)
+
+        card_url = await self._from_search(query)
+        if not card_url:
+            return None
+        if self._cache is not None:
+            await self._cache.put_card_url(query, card_url)
+        return await self._parse_card(await self._fetch_card(card_url))
+
+    async def lookup(self, query: str, seller_id: int | None = None) -> CompanyInfo | None:
+        """Одна компания → CompanyInfo (или None). Ошибки и таймауты не пробрасываются."""
+        if self._cache is not None:
+            cached, creds = await self._cache.get(query)
+            if cached:
+                return CompanyInfo(**creds, seller_id=seller_id) if creds else None
+        try:
+            info = await asyncio.wait_for(self._resolve(query), self._timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Timeout parsing rusprofile for %s, skipping", query)
+            return None
+        except Exception as e:
+            logger.error("Error parsing rusprofile for %s: %s", query, e)
+            return None
+        # карточка без единого реквизита — скорее заглушка/капча, не запоминаем
+        if self._cache is not None and (info is None or info.inn or info.ogrn or info.ogrnip):
+            await self._cache.put(query, info.model_dump(exclude={"seller_id"}) if info else None)
+        if info is not None:
+            info.seller_id = seller_id
+        return info
+
+
 @log_elapsed()
-async def parse_companies(ids: Iterable[str | int], seller_id: int) -> List[CompanyInfo]:
+async def parse_companies(
+    ids: Iterable[str | int],
+    seller_id: int,
+    client: AsyncHttpClient | None = None,
+) -> List[CompanyInfo]:
     """
     :param ids: строки вида "1234567890&type=ul" или "123456789012&type=ip"
     :return: список CompanyInfo
@@ -45,57 +179,14 @@ async def parse_companies(ids: Iterable[str | int], seller_id: int) -> List[Comp
     if not uniq:
         return []
 
-    sem_search = asyncio.Semaphore(ParserConfig.SEARCH_CONCURRENCY)
-    sem_card = asyncio.Semaphore(ParserConfig.CARD_CONCURRENCY)
-    timeout = ParserConfig.COMPANY_TIMEOUT
-    results: List[CompanyInfo] = []
-
-    async def process_one(query: str, client: AsyncHttpClient) -> CompanyInfo | None:
-        try:
-
-            search_url = f"https://www.rusprofile.ru/search?query={query}"
-            async with sem_search:
-                head = await client.head(search_url, allow_redirects=False)
-            loc = head.headers.get("Location")
-            if head.status in (301, 302) and loc:
-                card_url = loc if loc.startswith("http") else f"https://www.rusprofile.ru{loc}"
-            else:
-                async with sem_search:
-                    html = await client.fetch_text(search_url, headers={"Accept": "text/html"})
-
-                links = RPSearchParser().parse([html])
-                if not links:
-                    return None
-                card_url = links[0]
-
-            async with sem_card:
-                card_html = await client.fetch_text(card_url, headers={"Accept": "text/html"})
-
-            infos = RPCardParser().parse([card_html])
-            return infos[0] if infos else None
-
-        except Exception as e:
-            logger.error("Error parsing rusprofile for %s: %s", query, e)
-            return None
+    if client is None:
+        async with AsyncHttpClient(proxy="random") as session:
+            return await parse_companies(uniq, seller_id, client=session)
 
-    async with AsyncHttpClient(proxy="random") as client:
-        tasks = [
-            asyncio.create_task(
-                asyncio.wait_for(process_one(q, client), timeout)
-            )
-            for q in uniq
-        ]
-
-        completed = await asyncio.gather(*tasks, return_exceptions=True)
-        for res in completed:
-            if isinstance(res, CompanyInfo):
-                res.seller_id = seller_id
-                results.append(res)
-            elif isinstance(res, asyncio.TimeoutError):
-                logger.warning("Timeout parsing rusprofile for a company query, skipping")
-            elif isinstance(res, Exception):
-                logger.error("Failed parsing rusprofile query: %s", res)
-    return results
+    lookup = CompanyLookup(client)
+    completed = await asyncio.gather(*(lookup.lookup(q, seller_id) for q in uniq))
+    await company_cache.flush()
+    return [res for res in completed if res is not None]
 
 if __name__ == "__main__":
     r = asyncio.run(parse_companies(["7714415483&type=ul"], 1))
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import Iterable, List, Sequence
+from typing import Any, Dict, Iterable, List, Optional, Sequence
 
 from parser.HTTPClient import AsyncHttpClient
 from parser.parser_cfg import settings as ParserConfig
@@ -21,25 +21,33 @@ def _is_valid_inn(value: str) -> bool:
 
 
 @log_elapsed()
-async def parse_records(inns: Iterable[str]) -> List[UsersboxInfo]:
+async def parse_records(
+    inns: Iterable[str],
+    client: AsyncHttpClient | None = None,
+) -> List[UsersboxInfo]:
     """Получает список ИНН → возвращает список `UsersboxInfo`."""
     inns_list = list(inns)
     if not inns_list:
         return []
 
-    headers = {"Authorization": USERBOX_KEY}
+    if client is None:
+        headers = {"Authorization": USERBOX_KEY}
+        async with AsyncHttpClient(headers=headers) as session:
+            return await parse_records(inns_list, client=session)
 
-    async with AsyncHttpClient(headers=headers) as client:
-        raw = await UsersboxFetcher(inns_list, client).fetch()
-        return UsersboxParser().parse(raw)
+    raw = await UsersboxFetcher(inns_list, client).fetch()
+    return UsersboxParser().parse(raw)
 
 
-async def parse_me() -> Optional[Dict[str, Any]]:
+async def parse_me(client: AsyncHttpClient | None = None) -> Optional[Dict[str, Any]]:
     url = "https://api.usersbox.ru/v1/getMe"
     headers = {"Authorization": USERBOX_KEY}
 
     try:
-        async with AsyncHttpClient(headers=headers) as client:
+        if client is None:
+            async with AsyncHttpClient(headers=headers) as session:
+                resp = await session.fetch_json(url)
+        else:
             resp = await client.fetch_json(url)
     except Exception as e:
         logger.error("Usersbox /getMe failed: %s", e)
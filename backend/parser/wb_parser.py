@@ -1,9 +1,12 @@
 import asyncio
+import logging
 import pprint
+from contextlib import AsyncExitStack
 from datetime import datetime, timedelta
-from typing import Optional, List, Union, Tuple
+from typing import Optional, List, Union, Tuple, AsyncIterator, Dict
 
 from .HTTPClient import AsyncHttpClient
+from .parser_cfg import settings as ParserConfig
 from .WbFetcher import (
     WBProductFetcher,
     WBSellerFetcher,
@@ -13,7 +16,9 @@ from .WbFetcher import (
     WBSellerInnParser
 )
 from .WbModels import SellerStats
-from services.db_utils import get_existing_seller_ids
+from services.db_utils import get_known_sellers
+from services.supplier_cache import supplier_cache
+from services.sweep import SweepRegistry
 from utils.wb_utils import (
     check_region,
     _to_dt,
@@ -22,88 +27,246 @@ from utils.wb_utils import (
 )
 from utils.decorators import log_elapsed
 
-@log_elapsed()
-async def parse_sellers(
-    category: str,
-    shard: str,
-    pages: int = 1,
-    *,
-    regions: List[str],
-    max_sales: int,
-    min_sales: int,
-    min_registration_date: Optional[Union[str, datetime]] = None,
-    max_registration_date: Optional[Union[str, datetime]] = None,
-    client: AsyncHttpClient | None = None,
-) -> Tuple[List[SellerStats], List[int]]:
-    if client is None:
-        async with AsyncHttpClient(proxy="random") as session:
-            return await parse_sellers(
-                category=category,
-                shard=shard,
-                pages=pages,
-                regions=regions,
-                max_sales=max_sales,
-                min_sales=min_sales,
-                min_registration_date=min_registration_date,
-                max_registration_date=max_registration_date,
-                client=session,
-            )
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def _in_regions(info: Dict[str, str], regions: set[str]) -> bool:
+    ogrn = info.get("ogrn")
+    ogrnip = info.get("ogrnip")
+    inn = info.get("inn")
+    if ogrn and ogrn[3:5] in regions:
+        return True
+    if ogrnip and ogrnip[3:5] in regions:
+        return True
+    return bool(inn and inn[:2] in regions)
 
-    pages_data = await WBProductFetcher(category, shard, pages, client).fetch()
-    products = WBProductParser().parse(pages_data)
 
-    seller_ids = list({p.get("supplierId") for p in products if isinstance(p.get("supplierId"), int)})
-    if not seller_ids:
-        return [], []
+class SellerPipeline:
+    """
+    Потоковый сбор продавцов категории:
+    каталог → supplier-by-id (ИНН/ОГРН) → suppliers-shipment.
 
-    existing_objs = get_existing_seller_ids(seller_ids)
-    existing_objs = await check_region(existing_objs, regions)
-    existing_ids = [x[0] for x in existing_objs]
+    Стадии связаны ограниченными очередями, у каждой свой пул воркеров.
+    Продавец уходит на следующую стадию сразу, как только по нему пришёл
+    ответ, — медленная страница или прокси больше не тормозит всю цепочку.
+    """
 
-    new_ids = [sid for sid in seller_ids if sid not in existing_ids]
-    if not new_ids:
-        return [], existing_ids
+    def __init__(
+        self,
+        category: str,
+        shard: str,
+        pages: int = 1,
+        *,
+        regions: List[str],
+        max_sales: int,
+        min_sales: int,
+        min_registration_date: Optional[Union[str, datetime]] = None,
+        max_registration_date: Optional[Union[str, datetime]] = None,
+        client: AsyncHttpClient | None = None,
+        inn_client: AsyncHttpClient | None = None,
+        shipment_client: AsyncHttpClient | None = None,
+        sweep: SweepRegistry | None = None,
+        retry_deadline: datetime | None = None,
+    ) -> None:
+        self._category = category
+        self._shard = shard
+        self._pages = pages
+        self._regions = list(regions)
+        self._region_set = set(regions)
+        self._max_sales = max_sales
+        self._min_sales = min_sales
+        self._min_dt = _to_dt(min_registration_date)
+        self._max_dt = _to_dt(max_registration_date)
+        self._client = client
+        self._inn_client = inn_client
+        self._shipment_client = shipment_client
+        self._sweep = sweep
+        self._retry_deadline = retry_deadline
+        self._error: BaseException | None = None
 
-    min_dt = _to_dt(min_registration_date)
-    max_dt = _to_dt(max_registration_date)
+        self.existing_ids: List[int] = []
+        # без контактов и проверялись после retry_deadline — повторно не обогащаем
+        self.recent_ids: List[int] = []
 
-    creds_map = WBSellerInnParser().parse(await WBSellerInnFetcher(new_ids, client).fetch())
+    # ───────── стадии ───────────────────────────────────────────
+    async def _catalog_stage(
+        self, client: AsyncHttpClient, inn_q: asyncio.Queue, ship_q: asyncio.Queue
+    ) -> None:
+        """
+        Страницы каталога → новые supplierId. Реквизиты, уже известные кэшу,
+        сразу идут на shipment; в supplier-by-id уходят только промахи.
+        """
+        seen: set[int] = set()
+        fetcher = WBProductFetcher(
+            self._category, self._shard, self._pages, client,
+            concurrency=ParserConfig.CATALOG_CONCURRENCY,
+        )
+        async for page in fetcher.iter_pages():
+            products = WBProductParser().parse([page])
+            ids = [
+                sid for sid in {p.get("supplierId") for p in products}
+                if isinstance(sid, int) and sid not in seen
+            ]
+            seen.update(ids)
+            if self._sweep is not None:
+                # в рамках обхода продавца обрабатывает только первая категория
+                ids = [sid for sid in ids if self._sweep.claim(sid, self._category)]
+            if not ids:
+                continue
 
-    region_codes_set = set(regions)
-    filtered_ids: List[int] = []
-    for sid, info in creds_map.items():
-        ogrn = info.get("ogrn")
-        ogrnip = info.get("ogrnip")
-        inn = info.get("inn")
+            rows, recent = await get_known_sellers(ids, self._retry_deadline)
+            existing = await check_region(rows, self._regions)
+            existing_ids = {x[0] for x in existing}
+            self.existing_ids.extend(existing_ids)
+            self.recent_ids.extend(sid for sid in ids if sid in recent and sid not in existing_ids)
 
-        if ogrn and ogrn[3:5] in region_codes_set:
-            filtered_ids.append(sid)
-        elif ogrnip and ogrnip[3:5] in region_codes_set:
-            filtered_ids.append(sid)
-        elif inn and inn[:2] in region_codes_set:
-            filtered_ids.append(sid)
+            known, misses = await supplier_cache.get_many(
+                sid for sid in ids if sid not in existing_ids and sid not in recent
+            )
+            for sid, info in known.items():
+                if _in_regions(info, self._region_set):
+                    await ship_q.put((sid, info))
+            for sid in misses:
+                await inn_q.put(sid)
+
+    async def _inn_worker(
+        self, client: AsyncHttpClient, inn_q: asyncio.Queue, ship_q: asyncio.Queue
+    ) -> None:
+        """supplier-by-id → фильтр по региону → очередь shipment."""
+        fetcher = WBSellerInnFetcher((), client)
+        while True:
+            sid = await inn_q.get()
+            if sid is _DONE:
+                return
+            try:
+                creds = WBSellerInnParser().parse([await fetcher.fetch_one(sid)])
+                info = next(iter(creds.values()), None)
+                if info:
+                    await supplier_cache.put(sid, info)
+                wanted = bool(info) and _in_regions(info, self._region_set)
+            except Exception as e:
+                logger.warning("supplier-by-id %s failed: %s", sid, e)
+                continue
+            if wanted:
+                await ship_q.put((sid, info))
+
+    async def _shipment_worker(
+        self, client: AsyncHttpClient, ship_q: asyncio.Queue, out_q: asyncio.Queue
+    ) -> None:
+        """suppliers-shipment → фильтры продаж/даты → выход конвейера."""
+        fetcher = WBSellerFetcher((), client)
+        while True:
+            item = await ship_q.get()
+            if item is _DONE:
+                return
+            sid, info = item
+            try:
+                stats = WBSellerParser().parse([await fetcher.fetch_one(sid)])
+            except Exception as e:
+                logger.warning("suppliers-shipment %s failed: %s", sid, e)
+                continue
+            for s in stats:
+                if s.seller_id != sid:
+                    continue
+                if not ok_sales(s, max_sales=self._max_sales, min_sales=self._min_sales):
+                    continue
+                if not ok_date(s, min_dt=self._min_dt, max_dt=self._max_dt):
+                    continue
 
-    if not filtered_ids:
-        return [], existing_ids
+                s.inn = info["inn"]
+                s.ogrn = info.get("ogrn") or None
+                s.ogrnip = info.get("ogrnip") or None
+                s.trademark = info.get("trademark") or None
+                await out_q.put(s)
 
-    ship_resps = await WBSellerFetcher(filtered_ids, client).fetch()
-    stats = WBSellerParser().parse(ship_resps)
+    async def _run(
+        self,
+        client: AsyncHttpClient,
+        inn_q: asyncio.Queue,
+        ship_q: asyncio.Queue,
+        out_q: asyncio.Queue,
+    ) -> None:
+        inn_client = self._inn_client or client
+        shipment_client = self._shipment_client or client
+        # TaskGroup: упавший воркер отменяет каталог и остальных воркеров —
+        # иначе каталог навсегда застрял бы на put в полную очередь без читателей
+        try:
+            async with asyncio.TaskGroup() as tg:
+                inn_workers = [
+                    tg.create_task(self._inn_worker(inn_client, inn_q, ship_q))
+                    for _ in range(ParserConfig.INN_CONCURRENCY)
+                ]
+                ship_workers = [
+                    tg.create_task(self._shipment_worker(shipment_client, ship_q, out_q))
+                    for _ in range(ParserConfig.SHIPMENT_CONCURRENCY)
+                ]
+                await self._catalog_stage(client, inn_q, ship_q)
+                for _ in inn_workers:
+                    await inn_q.put(_DONE)
+                await asyncio.gather(*inn_workers)
+                await supplier_cache.flush()
+                for _ in ship_workers:
+                    await ship_q.put(_DONE)
+        except ExceptionGroup as eg:
+            self._error = eg.exceptions[0]
+        await out_q.put(_DONE)
 
-    new_stats: List[SellerStats] = []
-    for s in stats:
-        if s.seller_id not in filtered_ids:
-            continue
-        if not ok_sales(s, max_sales=max_sales, min_sales=min_sales):
-            continue
-        if not ok_date(s, min_dt=min_dt, max_dt=max_dt):
-            continue
+    # ───────── выход ────────────────────────────────────────────
+    async def stream(self) -> AsyncIterator[SellerStats]:
+        """
+        Отдаёт продавцов по одному, как только они прошли все фильтры.
+        Досрочный выход из `async for` (limit) останавливает все стадии.
+        """
+        async with AsyncExitStack() as stack:
+            client = self._client
+            if client is None:
+                client = await stack.enter_async_context(AsyncHttpClient(proxy="random"))
 
-        info = creds_map.get(s.seller_id)
-        s.inn = info["inn"]
-        s.ogrn = info.get("ogrn") or None
-        s.ogrnip = info.get("ogrnip") or None
-        s.trademark = info.get("trademark") or None
+            size = ParserConfig.PIPELINE_QUEUE_SIZE
+            inn_q: asyncio.Queue = asyncio.Queue(maxsize=size)
+            ship_q: asyncio.Queue = asyncio.Queue(maxsize=size)
+            out_q: asyncio.Queue = asyncio.Queue(maxsize=size)
 
-        new_stats.append(s)
+            runner = asyncio.create_task(self._run(client, inn_q, ship_q, out_q))
+            try:
+                while True:
+                    item = await out_q.get()
+                    if item is _DONE:
+                        break
+                    yield item
+                if self._error is not None:
+                    raise self._error
+            finally:
+                if not runner.done():
+                    runner.cancel()
+                await asyncio.gather(runner, return_exceptions=True)
 
-    return new_stats, existing_ids
+
+@log_elapsed()
+async def parse_sellers(
+    category: str,
+    shard: str,
+    pages: int = 1,
+    *,
+    regions: List[str],
+    max_sales: int,
+    min_sales: int,
+    min_registration_date: Optional[Union[str, datetime]] = None,
+    max_registration_date: Optional[Union[str, datetime]] = None,
+    client: AsyncHttpClient | None = None,
+) -> Tuple[List[SellerStats], List[int]]:
+    pipeline = SellerPipeline(
+        category=category,
+        shard=shard,
+        pages=pages,
+        regions=regions,
+        max_sales=max_sales,
+        min_sales=min_sales,
+        min_registration_date=min_registration_date,
+        max_registration_date=max_registration_date,
+        client=client,
+    )
+    stats = [s async for s in pipeline.stream()]
+    return stats, pipeline.existing_ids
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+from proxy.manager import get_all_proxies
+
+logger = logging.getLogger(__name__)
+
+
+def _canon(px: str | None) -> str:
+    """user:pass@ip:port (lower-case, без схемы)."""
+    if not px:
+        return ""
+    px = px.lower()
+    for p in ("http://", "https://", "socks5://"):
+        if px.startswith(p):
+            return px[len(p) :]
+    return px
+
+
+def _public(key: str) -> str:
+    """ip:port без логина/пароля — для отдачи наружу."""
+    return key.rsplit("@", 1)[-1]
+
+
+@dataclass
+class ProxyHostStats:
+    """Здоровье одного прокси относительно одного апстрима."""
+    ewma_ms: float | None = None
+    ok: int = 0
+    fail: int = 0
+    bans: int = 0
+    strikes: int = 0
+    cooldown_until: float = 0.0
+    inflight: int = 0
+
+    @property
+    def success_rate(self) -> float:
+        # сглаживание Лапласа: новый прокси стартует с 0.5, а не с 0 или 1
+        return (self.ok + 1) / (self.ok + self.fail + self.bans + 2)
+
+
+class ProxyScheduler:
+    """
+    Выбор прокси с учётом здоровья по парам (прокси, хост апстрима).
+
+    ▸ EWMA латентности и счётчики успехов/ошибок/банов на каждый хост;
+    ▸ взвешенный случайный выбор: вес = success_rate / латентность / (1 + inflight);
+    ▸ после 429/403 прокси остывает для этого хоста, повторный бан удваивает паузу;
+    ▸ все методы синхронные и не уступают управление — на одном event loop
+      они атомарны, блокировки не нужны;
+    ▸ `acquire` только читает текущий пул: устаревший список перечитывается
+      фоновой задачей в потоке (`refresh`), после неудачи — с нарастающей паузой.
+    """
+
+    EWMA_ALPHA = 0.2
+    DEFAULT_MS = 1000.0
+    FAIL_MS = 5000.0
+    BASE_COOLDOWN = 60.0
+    MAX_COOLDOWN = 30 * 60.0
+    POOL_TTL = 3600.0
+    RETRY_BASE = 5.0
+    RETRY_MAX = 5 * 60.0
+
+    def __init__(self, loader: Callable[[], List[str]] = get_all_proxies) -> None:
+        self._loader = loader
+        self._pool: Dict[str, str] = {}                 # canon → как пришло из источника
+        self._loaded_at = 0.0
+        self._stats: Dict[Tuple[str, str], ProxyHostStats] = {}
+        self._refresher: asyncio.Task | None = None
+        self._fails = 0
+        self._retry_at = 0.0
+
+    # ───────── пул ──────────────────────────────────────────────
+    def _set_pool(self, proxies: List[str]) -> None:
+        self._pool = {_canon(px): px for px in proxies if px}
+        self._loaded_at = time.monotonic()
+        # статистика выбывших прокси больше не нужна
+        for k in [k for k in self._stats if k[0] not in self._pool]:
+            del self._stats[k]
+
+    def _ensure_pool(self) -> None:
+        """Запустить фоновое обновление, если пул пуст или устарел (сам не ждёт)."""
+        now = time.monotonic()
+        if self._pool and now - self._loaded_at < self.POOL_TTL:
+            return
+        if now < self._retry_at or (self._refresher is not None and not self._refresher.done()):
+            return
+        try:
+            self._refresher = asyncio.get_running_loop().create_task(self._refresh_quietly())
+        except RuntimeError:        # вне event loop — обновит следующий async-вызов
+            pass
+
+    async def _refresh_quietly(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning("proxy list refresh failed: %s", e)
+
+    async def refresh(self) -> int:
+        """
+        Перечитать список прокси, не блокируя event loop. Пустой ответ или
+        ошибка откладывают следующую фоновую попытку (5 с, 10 с … до 5 мин).
+        """
+        try:
+            proxies = await asyncio.to_thread(self._loader)
+        except Exception:
+            self._backoff()
+            raise
+        if proxies:
+            self._set_pool(proxies)
+            self._fails = 0
+            self._retry_at = 0.0
+        else:
+            self._backoff()
+        return len(self._pool)
+
+    def _backoff(self) -> None:
+        self._fails += 1
+        pause = min(self.RETRY_BASE * 2 ** (self._fails - 1), self.RETRY_MAX)
+        self._retry_at = time.monotonic() + pause
+
+    def _get(self, key: str, host: str) -> ProxyHostStats:
+        st = self._stats.get((key, host))
+        if st is None:
+            st = self._stats[(key, host)] = ProxyHostStats()
+        return st
+
+    def _weight(self, st: ProxyHostStats) -> float:
+        latency = st.ewma_ms or self.DEFAULT_MS
+        return st.success_rate / latency / (1 + st.inflight)
+
+    # ───────── выбор / отчёт ────────────────────────────────────
+    def acquire(self, host: str, exclude: str | None = None) -> str | None:
+        """
+        Прокси для запроса к `host` или None, если пул пуст / весь на паузе.
+        Каждый выданный прокси нужно вернуть через `release`.
+        """
+        self._ensure_pool()
+        if not self._pool:
+            return None
+
+        now = time.monotonic()
+        exclude = _canon(exclude)
+        candidates: List[str] = []
+        weights: List[float] = []
+        for key in self._pool:
+            st = self._get(key, host)
+            if st.cooldown_until > now:
+                continue
+            candidates.append(key)
+            weights.append(self._weight(st))
+
+        if len(candidates) > 1 and exclude in candidates:
+            i = candidates.index(exclude)
+            del candidates[i], weights[i]
+        if not candidates:
+            return None
+
+        key = random.choices(candidates, weights=weights, k=1)[0]
+        self._get(key, host).inflight += 1
+        return self._pool[key]
+
+    def release(
+        self,
+        proxy: str | None,
+        host: str,
+        *,
+        status: int | None,
+        latency: float | None,
+    ) -> None:
+        """
+        Итог запроса: status=None — сетевая ошибка/таймаут,
+        0 — запрос отменён, 429/403 — бан, остальное — прокси отработал.
+        """
+        st = self._stats.get((_canon(proxy), host))
+        if st is None:
+            return
+        st.inflight = max(0, st.inflight - 1)
+        if status == 0:
+            return
+
+        if status in (429, 403):
+            st.bans += 1
+            st.strikes += 1
+            pause = min(self.BASE_COOLDOWN * 2 ** (st.strikes - 1), self.MAX_COOLDOWN)
+            st.cooldown_until = time.monotonic() + pause
+            logger.info("proxy %s cooled down for %s on %s (%.0fs)",
+                        _public(_canon(proxy)), status, host, pause)
+            return
+
+        if status is None:
+            st.fail += 1
+            sample = self.FAIL_MS
+        else:
+            st.ok += 1
+            st.strikes = max(0, st.strikes - 1)
+            sample = (latency or 0.0) * 1000
+
+        st.ewma_ms = sample if st.ewma_ms is None else (
+            self.EWMA_ALPHA * sample + (1 - self.EWMA_ALPHA) * st.ewma_ms
+        )
+
+    # ───────── диагностика ──────────────────────────────────────
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        hosts: Dict[str, List[Dict[str, Any]]] = {}
+        for (key, host), st in self._stats.items():
+            if key not in self._pool:
+                continue
+            hosts.setdefault(host, []).append({
+                "proxy": _public(key),
+                "ewma_ms": round(st.ewma_ms, 1) if st.ewma_ms is not None else None,
+                "ok": st.ok,
+                "fail": st.fail,
+                "bans": st.bans,
+                "strikes": st.strikes,
+                "inflight": st.inflight,
+                "cooldown_left": max(0.0, round(st.cooldown_until - now, 1)),
+                "weight": round(self._weight(st) * 1e6, 3),
+            })
+        for rows in hosts.values():
+            rows.sort(key=lambda r: r["weight"], reverse=True)
+        return {
+            "proxies": len(self._pool),
+            "loaded_ago": round(now - self._loaded_at, 1) if self._loaded_at else None,
+            "hosts": {
+                host: {
+                    "available": sum(1 for r in rows if not r["cooldown_left"]),
+                    "cooling": sum(1 for r in rows if r["cooldown_left"]),
+                    "proxies": rows,
+                }
+                for host, rows in hosts.items()
+            },
+        }
+
+
+scheduler = ProxyScheduler()
+
+__all__ = ["ProxyScheduler", "ProxyHostStats", "scheduler"]
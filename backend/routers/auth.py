@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from schemas.auth import UserCreate, UserRead, Token
 from services.auth_service import register_user, authenticate_user, create_access_token
@@ -9,9 +9,9 @@ from dependencies import get_db
 router = APIRouter()
 
 @router.post("/register", response_model=UserRead)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     try:
-        return register_user(db, user)
+        return await register_user(db, user)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -19,9 +19,9 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
 async def login(
     response: Response,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,63 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from utils.category_index import category_index
+
+router = APIRouter()
+
+class CategoryShort(BaseModel):
+    id: int
+    name: str
+    shard: Optional[str] = None
+    query: Optional[str] = None
+    is_leaf: bool
+
+class CategoryFound(CategoryShort):
+    path: List[str]
+
+class CategoryDetail(CategoryShort):
+    parent: Optional[int] = None
+    path: List[CategoryShort]
+    children: List[CategoryShort]
+    leaf_count: int
+
+def _short(node: dict) -> CategoryShort:
+    return CategoryShort(
+        id=node["id"],
+        name=node.get("name") or "",
+        shard=node.get("shard"),
+        query=node.get("query"),
+        is_leaf=not node.get("childs"),
+    )
+
+@router.get("/", response_model=List[CategoryShort], summary="Корневые категории WB")
+async def list_roots():
+    return [_short(n) for n in category_index.roots()]
+
+@router.get("/search", response_model=List[CategoryFound], summary="Поиск категории по названию")
+async def search_categories(
+    q: str = Query(..., min_length=1, description="Часть названия"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    return [
+        CategoryFound(
+            **_short(n).model_dump(),
+            path=[p.get("name") or "" for p in category_index.path(n["id"])],
+        )
+        for n in category_index.search(q, limit)
+    ]
+
+@router.get("/{category_id}", response_model=CategoryDetail, summary="Категория, её путь и дочерние")
+async def get_category(category_id: int):
+    node = category_index.get(category_id)
+    if node is None:
+        raise HTTPException(404, "Категория не найдена")
+    return CategoryDetail(
+        **_short(node).model_dump(),
+        parent=node.get("parent"),
+        path=[_short(p) for p in category_index.path(category_id)],
+        children=[_short(c) for c in category_index.children(category_id)],
+        leaf_count=len(category_index.leaves(category_id)),
+    )
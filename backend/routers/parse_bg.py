@@ -1,16 +1,14 @@
-import asyncio
-from uuid import uuid4
-from typing import List, Optional, Dict, Any
-import json
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request, Depends
-from fastapi.responses import FileResponse
-
-from schemas.wb import WBParams, SellerOut
-from services.wb_service import collect_data
-from services.collection_log_utils import touch_collection
-from utils.wb_utils import _collect_subcategories
-from utils.excel import generate_excel
-from services.db_utils import _save_parse_data
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Depends
+from sse_starlette.sse import EventSourceResponse
+
+from schemas.wb import SellerOut
+from schemas.jobs import JobStatusOut, JobResultsPage
+from utils.excel import xlsx_response
+from utils.streaming import json_stream_response
+from services.job_progress import iter_results, iter_rows, job_events, read_job, read_progress, read_results
+from services.job_queue import JobQueue
+from dependencies import get_job_queue, get_redis_bin
 
 router = APIRouter()
 
@@ -25,7 +23,6 @@ def get_redis(request: Request):
     summary="Запустить фоновый парсинг по main_id",
 )
 async def start_parse(
-    background_tasks: BackgroundTasks,
     main_id: int = Query(..., description="ID главной категории"),
     pages: int = Query(1, ge=1, description="Страниц на каждую подкатегорию"),
     region_id: str = Query(
@@ -47,176 +44,91 @@ async def start_parse(
     concurrency: int = Query(
         3, ge=1, le=20, description="Одновременных запросов к WB API"
     ),
-    redis=Depends(get_redis),
+    jobs: JobQueue = Depends(get_job_queue),
 ):
     """
-    Запускает задачу парсинга в фоне и возвращает job_id для отслеживания.
+    Ставит задачу парсинга в очередь (выполняет worker.py) и возвращает
+    job_id для отслеживания.
     """
-    job_id = str(uuid4())
-    await redis.set(
-            f"job:{job_id}",
-            json.dumps({"status": "pending", "result": None, "error": None}, default=str)
-    )
-
-    background_tasks.add_task(
-            run_parse_job,
-            job_id,
-            redis,
-            main_id,
-            pages,
-            region_id,
-            saleItemCount,
-            maxSaleCount,
-            regDate,
-            maxRegDate,
-            limit,
-            concurrency,
+    job_id = await jobs.enqueue(
+        "parse",
+        {
+            "main_id": main_id,
+            "pages": pages,
+            "region_id": region_id,
+            "saleItemCount": saleItemCount,
+            "maxSaleCount": maxSaleCount,
+            "regDate": regDate,
+            "maxRegDate": maxRegDate,
+            "limit": limit,
+            "concurrency": concurrency,
+        },
     )
     return {"job_id": job_id}
 
-async def run_parse_job(
-    job_id: str,
-    redis,
-    main_id: int,
-    pages: int,
-    region_id: str,
-    saleItemCount: int,
-    maxSaleCount: Optional[int],
-    regDate: Optional[str],
-    maxRegDate: Optional[str],
-    limit: Optional[int],
-    concurrency: int,
-):
-
-    raw = await redis.get(f"job:{job_id}")
-    job = json.loads(raw)
-    job["status"] = "in_progress"
-    await redis.set(f"job:{job_id}", json.dumps(job, default=str))
-    try:
-        results: List[SellerOut] = []
-        remaining = limit
-
-        sem = asyncio.Semaphore(concurrency)
-
-        async def fetch_cat(cat_query: dict) -> List[SellerOut]:
-            params = WBParams(
-                cat=cat_query["query"],
-                shard=cat_query["shard"],
-                region_id=region_id,
-                saleItemCount=saleItemCount,
-                maxSaleCount=maxSaleCount,
-                pages=pages,
-                regDate=regDate,
-                maxRegDate=maxRegDate,
-            )
-            async with sem:
-                data, _ = await collect_data(
-                    params,
-                    region_id=region_id,
-                    limit=remaining,
-                )
-                return data
-
-        subcats = list(_collect_subcategories(main_id))
-        tasks = [asyncio.create_task(fetch_cat(cat)) for cat in subcats]
-
-        for coro in asyncio.as_completed(tasks):
-            data = await coro
-            for item in data:
-                results.append(item)
-                if remaining is not None:
-                    remaining -= 1
-                if remaining == 0:
-                    break
-            if remaining == 0:
-                break
-
-        for t in tasks:
-            if not t.done():
-                t.cancel()
-
-        if results:
-            touch_collection(
-                "all",
-                {
-                    "main_id": main_id,
-                    "pages": pages,
-                    "region_id": region_id,
-                    "saleItemCount": saleItemCount,
-                    "maxSaleCount": maxSaleCount,
-                },
-            )
-
-            _save_parse_data(
-                {
-                    "category": str(main_id),  # для «all» кладём main_id
-                    "shard": "",
-                    "region_id": region_id,
-                    "sale_item_count": saleItemCount,
-                    "max_sale_count": maxSaleCount or 0,
-                    "reg_date": regDate or datetime.utcnow(),
-                    "max_reg_date": maxRegDate or datetime.utcnow(),
-                    "data": [item.dict() for item in results],
-                }
-            )
+async def _load_job(redis, job_id: str) -> dict:
+    job = await read_job(redis, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
-        job["status"] = "finished"
-        job["result"] = [item.dict() for item in results]
-        await redis.set(f"job:{job_id}", json.dumps(job, default=str))
-    except Exception as e:
-        job["status"] = "failed"
-        job["error"] = str(e)
-        await redis.set(f"job:{job_id}", json.dumps(job, default=str))
+async def _finished_job(redis, job_id: str) -> dict:
+    job = await _load_job(redis, job_id)
+    if job["status"] in ("pending", "in_progress"):
+        raise HTTPException(status_code=202, detail="Job still in progress")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Job failed: {job.get('error')}")
+    return job
 
 @router.get(
     "/jobs/{job_id}/status",
+    response_model=JobStatusOut,
     summary="Статус фоновой задачи",
 )
-async def get_job_status(job_id: str,
-                         redis=Depends(get_redis)):
-    raw = await redis.get(f"job:{job_id}")
-    if not raw:
-        raise HTTPException(status_code=404, detail="Job not found")
-    job = json.loads(raw)
-    return {"job_id": job_id, "status": job["status"], "error": job.get("error")}
+async def get_job_status(job_id: str, redis=Depends(get_redis_bin)):
+    job = await _load_job(redis, job_id)
+    progress = await read_progress(redis, job_id)
+    return {"job_id": job_id, "status": job["status"], "error": job.get("error"), "progress": progress}
 
 @router.get(
-    "/jobs/{job_id}/result",
-    response_model=List[SellerOut],
-    summary="Результат фоновой задачи",
+    "/jobs/{job_id}/results",
+    response_model=JobResultsPage,
+    summary="Страница результатов (доступна, пока задача идёт)",
 )
-async def get_job_result(job_id: str,
-                         redis=Depends(get_redis)):
-    raw = await redis.get(f"job:{job_id}")
-    if not raw:
-        raise HTTPException(status_code=404, detail="Job not found")
-    job = json.loads(raw)
-    if job["status"] in ("pending", "in_progress"):
-        raise HTTPException(status_code=202, detail="Job still in progress")
-    if job["status"] == "failed":
-        raise HTTPException(status_code=500, detail=f"Job failed: {job.get('error')}" )
-    return job["result"]
+async def get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    redis=Depends(get_redis_bin),
+):
+    job = await _load_job(redis, job_id)
+    progress = await read_progress(redis, job_id)
+    items = await read_results(redis, job_id, offset, limit)
+    return {"job_id": job_id, "status": job["status"], "total": progress["sellers"], "offset": offset, "items": items}
+
+@router.get("/jobs/{job_id}/events", summary="SSE: прогресс и новые строки задачи")
+async def get_job_events(
+    request: Request,
+    job_id: str,
+    after: int = Query(0, ge=0, description="Смещение, с которого слать строки"),
+    redis=Depends(get_redis_bin),
+):
+    await _load_job(redis, job_id)
+    last_id = request.headers.get("last-event-id")
+    if last_id and last_id.isdigit():
+        after = int(last_id)
+    return EventSourceResponse(job_events(redis, job_id, after))
 
 @router.get(
-    "/jobs/{job_id}/excel",
-    summary="Скачать результат парсинга в Excel",
+    "/jobs/{job_id}/result",
+    response_model=List[SellerOut],
+    summary="Результат фоновой задачи",
 )
-async def download_job_excel(job_id: str,
-                             redis=Depends(get_redis)):
-    raw = await redis.get(f"job:{job_id}")
-    if not raw:
-        raise HTTPException(status_code=404, detail="Job not found")
-    job = json.loads(raw)
-    if job["status"] in ("pending", "in_progress"):
-        raise HTTPException(status_code=202, detail="Job still in progress")
-    if job["status"] == "failed":
-        raise HTTPException(status_code=500, detail=f"Job failed: {job.get('error')}" )
-
-    data: List[SellerOut] = job.get("result") or []
-    filename = f"sellers_{job_id}.xlsx"
-    generate_excel(data, filename)
-    return FileResponse(
-        path=filename,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename=filename
-    )
+async def get_job_result(job_id: str, redis=Depends(get_redis_bin)):
+    await _finished_job(redis, job_id)
+    return json_stream_response(iter_results(redis, job_id), envelope=False)
+
+@router.get("/jobs/{job_id}/excel", summary="Скачать результат парсинга в Excel")
+async def get_job_excel(job_id: str, redis=Depends(get_redis_bin)):
+    await _finished_job(redis, job_id)
+    return xlsx_response(iter_rows(redis, job_id), f"sellers_{job_id}.xlsx")
@@ -1,19 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import datetime
-from database import SessionLocal
+from dependencies import get_db
 from models.parse_data import ParseData
 from pydantic import BaseModel
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 router = APIRouter()
 
 class ParseDataBase(BaseModel):
@@ -26,24 +20,37 @@ class ParseDataBase(BaseModel):
     max_sale_count: int
     reg_date: datetime
     max_reg_date: datetime
-    rows: int          # вычисляем длину data
+    rows: int
 
-    class Config:
-        orm_mode = True
+# только метаданные — payload/data с диска не читаются
+_META = (
+    ParseData.id,
+    ParseData.created_at,
+    ParseData.category,
+    ParseData.shard,
+    ParseData.region_id,
+    ParseData.sale_item_count,
+    ParseData.max_sale_count,
+    ParseData.reg_date,
+    ParseData.max_reg_date,
+    ParseData.row_count.label("rows"),
+)
 
 @router.get("/", response_model=List[ParseDataBase])
-def list_parse_data(db: Session = Depends(get_db)):
-    rows = db.query(ParseData).order_by(ParseData.created_at.desc()).all()
-    return [
-        ParseDataBase(
-            **r.__dict__,
-            rows=len(r.data)
-        ) for r in rows
-    ]
+async def list_parse_data(db: AsyncSession = Depends(get_db)):
+    res = await db.execute(select(*_META).order_by(ParseData.created_at.desc()))
+    return [ParseDataBase(**r) for r in res.mappings()]
 
 @router.get("/{parse_id}", response_model=ParseDataBase)
-def get_parse_data(parse_id: int, db: Session = Depends(get_db)):
-    r = db.query(ParseData).filter(ParseData.id == parse_id).first()
+async def get_parse_data(parse_id: int, db: AsyncSession = Depends(get_db)):
+    r = (await db.execute(select(*_META).where(ParseData.id == parse_id))).mappings().first()
+    if not r:
+        raise HTTPException(404)
+    return ParseDataBase(**r)
+
+@router.get("/{parse_id}/rows", summary="Строки сохранённого результата")
+async def get_parse_data_rows(parse_id: int, db: AsyncSession = Depends(get_db)):
+    r = await db.get(ParseData, parse_id)
     if not r:
         raise HTTPException(404)
-    return ParseDataBase(**r.__dict__, rows=len(r.data))
+    return r.rows()
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+
+from proxy.scheduler import scheduler
+
+router = APIRouter()
+
+@router.get("/state", summary="Состояние пула прокси по апстримам")
+async def get_proxy_state():
+    """
+    Для каждого хоста: EWMA латентности, успехи/ошибки/баны,
+    текущая пауза и вес, с которым прокси сейчас выбирается.
+    """
+    return scheduler.snapshot()
+
+@router.post("/refresh", summary="Перечитать список прокси")
+async def refresh_proxies():
+    return {"proxies": await scheduler.refresh()}
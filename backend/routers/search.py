@@ -1,22 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import FileResponse
-from sqlalchemy import or_, and_, func
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import case, func, literal_column, or_, select, tuple_
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Literal, Optional
 from datetime import date
 from pydantic import BaseModel
-import tempfile, os, uuid
 
-from database import SessionLocal
+from config import settings
+from database import AsyncSessionLocal
+from dependencies import get_db, get_redis
+from services.seller_filter import SellerFilter, like_escape
 from models.seller import Seller
-from utils.excel import generate_excel_search
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+from models.seller_category import SellerCategory
+from utils.excel import xlsx_response
+from utils.streaming import json_stream_response
+from utils.suggest_cache import Suggestion, suggest_cache, normalize, is_id_query
 
 router = APIRouter()
 
@@ -39,196 +37,227 @@ class SellerDetail(BaseModel):
     email: Optional[list] = None
 
 @router.get("/", response_model=List[SellerSuggestion], tags=["search"])
-def search_sellers(
-    q: Optional[str] = Query(None, min_length=1),
-    region: Optional[str] = Query(None),
-    salesFrom: Optional[int] = Query(None, ge=0),
-    salesTo: Optional[int] = Query(None, ge=0),
-    dateFrom: Optional[date] = Query(None),
-    dateTo: Optional[date] = Query(None),
+async def search_sellers(
+    f: SellerFilter = Depends(),
     limit: int = Query(10, ge=1, le=50),
-    category: Optional[str] = Query(None),
-    createdFrom: Optional[date] = Query(None),
-    createdTo: Optional[date] = Query(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    query_stmt = db.query(Seller.id, Seller.store_name)
-    if q:
-        pattern = f"%{q}%"
-        query_stmt = query_stmt.filter(Seller.store_name.ilike(pattern))
-    # Регион
-    if region:
-        conds = []
-        conds.append(
-            and_(Seller.ogrn.isnot(None), func.substr(Seller.ogrn, 4, 2) == region)
-        )
-        conds.append(
-            and_(Seller.ogrnip.isnot(None), func.substr(Seller.ogrnip, 4, 2) == region)
-        )
-        conds.append(
-            and_(Seller.ogrn.is_(None), Seller.ogrnip.is_(None), func.substr(Seller.inn, 1, 2) == region)
-        )
-        query_stmt = query_stmt.filter(or_(*conds))
-    # Продажи
-    if salesFrom is not None:
-        query_stmt = query_stmt.filter(Seller.sale_count >= salesFrom)
-    if salesTo is not None:
-        query_stmt = query_stmt.filter(Seller.sale_count <= salesTo)
-    # Дата регистрации
-    if dateFrom:
-        query_stmt = query_stmt.filter(Seller.reg_date >= dateFrom)
-    if dateTo:
-        query_stmt = query_stmt.filter(Seller.reg_date <= dateTo)
-    if category:
-        query_stmt = query_stmt.filter(Seller.categories == category)
-    if createdFrom:
-        query_stmt = query_stmt.filter(func.date(Seller.created_at) >= createdFrom)
-    if createdTo:
-        query_stmt = query_stmt.filter(func.date(Seller.created_at) <= createdTo)
-
-    results = query_stmt.limit(limit).all()
-    return [SellerSuggestion(id=r.id, store_name=r.store_name) for r in results]
-
-@router.get("/results", response_model=List[SellerDetail], tags=["search"])
-def search_seller_details(
-    q: Optional[str] = Query(None, min_length=1),
-    region: Optional[str] = Query(None),
-    salesFrom: Optional[int] = Query(None, ge=0),
-    salesTo: Optional[int] = Query(None, ge=0),
-    dateFrom: Optional[date] = Query(None),
-    dateTo: Optional[date] = Query(None),
-    category: Optional[str] = Query(None),
-    createdFrom: Optional[date] = Query(None),
-    createdTo: Optional[date] = Query(None),
-    db: Session = Depends(get_db),
-):
-    query_stmt = db.query(Seller)
-    if q:
-        pattern = f"%{q}%"
-        query_stmt = query_stmt.filter(Seller.store_name.ilike(pattern))
-    if region:
-        conds = []
-        conds.append(and_(Seller.ogrn.isnot(None), func.substr(Seller.ogrn, 4, 2) == region))
-        conds.append(and_(Seller.ogrnip.isnot(None), func.substr(Seller.ogrnip, 4, 2) == region))
-        conds.append(and_(Seller.ogrn.is_(None), Seller.ogrnip.is_(None), func.substr(Seller.inn, 1, 2) == region))
-        query_stmt = query_stmt.filter(or_(*conds))
-    if salesFrom is not None:
-        query_stmt = query_stmt.filter(Seller.sale_count >= salesFrom)
-    if salesTo is not None:
-        query_stmt = query_stmt.filter(Seller.sale_count <= salesTo)
-    if dateFrom:
-        query_stmt = query_stmt.filter(Seller.reg_date >= dateFrom)
-    if dateTo:
-        query_stmt = query_stmt.filter(Seller.reg_date <= dateTo)
-    if category:
-        query_stmt = query_stmt.filter(Seller.categories == category)
-    if createdFrom:
-        query_stmt = query_stmt.filter(func.date(Seller.created_at) >= createdFrom)
-    if createdTo:
-        query_stmt = query_stmt.filter(func.date(Seller.created_at) <= createdTo)
-    sellers = query_stmt.all()
-    result_list = []
-    for s in sellers:
-        reg_date_val = None
-        if s.reg_date is not None:
-            reg_date_val = s.reg_date.date() if hasattr(s.reg_date, 'date') else s.reg_date
-
-        store_name_val = s.store_name if s.store_name is not None else ""
-
-        result_list.append(
-            SellerDetail(
-                id=s.id,
-                store_name=store_name_val,
-                seller_id=s.supplier_id,
-                url=s.url,
-                inn=s.inn,
-                ogrn=s.ogrn,
-                ogrnip=s.ogrnip,
-                tax_office=s.tax_office,
-                saleCount=s.sale_count,
-                reg_date=reg_date_val,
-                phone=s.phone,
-                email=s.email
+    """
+    Автодополнение: подстрока в названии (pg_trgm GIN), для цифр — ещё
+    начало ИНН/ОГРН/ОГРНИП. Сначала совпадения по реквизитам и по началу
+    названия, дальше по similarity и числу продаж. Горячие запросы
+    отдаются из suggest_cache без похода в БД.
+    """
+    qn = normalize(f.q) if f.q else ""
+    filters = f.key(with_q=False)
+    if qn:
+        cached = suggest_cache.get(filters, qn, limit)
+        if cached is not None:
+            return [SellerSuggestion(id=r.id, store_name=r.store_name or "") for r in cached]
+
+    query_stmt = f.apply(
+        select(Seller.id, Seller.store_name, Seller.inn, Seller.ogrn, Seller.ogrnip, Seller.sale_count),
+        with_q=False,
+    )
+    if qn:
+        esc = like_escape(qn)
+        name = func.lower(Seller.store_name)
+        if len(qn) < suggest_cache.MIN_PREFIX:
+            # короче триграммы GIN не поможет — префикс по lower(store_name)
+            name_hit = name.like(f"{esc}%", escape="!")
+        else:
+            name_hit = Seller.store_name.ilike(f"%{esc}%", escape="!")
+        id_hit = None
+        if is_id_query(qn):
+            id_hit = or_(
+                Seller.inn.like(f"{qn}%"),
+                Seller.ogrn.like(f"{qn}%"),
+                Seller.ogrnip.like(f"{qn}%"),
             )
+            query_stmt = query_stmt.where(or_(name_hit, id_hit))
+        else:
+            query_stmt = query_stmt.where(name_hit)
+        query_stmt = query_stmt.order_by(
+            *((id_hit.desc(),) if id_hit is not None else ()),
+            name.like(f"{esc}%", escape="!").desc(),
+            func.similarity(Seller.store_name, qn).desc(),
         )
-    return result_list
+    query_stmt = query_stmt.order_by(Seller.sale_count.desc(), Seller.id)
+
+    rows = [Suggestion(*r) for r in (await db.execute(query_stmt.limit(limit))).all()]
+    if qn:
+        suggest_cache.put(filters, qn, limit, rows)
+    return [SellerSuggestion(id=r.id, store_name=r.store_name or "") for r in rows]
+
+# Только нужные колонки, с именами как у SellerDetail — строка курсора сразу
+# годится и в JSON, и в utils.excel.seller_row без ORM-объектов и pydantic
+_DETAIL_COLUMNS = (
+    Seller.id,
+    Seller.supplier_id.label("seller_id"),
+    func.coalesce(Seller.store_name, "").label("store_name"),
+    Seller.url,
+    Seller.inn,
+    Seller.ogrn,
+    Seller.ogrnip,
+    Seller.tax_office,
+    Seller.sale_count.label("saleCount"),
+    func.date(Seller.reg_date).label("reg_date"),
+    Seller.phone,
+    Seller.email,
+)
+
+_STREAM_BATCH = 1000
+
+def _details_stmt(f: SellerFilter):
+    return f.apply(select(*_DETAIL_COLUMNS)).order_by(Seller.id)
+
+async def _stream_batches(stmt) -> AsyncIterator[List[Row]]:
+    """
+    Серверный курсор: в памяти не больше одной пачки строк.
+    Сессия своя — живёт, пока клиент читает ответ.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=_STREAM_BATCH))
+        async for batch in result.partitions():
+            yield batch
+
+async def _stream_rows(stmt) -> AsyncIterator[Row]:
+    async for batch in _stream_batches(stmt):
+        for row in batch:
+            yield row
+
+async def _stream_dicts(stmt) -> AsyncIterator[List[dict]]:
+    async for batch in _stream_batches(stmt):
+        yield [dict(r._mapping) for r in batch]
+
+class SellerDetailStream(BaseModel):
+    """Тело /results при format=json — поток в обёртке middleware."""
+    time: str
+    data: List[SellerDetail]
+
+# Ответ — StreamingResponse, response_model FastAPI к нему не применяет;
+# схема потока описана вручную (json — обёртка с массивом, ndjson — строка на продавца)
+_RESULTS_RESPONSES = {
+    200: {
+        "model": SellerDetailStream,
+        "content": {
+            "application/x-ndjson": {"schema": {"$ref": "#/components/schemas/SellerDetail"}},
+        },
+    },
+}
+
+@router.get("/results", responses=_RESULTS_RESPONSES, tags=["search"])
+async def search_seller_details(
+    f: SellerFilter = Depends(),
+    after_id: Optional[int] = Query(None, ge=0, description="Keyset: вернуть записи с id больше этого"),
+    limit: Optional[int] = Query(None, ge=1, description="Размер страницы (по умолчанию — всё)"),
+    format: Literal["json", "ndjson"] = Query("json", description="json — массив, ndjson — строка на продавца"),
+):
+    """
+    Отдаётся потоком по серверному курсору, отсортировано по id.
+    Для постраничной выборки передавайте id последней полученной записи в after_id.
+    """
+    stmt = _details_stmt(f)
+    if after_id is not None:
+        stmt = stmt.where(Seller.id > after_id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return json_stream_response(_stream_dicts(stmt), ndjson=format == "ndjson")
 
 @router.get("/xlsx", summary="Скачать результаты поиска в Excel")
 async def download_search_excel(
-    q: Optional[str] = Query(None, min_length=1),
-    region: Optional[str] = Query(None),
-    salesFrom: Optional[int] = Query(None, ge=0),
-    salesTo: Optional[int] = Query(None, ge=0),
-    dateFrom: Optional[date] = Query(None),
-    dateTo: Optional[date] = Query(None),
-    category: Optional[str] = Query(None),
-    createdFrom: Optional[date] = Query(None),
-    createdTo: Optional[date] = Query(None),
-    db: Session = Depends(get_db),
+    f: SellerFilter = Depends(),
     # user = Depends(get_current_user),
 ):
+    stmt = _details_stmt(f)
+    return xlsx_response(_stream_rows(stmt), "search_results.xlsx", title="SearchResults")
 
-    query_stmt = db.query(Seller)
-    if q:
-        pattern = f"%{q}%"
-        query_stmt = query_stmt.filter(Seller.store_name.ilike(pattern))
-    if region:
-        conds = [
-            and_(Seller.ogrn.isnot(None), func.substr(Seller.ogrn, 4, 2) == region),
-            and_(Seller.ogrnip.isnot(None), func.substr(Seller.ogrnip, 4, 2) == region),
-            and_(Seller.ogrn.is_(None), Seller.ogrnip.is_(None), func.substr(Seller.inn, 1, 2) == region),
-        ]
-        query_stmt = query_stmt.filter(or_(*conds))
-    if salesFrom is not None:
-        query_stmt = query_stmt.filter(Seller.sale_count >= salesFrom)
-    if salesTo is not None:
-        query_stmt = query_stmt.filter(Seller.sale_count <= salesTo)
-    if dateFrom:
-        query_stmt = query_stmt.filter(Seller.reg_date >= dateFrom)
-    if dateTo:
-        query_stmt = query_stmt.filter(Seller.reg_date <= dateTo)
-    if category:
-        query_stmt = query_stmt.filter(Seller.categories == category)
-    if createdFrom:
-        query_stmt = query_stmt.filter(func.date(Seller.created_at) >= createdFrom)
-    if createdTo:
-        query_stmt = query_stmt.filter(func.date(Seller.created_at) <= createdTo)
-    sellers = query_stmt.all()
-
-    details = []
-    for s in sellers:
-        reg_date_val = s.reg_date.date() if hasattr(s.reg_date, "date") else s.reg_date
-        details.append(
-            SellerDetail(
-                id=s.id,
-                seller_id=s.supplier_id,
-                store_name=s.store_name or "",
-                url=s.url,
-                inn=s.inn,
-                ogrn=s.ogrn,
-                ogrnip=s.ogrnip,
-                tax_office=s.tax_office,
-                saleCount=s.sale_count,
-                reg_date=reg_date_val,
-                phone=s.phone,
-                email=s.email,
-            )
-        )
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class SearchStats(BaseModel):
+    total: int
+    regions: List[FacetCount]
+    categories: List[FacetCount]
+    sales: List[FacetCount]
 
-    # Генерация файла
-    path = os.path.join(
-        tempfile.gettempdir(),
-        f"search_{uuid.uuid4().hex}.xlsx"
+# Корзины числа продаж: (подпись, нижняя граница включительно)
+SALES_BUCKETS = [
+    ("0", 0),
+    ("1-9", 1),
+    ("10-99", 10),
+    ("100-999", 100),
+    ("1000-9999", 1000),
+    ("10000+", 10000),
+]
+CATEGORY_FACET_LIMIT = 50
+
+def _sales_bucket():
+    # константы прямо в SQL: выражение в SELECT и в GROUPING SETS должно совпасть
+    # текстуально, а связанные параметры там получили бы разные номера
+    whens = [
+        (Seller.sale_count >= literal_column(str(low)), literal_column(f"'{label}'"))
+        for label, low in reversed(SALES_BUCKETS[1:])
+    ]
+    return case(*whens, else_=literal_column(f"'{SALES_BUCKETS[0][0]}'"))
+
+@router.get("/stats", response_model=SearchStats, tags=["search"])
+async def search_stats(
+    f: SellerFilter = Depends(),
+    db: AsyncSession = Depends(get_db),
+    redis=Depends(get_redis),
+):
+    """
+    Сколько продавцов под фильтр и разбивка по региону, категории и числу
+    продаж — одним запросом с GROUPING SETS. Ответ кэшируется в Redis по
+    хэшу нормализованного фильтра на SEARCH_STATS_TTL секунд.
+    """
+    key = f"search:stats:{f.digest()}"
+    cached = await redis.get(key)
+    if cached:
+        return SearchStats.model_validate_json(cached)
+
+    bucket = _sales_bucket().label("bucket")
+    stmt = f.apply(
+        select(
+            Seller.region_code,
+            Seller.categories,
+            bucket,
+            func.grouping(Seller.region_code, Seller.categories, bucket).label("g"),
+            func.count().label("n"),
+        )
+    ).group_by(
+        func.grouping_sets(
+            tuple_(),
+            tuple_(Seller.region_code),
+            tuple_(Seller.categories),
+            tuple_(bucket),
+        )
     )
-    generate_excel_search(details, filename=path)
+    # grouping(): 1 — колонка свёрнута; биты (region, categories, bucket)
+    total = 0
+    regions, categories, sales = [], [], {}
+    for r in (await db.execute(stmt)).all():
+        if r.g == 0b111:
+            total = r.n
+        elif r.g == 0b011:
+            regions.append(FacetCount(value=r.region_code or "", count=r.n))
+        elif r.g == 0b101:
+            categories.append(FacetCount(value=r.categories or "", count=r.n))
+        elif r.g == 0b110:
+            sales[r.bucket] = r.n
 
-    return FileResponse(
-        path,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename="search_results.xlsx"
+    stats = SearchStats(
+        total=total,
+        regions=sorted(regions, key=lambda x: -x.count),
+        categories=sorted(categories, key=lambda x: -x.count)[:CATEGORY_FACET_LIMIT],
+        sales=[FacetCount(value=label, count=sales.get(label, 0)) for label, _ in SALES_BUCKETS],
     )
+    await redis.set(key, stats.model_dump_json(), ex=settings.SEARCH_STATS_TTL)
+    return stats
 
 @router.get("/distinct-categories", response_model=List[str], tags=["search"])
-def distinct_categories(db: Session = Depends(get_db)):
-    rows = db.query(func.distinct(Seller.categories)).filter(Seller.categories.isnot(None)).all()
-    return [r[0] for r in rows if r[0]]
\ No newline at end of file
+async def distinct_categories(db: AsyncSession = Depends(get_db)):
+    rows = await db.scalars(select(SellerCategory.name).order_by(SellerCategory.name))
+    return list(rows)
\ No newline at end of file
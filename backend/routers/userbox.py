@@ -1,14 +1,16 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from datetime import datetime
 import requests
 from parser.userbox import parse_me
+from dependencies import get_http
+from parser.client_registry import HttpClientRegistry
 
 router = APIRouter()
 
 @router.get("/balance", summary="Получить текущий баланс Usersbox")
-async def get_usersbox_balance():
+async def get_usersbox_balance(http: HttpClientRegistry = Depends(get_http)):
     try:
-        balance = await parse_me()
+        balance = await parse_me(client=http.usersbox)
     except Exception as e:
         raise HTTPException(status_code=502, detail=str(e))
     return balance
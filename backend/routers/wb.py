@@ -1,22 +1,26 @@
-from fastapi import APIRouter, Depends, Query, Request, BackgroundTasks, HTTPException
-from fastapi.responses import FileResponse
-import json, tempfile, os, uuid, asyncio
+from fastapi import APIRouter, Depends, Query, Request, HTTPException
+import asyncio
 from typing import List, Optional
-from datetime import datetime
 
-from dependencies import get_current_user
+from dependencies import get_current_user, get_http, get_job_queue, get_redis_bin
 from schemas.wb import WBParams, SellerOut
+from schemas.jobs import JobStatusOut, JobResultsPage
+from sse_starlette.sse import EventSourceResponse
 
 from services.wb_service import collect_data
 from services.db_utils import get_seller, update_seller_sale_count
+from services.job_queue import JobQueue
+from parser.parser_cfg import settings as ParserConfig
 from services.collection_log_utils import get_last_collection, touch_collection
 
-from utils.excel import generate_excel
-from utils.wb_utils import _collect_subcategories
-from services.db_utils import _save_parse_data
+from utils.excel import xlsx_response
+from utils.streaming import json_stream_response
+from services.job_progress import iter_results, iter_rows, job_events, read_job, read_progress, read_results
+from utils.category_index import category_index
+from services.sweep import SweepRegistry
 
 from parser.rusprofile import parse_companies
-from parser.HTTPClient import AsyncHttpClient
+from parser.client_registry import HttpClientRegistry
 
 router = APIRouter()
 
@@ -25,119 +29,83 @@ def get_redis(request: Request):
 
 @router.post("/cat/jobs", summary="Запустить фоновый парсинг одной категории")
 async def start_cat_parse(
-    background_tasks: BackgroundTasks,
     params: WBParams = Depends(),
     region_id: str = Query(..., pattern=r"^\d{2}(?:[,;]\d{2})*$"),
     limit: Optional[int] = Query(None, ge=0),
-    redis=Depends(get_redis),
+    jobs: JobQueue = Depends(get_job_queue),
 ):
-    job_id = uuid.uuid4().hex
-
-    initial = {"status": "pending", "result": None, "error": None}
-    await redis.set(f"job:{job_id}", json.dumps(initial, default=str))
-
-    background_tasks.add_task(
-        run_cat_parse_job,
-        job_id,
-        redis,
-        params,
-        region_id,
-        limit,
+    job_id = await jobs.enqueue(
+        "cat_parse",
+        {"params": params.model_dump(mode="json"), "region_id": region_id, "limit": limit},
     )
     return {"job_id": job_id}
 
-async def run_cat_parse_job(
-    job_id: str,
-    redis,
-    params: WBParams,
-    region_id: str,
-    limit: Optional[int],
-):
-
-    raw = await redis.get(f"job:{job_id}")
-    job = json.loads(raw)
-    job["status"] = "in_progress"
-    await redis.set(f"job:{job_id}", json.dumps(job, default=str))
-
-    try:
-
-        data, _log = await collect_data(params, region_id=region_id, limit=limit)
-
-        touch_collection("cat", {**params.dict(exclude_none=True), "region_id": region_id})
-        _save_parse_data(
-            {
-                "category": params.cat,
-                "shard": params.shard,
-                "region_id": region_id,
-                "sale_item_count": params.saleItemCount,
-                "max_sale_count": params.maxSaleCount or 0,
-                "reg_date": params.regDate or datetime.utcnow(),
-                "max_reg_date": params.maxRegDate or datetime.utcnow(),
-                "data": [item.dict() for item in data],
-            }
-        )
+async def _load_job(redis, job_id: str) -> dict:
+    job = await read_job(redis, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
-        job["status"] = "finished"
-        job["result"] = [item.dict() for item in data]
-        await redis.set(f"job:{job_id}", json.dumps(job, default=str))
+async def _finished_job(redis, job_id: str) -> dict:
+    job = await _load_job(redis, job_id)
+    if job["status"] in ("pending", "in_progress"):
+        raise HTTPException(status_code=202, detail="Job still in progress")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Job failed: {job.get('error')}")
+    return job
 
-    except Exception as e:
-        job["status"] = "failed"
-        job["error"] = str(e)
-        await redis.set(f"job:{job_id}", json.dumps(job, default=str))
+@router.get(
+    "/cat/jobs/{job_id}/status",
+    response_model=JobStatusOut,
+    summary="Статус задачи парсинга категории",
+)
+async def get_cat_job_status(job_id: str, redis=Depends(get_redis_bin)):
+    job = await _load_job(redis, job_id)
+    progress = await read_progress(redis, job_id)
+    return {"job_id": job_id, "status": job["status"], "error": job.get("error"), "progress": progress}
 
-@router.get("/cat/jobs/{job_id}/status", summary="Статус задачи парсинга категории")
-async def get_cat_job_status(
+@router.get(
+    "/cat/jobs/{job_id}/results",
+    response_model=JobResultsPage,
+    summary="Страница результатов (доступна, пока задача идёт)",
+)
+async def get_cat_job_results(
     job_id: str,
-    redis=Depends(get_redis),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    redis=Depends(get_redis_bin),
 ):
-    raw = await redis.get(f"job:{job_id}")
-    if not raw:
-        raise HTTPException(status_code=404, detail="Job not found")
-    job = json.loads(raw)
-    return {"job_id": job_id, "status": job["status"], "error": job.get("error")}
+    job = await _load_job(redis, job_id)
+    progress = await read_progress(redis, job_id)
+    items = await read_results(redis, job_id, offset, limit)
+    return {"job_id": job_id, "status": job["status"], "total": progress["sellers"], "offset": offset, "items": items}
+
+@router.get("/cat/jobs/{job_id}/events", summary="SSE: прогресс и новые строки задачи")
+async def get_cat_job_events(
+    request: Request,
+    job_id: str,
+    after: int = Query(0, ge=0, description="Смещение, с которого слать строки"),
+    redis=Depends(get_redis_bin),
+):
+    await _load_job(redis, job_id)
+    last_id = request.headers.get("last-event-id")
+    if last_id and last_id.isdigit():
+        after = int(last_id)
+    return EventSourceResponse(job_events(redis, job_id, after))
 
 @router.get(
     "/cat/jobs/{job_id}/result",
     response_model=List[SellerOut],
     summary="Результат задачи парсинга категории",
 )
-async def get_cat_job_result(
-    job_id: str,
-    redis=Depends(get_redis),
-):
-    raw = await redis.get(f"job:{job_id}")
-    if not raw:
-        raise HTTPException(status_code=404, detail="Job not found")
-    job = json.loads(raw)
-    if job["status"] in ("pending", "in_progress"):
-        raise HTTPException(status_code=202, detail="Job still in progress")
-    if job["status"] == "failed":
-        raise HTTPException(status_code=500, detail=f"Job failed: {job.get('error')}")
-    return job["result"]
+async def get_cat_job_result(job_id: str, redis=Depends(get_redis_bin)):
+    await _finished_job(redis, job_id)
+    return json_stream_response(iter_results(redis, job_id), envelope=False)
 
 @router.get("/cat/jobs/{job_id}/excel", summary="Скачать Excel задачи парсинга категории")
-async def download_cat_job_excel(
-    job_id: str,
-    redis=Depends(get_redis),
-):
-    raw = await redis.get(f"job:{job_id}")
-    if not raw:
-        raise HTTPException(status_code=404, detail="Job not found")
-    job = json.loads(raw)
-    if job["status"] in ("pending", "in_progress"):
-        raise HTTPException(status_code=202, detail="Job still in progress")
-    if job["status"] == "failed":
-        raise HTTPException(status_code=500, detail=f"Job failed: {job.get('error')}")
-
-    data = job.get("result") or []
-    filename = f"sellers_{job_id}.xlsx"
-    generate_excel(data, filename)
-    return FileResponse(
-        path=filename,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename=filename,
-    )
+async def get_cat_job_excel(job_id: str, redis=Depends(get_redis_bin)):
+    await _finished_job(redis, job_id)
+    return xlsx_response(iter_rows(redis, job_id), f"sellers_{job_id}.xlsx")
 
 @router.get(
     "/cat",
@@ -147,6 +115,7 @@ async def get_sellers(
     params: WBParams = Depends(),
     region_id: str = Query(..., pattern=r"^\d{2}(?:[,;]\d{2})*$", description="Код региона"),
     limit: Optional[int] = Query(None, ge=0, description="Максимальное число продавцов"),
+    http: HttpClientRegistry = Depends(get_http),
     #user=Depends(get_current_user),
 ):
     if limit == 0:
@@ -155,7 +124,8 @@ async def get_sellers(
     data, flag_limit = await collect_data(
         params,
         region_id=region_id,
-        limit=limit
+        limit=limit,
+        http=http,
     )
     payload = _clean_params(
         {
@@ -163,7 +133,7 @@ async def get_sellers(
             "region_id": region_id,
         }
     )
-    touch_collection("cat", payload)
+    await touch_collection("cat", payload)
     return data
 
 @router.get("/cat/xlsx")
@@ -171,20 +141,11 @@ async def download_sellers_excel(
     params: WBParams = Depends(),
     region_id: str = Query(..., pattern=r"^\d{2}(?:[,;]\d{2})*$", description="Код региона"),
     limit: Optional[int] = Query(None, ge=0, description="Максимальное число продавцов"),
+    http: HttpClientRegistry = Depends(get_http),
     user=Depends(get_current_user),
 ):
-    data, flag = await collect_data(params, region_id=region_id, limit=limit)
-    path = os.path.join(
-        tempfile.gettempdir(),
-        f"sellers_{uuid.uuid4().hex}.xlsx"
-    )
-    generate_excel(data, filename=path)
-
-    return FileResponse(
-        path,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename="sellers.xlsx"
-    )
+    data, flag = await collect_data(params, region_id=region_id, limit=limit, http=http)
+    return xlsx_response(data, "sellers.xlsx")
 
 @router.get(
     "/all",
@@ -201,13 +162,15 @@ async def get_all_categories(
     maxRegDate: Optional[str] = Query(None, description="Макс. дата регистр. YYYY-MM-DD"),
     limit: Optional[int] = Query(None, ge=1, description="Максимальное число продавцов"),
     concurrency: int = Query(3, ge=1, le=20, description="Одновременных запросов к WB API"),
+    http: HttpClientRegistry = Depends(get_http),
     # user=Depends(get_current_user),
 ):
     """
     Параллельный парсинг всех подкатегорий с контролем limit и concurrency.
     """
 
-    subcats = list(_collect_subcategories(main_id))
+    subcats = category_index.leaves(main_id)
+    sweep = SweepRegistry(subcats)
 
     sem = asyncio.Semaphore(concurrency)
     results: List[SellerOut] = []
@@ -221,7 +184,13 @@ async def get_all_categories(
         )
 
         async with sem:
-            data, _ = await collect_data(params, region_id=region_id, limit=limit and max(0, limit - len(results)))
+            data, _ = await collect_data(
+                params,
+                region_id=region_id,
+                limit=limit and max(0, limit - len(results)),
+                http=http,
+                sweep=sweep,
+            )
             return data
 
     tasks = {asyncio.create_task(fetch_cat(cat)): cat for cat in subcats}
@@ -240,6 +209,7 @@ async def get_all_categories(
             if not t.done():
                 t.cancel()
 
+    sweep.attribute(results)
     if results:
         payload = _clean_params({
             "main_id": main_id,
@@ -248,7 +218,7 @@ async def get_all_categories(
             "saleItemCount": saleItemCount,
             "maxSaleCount": maxSaleCount,
         })
-        touch_collection("all", payload)
+        await touch_collection("all", payload)
 
     return results
 
@@ -263,10 +233,13 @@ async def download_all_categories_excel(
     regDate: Optional[str] = Query(None, description="Мин. дата регистр. YYYY-MM-DD"),
     maxRegDate: Optional[str] = Query(None, description="Макс. дата регистр. YYYY-MM-DD"),
     limit: Optional[int] = Query(None, ge=0, description="Максимальное число продавцов"),
+    http: HttpClientRegistry = Depends(get_http),
     user=Depends(get_current_user),
 ):
     result = []
-    for cat in _collect_subcategories(main_id):
+    subcats = category_index.leaves(main_id)
+    sweep = SweepRegistry(subcats)
+    for cat in subcats:
         limit = limit - len(result)
         params = WBParams(
             cat=cat.get('query'),
@@ -281,7 +254,9 @@ async def download_all_categories_excel(
         data, flag_limit = await collect_data(
             params,
             region_id=region_id,
-            limit=limit
+            limit=limit,
+            http=http,
+            sweep=sweep,
         )
         for d in data:
             result.append(d)
@@ -289,17 +264,8 @@ async def download_all_categories_excel(
         if flag_limit or len(result) >= limit:
             break
 
-    path = os.path.join(
-        tempfile.gettempdir(),
-        f"sellers_{uuid.uuid4().hex}.xlsx"
-    )
-    generate_excel(result, filename=path)
-
-    return FileResponse(
-        path,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename="sellers.xlsx"
-    )
+    sweep.attribute(result)
+    return xlsx_response(result, "sellers.xlsx")
 
 
 @router.get(
@@ -308,12 +274,13 @@ async def download_all_categories_excel(
 )
 async def get_all_categories(
     query: str = Query(..., description="OGRN/OGRNIP &type=ul/&type=ip"),
-    seller_id: int = Query(..., description="Айди продавца")
-
+    seller_id: int = Query(..., description="Айди продавца"),
+    http: HttpClientRegistry = Depends(get_http),
 ):
     a = await parse_companies(
         ids = [query],
-        seller_id = seller_id
+        seller_id = seller_id,
+        client = http.rusprofile,
     )
 
     return a
@@ -335,13 +302,13 @@ def _clean_params(raw: dict) -> dict:
 @router.get("/cat/last")
 async def last_cat(request: Request):
     params = _clean_params(dict(request.query_params))
-    ts = get_last_collection("cat", params)
+    ts = await get_last_collection("cat", params)
     return {"last_collected": ts}
 
 @router.get("/all/last")
 async def last_all(request: Request):
     params = _clean_params(dict(request.query_params))
-    ts = get_last_collection("all", params)
+    ts = await get_last_collection("all", params)
     return {"last_collected": ts}
 
 @router.post(
@@ -350,6 +317,7 @@ async def last_all(request: Request):
 )
 async def update_seller_data(
     seller_id: int = Query(..., ge=1, description="ID продавца Wildberries"),
+    http: HttpClientRegistry = Depends(get_http),
 ):
     """
     • Делаем один GET на
@@ -364,16 +332,37 @@ async def update_seller_data(
         f"{seller_id}"
     )
 
-    async with AsyncHttpClient(proxy="random") as client:
-        payload = await client.fetch_json(url)
+    payload = await http.wb_shipment.fetch_json(url)
 
     sale_q = payload.get("saleItemQuantity")
     if sale_q is None:
         return {"status": "error", "detail": "saleItemQuantity not found"}
 
     try:
-        update_seller_sale_count(seller_id, sale_q)
+        await update_seller_sale_count(seller_id, sale_q)
     except Exception as e:
         return {"status": "error", "detail": str(e)}
 
-    return {"status": "ok", "saleItemQuantity": sale_q}
\ No newline at end of file
+    return {"status": "ok", "saleItemQuantity": sale_q}
+
+@router.post(
+    "/refresh_sale_counts",
+    summary="Фоновое инкрементальное обновление sale_count по всей базе",
+)
+async def start_refresh_sale_counts(
+    budget: int = Query(ParserConfig.REFRESH_BUDGET, ge=1, description="Запросов к WB на прогон"),
+    concurrency: int = Query(ParserConfig.SHIPMENT_CONCURRENCY, ge=1, le=200),
+    jobs: JobQueue = Depends(get_job_queue),
+):
+    """
+    Пачками обходит sellers от самых несвежих, обновляет sale_count
+    изменившимся и last_refreshed_at всем опрошенным. Статус и итоговая
+    статистика — GET /wb/refresh_sale_counts/{job_id}.
+    """
+    job_id = await jobs.enqueue("refresh_sale_counts", {"budget": budget, "concurrency": concurrency})
+    return {"job_id": job_id}
+
+@router.get("/refresh_sale_counts/{job_id}", summary="Статус и статистика обновления sale_count")
+async def get_refresh_job(job_id: str, redis=Depends(get_redis)):
+    job = await _load_job(redis, job_id)
+    return {"job_id": job_id, **job}
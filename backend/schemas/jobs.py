@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import Optional, List
+
+from schemas.wb import SellerOut
+
+class JobProgressOut(BaseModel):
+    subcats_total: int = 0
+    subcats_done: int = 0
+    sellers: int = 0
+    requests: int = 0
+
+class JobStatusOut(BaseModel):
+    job_id: str
+    status: str
+    error: Optional[str] = None
+    progress: JobProgressOut
+
+class JobResultsPage(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    offset: int
+    items: List[SellerOut]
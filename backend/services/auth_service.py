@@ -1,7 +1,8 @@
 from datetime import datetime, timedelta
 from typing import Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 from jose import jwt
 
@@ -11,21 +12,20 @@ from schemas.auth import UserCreate, UserRead
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def get_user_by_username(db: Session, username: str) -> Optional[UserModel]:
-    return db.query(UserModel).filter(UserModel.username == username).first()
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[UserModel]:
+    return await db.scalar(select(UserModel).where(UserModel.username == username))
 
-def register_user(db: Session, user: UserCreate) -> UserRead:
-    if get_user_by_username(db, user.username):
+async def register_user(db: AsyncSession, user: UserCreate) -> UserRead:
+    if await get_user_by_username(db, user.username):
         raise ValueError("Username already exists")
     hashed = pwd_context.hash(user.password)
     db_user = UserModel(username=user.username, hashed_password=hashed)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     return UserRead(username=db_user.username)
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[UserRead]:
-    db_user = get_user_by_username(db, username)
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[UserRead]:
+    db_user = await get_user_by_username(db, username)
     if not db_user or not pwd_context.verify(password, db_user.hashed_password):
         return None
     return UserRead(username=db_user.username)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from parser.parser_cfg import settings as ParserConfig
+from services import db_utils as dbu
+
+logger = logging.getLogger(__name__)
+
+CompanyCreds = Dict[str, Optional[str]]     # поля CompanyInfo без seller_id
+
+_FIELDS = ("inn", "ogrn", "ogrnip", "tax_office", "director")
+
+
+def company_key(query: str) -> str:
+    """
+    "1027700132195&type=ul" / "3…&type=ip" / "7707083893" → только номер.
+    ОГРН (13), ОГРНИП (15) и ИНН (10/12) различаются длиной — тип не нужен.
+    """
+    return str(query).split("&", 1)[0].strip()
+
+
+class CompanyInfoCache:
+    """
+    Кэш карточек rusprofile перед поиском и загрузкой карточки:
+    in-process LRU → таблица company_info.
+
+    Найденные компании живут `ttl`, «не найдено» — `negative_ttl`
+    (карточка могла появиться). Ошибки и таймауты не кэшируются.
+    Как и SupplierInfoCache, новые записи копятся и уходят в БД пачкой
+    (`flush`).
+
+    Отдельно — адреса карточек (таблица company_card_urls): с ними
+    повторный запрос идёт сразу в карточку, минуя поиск.
+    """
+
+    FLUSH_SIZE = 200
+
+    def __init__(
+        self,
+        maxsize: int = ParserConfig.COMPANY_CACHE_LRU_SIZE,
+        ttl: timedelta = timedelta(days=ParserConfig.COMPANY_CACHE_TTL_DAYS),
+        negative_ttl: timedelta = timedelta(days=ParserConfig.COMPANY_NEGATIVE_TTL_DAYS),
+    ) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._lru: "OrderedDict[str, Tuple[float, CompanyCreds | None]]" = OrderedDict()
+        self._pending: Dict[str, CompanyCreds | None] = {}
+        self._urls: "OrderedDict[str, str]" = OrderedDict()
+        self._pending_urls: Dict[str, str] = {}
+
+    # ───────── LRU ──────────────────────────────────────────────
+    def _lru_get(self, key: str) -> Tuple[bool, CompanyCreds | None]:
+        item = self._lru.get(key)
+        if item is None:
+            return False, None
+        ts, creds = item
+        ttl = self._ttl if creds is not None else self._negative_ttl
+        if time.time() - ts > ttl.total_seconds():
+            self._lru.pop(key, None)
+            return False, None
+        self._lru.move_to_end(key)
+        return True, creds
+
+    def _lru_put(self, key: str, creds: CompanyCreds | None, ts: float | None = None) -> None:
+        if not self._maxsize:
+            return
+        self._lru[key] = (ts or time.time(), creds)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self._maxsize:
+            self._lru.popitem(last=False)
+
+    # ───────── API ──────────────────────────────────────────────
+    async def get(self, query: str) -> Tuple[bool, CompanyCreds | None]:
+        """
+        (True, creds) — компания известна; (True, None) — недавно не нашлась;
+        (False, None) — в кэше нет, нужно идти в rusprofile.
+        """
+        key = company_key(query)
+        hit, creds = self._lru_get(key)
+        if hit:
+            return hit, creds
+        if key in self._pending:
+            return True, self._pending[key]
+
+        now = datetime.now(tz=timezone.utc)
+        try:
+            rows = await dbu.get_company_infos([key], now - self._ttl, now - self._negative_ttl)
+        except Exception as e:
+            logger.warning("company_info lookup failed: %s", e)
+            return False, None
+        if not rows:
+            return False, None
+        r = rows[0]
+        creds = {f: getattr(r, f) for f in _FIELDS} if r.found else None
+        if creds is not None:
+            creds["tax_office"] = creds["tax_office"] or ""
+        self._lru_put(key, creds, r.fetched_at.timestamp())
+        return True, creds
+
+    async def put(self, query: str, creds: CompanyCreds | None) -> None:
+        key = company_key(query)
+        self._lru_put(key, creds)
+        self._pending[key] = creds
+        if len(self._pending) >= self.FLUSH_SIZE:
+            await self.flush()
+
+    # ───────── адреса карточек ──────────────────────────────────
+    def _url_put(self, key: str, url: str) -> None:
+        if not self._maxsize:
+            return
+        self._urls[key] = url
+        self._urls.move_to_end(key)
+        while len(self._urls) > self._maxsize:
+            self._urls.popitem(last=False)
+
+    async def get_card_url(self, query: str) -> str | None:
+        key = company_key(query)
+        url = self._urls.get(key) or self._pending_urls.get(key)
+        if url is not None:
+            return url
+        try:
+            url = await dbu.get_card_url(key)
+        except Exception as e:
+            logger.warning("company_card_urls lookup failed: %s", e)
+            return None
+        if url is not None:
+            self._url_put(key, url)
+        return url
+
+    async def put_card_url(self, query: str, url: str) -> None:
+        key = company_key(query)
+        if self._urls.get(key) == url:
+            return
+        self._url_put(key, url)
+        self._pending_urls[key] = url
+        if len(self._pending_urls) >= self.FLUSH_SIZE:
+            await self.flush()
+
+    async def forget_card_url(self, query: str) -> None:
+        """Карточка по сохранённому адресу не открылась — адрес больше не верен."""
+        key = company_key(query)
+        self._urls.pop(key, None)
+        self._pending_urls.pop(key, None)
+        try:
+            await dbu.delete_card_url(key)
+        except Exception as e:
+            logger.warning("company_card_urls delete failed: %s", e)
+
+    async def flush(self) -> None:
+        if self._pending:
+            batch, self._pending = self._pending, {}
+            try:
+                await dbu.upsert_company_infos(batch)
+            except Exception as e:
+                logger.warning("company_info upsert failed (%s rows): %s", len(batch), e)
+        if self._pending_urls:
+            urls, self._pending_urls = self._pending_urls, {}
+            try:
+                await dbu.upsert_card_urls(urls)
+            except Exception as e:
+                logger.warning("company_card_urls upsert failed (%s rows): %s", len(urls), e)
+
+
+company_cache = CompanyInfoCache()
+
+__all__ = ["CompanyInfoCache", "company_cache", "company_key"]
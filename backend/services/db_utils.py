@@ -1,5 +1,7 @@
-from typing import List, Tuple, Set, Optional
-from sqlalchemy.orm import Session
+from typing import List, Tuple, Set, Optional, Dict
+from sqlalchemy import Integer, column, func, or_, select, update, delete, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.engine import Row
 import logging
 from datetime import datetime, timezone, timedelta
@@ -7,153 +9,377 @@ from datetime import datetime, timezone, timedelta
 from models.parse_data import ParseData
 from models.seller import Seller as SellerModel
 from models.seller_contact_cache import SellerContactCache as CacheModel
-from database import SessionLocal
+from models.seller_category import SellerCategory as CategoryModel
+from models.supplier_info import SupplierInfo as SupplierInfoModel
+from models.company_info import CompanyCardUrl, CompanyRecord
+from database import AsyncSessionLocal
 from schemas.wb import SellerOut
+from utils.wb_utils import region_code
+from utils.rowpack import pack_rows
 
 logger = logging.getLogger(__name__)
 
 def _now_utc() -> datetime:
     return datetime.now(tz=timezone.utc)
 
-def get_cached(supplier_id: int) -> Optional[CacheModel]:
-    with SessionLocal() as db:
-        return (
-            db.query(CacheModel)
-              .filter(CacheModel.supplier_id == supplier_id)
-              .first()
+async def get_cached(supplier_id: int) -> Optional[CacheModel]:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(
+            select(CacheModel).where(CacheModel.supplier_id == supplier_id)
         )
 
-def _save_parse_data(entry: dict) -> None:
-    with SessionLocal() as db:
-        db.add(ParseData(**entry))
-        db.commit()
+async def _save_parse_data(entry: dict) -> None:
+    """`entry["data"]` — список строк; в БД уходит упакованным (utils.rowpack)."""
+    entry = dict(entry)
+    rows = entry.pop("data", None) or []
+    async with AsyncSessionLocal() as db:
+        db.add(ParseData(**entry, row_count=len(rows), payload=pack_rows(rows)))
+        await db.commit()
 
-def get_existing_seller_ids(seller_ids: List[int]) -> List[Row]:
+async def get_existing_seller_ids(seller_ids: List[int]) -> List[Row]:
     """Возвращает Row‑объекты (supplier_id, ogrn, ogrnip) для фильтрации по региону."""
-    with SessionLocal() as db:
-        rows: List[Row] = (
-            db.query(
+    async with AsyncSessionLocal() as db:
+        res = await db.execute(
+            select(
                 SellerModel.supplier_id,
                 SellerModel.ogrn,
                 SellerModel.ogrnip,
-            ).filter(SellerModel.supplier_id.in_(seller_ids)).all()
+            ).where(SellerModel.supplier_id.in_(seller_ids))
         )
-    return rows
-
-def add_to_cache(s: SellerOut) -> None:
-    with SessionLocal() as db:
-        db.merge(
-            CacheModel(
-                supplier_id=s.seller_id,
-                store_name=s.store_name,
-                inn=s.inn,
-                url=s.url,
-                sale_count=s.saleCount,
-                reg_date=s.reg_date,
-                tax_office=s.tax_office,
-                director=s.director or None,
-                ogrn=s.ogrn if s.ogrn and len(s.ogrn) == 13 else None,
-                ogrnip=s.ogrnip if s.ogrnip and len(s.ogrnip) == 15 else None,
-                last_try_at=_now_utc(),
-            )
+        return list(res.all())
+
+_CHUNK = 1000
+
+
+def _chunks(items: list, size: int = _CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+def _dedupe(sellers: List[SellerOut]) -> List[SellerOut]:
+    """ON CONFLICT не переживает два одинаковых ключа в одном INSERT."""
+    return list({s.seller_id: s for s in sellers}.values())
+
+def _seller_row(s: SellerOut) -> Dict:
+    ogrn = s.ogrn if s.ogrn and len(s.ogrn) == 13 else None
+    ogrnip = s.ogrnip if s.ogrnip and len(s.ogrnip) == 15 else None
+    return dict(
+        supplier_id=s.seller_id,
+        store_name=s.store_name,
+        inn=s.inn,
+        url=s.url,
+        sale_count=s.saleCount,
+        reg_date=s.reg_date,
+        tax_office=s.tax_office,
+        director=s.director or None,
+        ogrn=ogrn,
+        ogrnip=ogrnip,
+        region_code=region_code(ogrn, ogrnip, s.inn),
+    )
+
+async def get_known_sellers(
+    seller_ids: List[int],
+    retry_deadline: Optional[datetime] = None,
+) -> Tuple[List[Row], Set[int]]:
+    """
+    Одна сессия на страницу каталога:
+    • Row (supplier_id, ogrn, ogrnip) уже сохранённых продавцов;
+    • supplier_id из кэша без контактов, которые проверяли после `retry_deadline`.
+    """
+    async with AsyncSessionLocal() as db:
+        res = await db.execute(
+            select(
+                SellerModel.supplier_id,
+                SellerModel.ogrn,
+                SellerModel.ogrnip,
+            ).where(SellerModel.supplier_id.in_(seller_ids))
         )
-        db.commit()
+        rows: List[Row] = list(res.all())
+        recent: Set[int] = set()
+        if retry_deadline is not None:
+            recent = set(await db.scalars(
+                select(CacheModel.supplier_id).where(
+                    CacheModel.supplier_id.in_(seller_ids),
+                    CacheModel.last_try_at > retry_deadline,
+                )
+            ))
+    return rows, recent
 
-def touch_cache(supplier_id: int) -> None:
-    """Обновляет last_try_at у записи-кэша."""
-    with SessionLocal() as db:
-        rec = (
-            db.query(CacheModel)
-              .filter(CacheModel.supplier_id == supplier_id)
-              .first()
+async def get_cached_many(supplier_ids: List[int], db: AsyncSession) -> Dict[int, CacheModel]:
+    if not supplier_ids:
+        return {}
+    rows = await db.scalars(select(CacheModel).where(CacheModel.supplier_id.in_(supplier_ids)))
+    return {r.supplier_id: r for r in rows}
+
+async def upsert_sellers(sellers: List[SellerOut], db: AsyncSession) -> None:
+    """INSERT … ON CONFLICT (supplier_id) DO UPDATE пачками, без commit."""
+    rows = [
+        {**_seller_row(s), "phone": s.phone or None, "email": s.email or None, "categories": s.categories}
+        for s in _dedupe(sellers)
+    ]
+    for chunk in _chunks(rows):
+        stmt = pg_insert(SellerModel).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SellerModel.supplier_id],
+            set_={
+                c: stmt.excluded[c] for c in chunk[0]
+                if c not in ("supplier_id", "categories")
+            } | {"categories": func.coalesce(stmt.excluded.categories, SellerModel.categories)},
         )
-        if rec:
-            rec.last_try_at = _now_utc()
-            db.commit()
-
-def remove_from_cache(supplier_id: int) -> None:
-    with SessionLocal() as db:
-        db.query(CacheModel).filter(
-            CacheModel.supplier_id == supplier_id
-        ).delete(synchronize_session=False)
-        db.commit()
-
-def add_sellers(resp: list) -> None:
+        await db.execute(stmt)
+    await add_categories({s.categories for s in sellers if s.categories}, db)
+
+async def add_categories(names: Set[str], db: AsyncSession) -> None:
+    """Пополняет справочник seller_categories (для /search/distinct-categories)."""
+    if not names:
+        return
+    await db.execute(
+        pg_insert(CategoryModel)
+          .values([{"name": n} for n in sorted(names)])
+          .on_conflict_do_nothing(index_elements=[CategoryModel.name])
+    )
+
+async def upsert_cache(sellers: List[SellerOut], db: AsyncSession) -> None:
+    """Кэш продавцов без контактов: вставка или обновление + last_try_at=now()."""
+    rows = [_seller_row(s) for s in _dedupe(sellers)]
+    for chunk in _chunks(rows):
+        stmt = pg_insert(CacheModel).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CacheModel.supplier_id],
+            set_={c: stmt.excluded[c] for c in chunk[0] if c != "supplier_id"}
+                 | {"last_try_at": func.now()},
+        )
+        await db.execute(stmt)
+
+async def touch_cache_many(supplier_ids: List[int], db: AsyncSession) -> None:
+    if not supplier_ids:
+        return
+    await db.execute(
+        update(CacheModel)
+          .where(CacheModel.supplier_id.in_(supplier_ids))
+          .values(last_try_at=func.now())
+          .execution_options(synchronize_session=False)
+    )
+
+async def remove_from_cache_many(supplier_ids: List[int], db: AsyncSession) -> None:
+    if not supplier_ids:
+        return
+    await db.execute(
+        delete(CacheModel)
+          .where(CacheModel.supplier_id.in_(supplier_ids))
+          .execution_options(synchronize_session=False)
+    )
+
+async def save_collected(
+    found: List[SellerOut],
+    no_contacts: List[SellerOut],
+    touched_ids: List[int],
+) -> None:
+    """
+    Итог одного collect_data одной транзакцией:
+    продавцы с телефоном → sellers (и из кэша долой), остальные → кэш,
+    `touched_ids` — недавно проверенные, им только обновляем last_try_at.
+    """
+    with_phone = [s for s in found if s.phone]
+    to_cache = [s for s in found if not s.phone] + list(no_contacts)
+    async with AsyncSessionLocal() as db:
+        await upsert_sellers(with_phone, db)
+        await remove_from_cache_many([s.seller_id for s in with_phone], db)
+        await upsert_cache(to_cache, db)
+        await touch_cache_many(touched_ids, db)
+        await db.commit()
+
+async def add_to_cache(s: SellerOut) -> None:
+    await save_collected([], [s], [])
+
+async def touch_cache(supplier_id: int) -> None:
+    """Обновляет last_try_at у записи-кэша."""
+    async with AsyncSessionLocal() as db:
+        await touch_cache_many([supplier_id], db)
+        await db.commit()
+
+async def remove_from_cache(supplier_id: int) -> None:
+    async with AsyncSessionLocal() as db:
+        await remove_from_cache_many([supplier_id], db)
+        await db.commit()
+
+async def add_sellers(resp: list) -> None:
     """
     Bulk-вставка списка SellerOut. Если у продавца нет телефонов —
     отправляем в кэш; иначе — в основную таблицу sellers.
     """
-    db = SessionLocal()
-    try:
-        for s in resp:
-            if not s.phone:
-                add_to_cache(s)
-                continue
-            remove_from_cache(s.seller_id)
-            db.add(
-                SellerModel(
-                    supplier_id=s.seller_id,
-                    store_name=s.store_name,
-                    inn=s.inn,
-                    url=s.url,
-                    sale_count=s.saleCount,
-                    reg_date=s.reg_date,
-                    tax_office=s.tax_office,
-                    director=s.director or None,          # ← NEW
-                    ogrn=s.ogrn if s.ogrn and len(s.ogrn) == 13 else None,
-                    ogrnip=s.ogrnip if s.ogrnip and len(s.ogrnip) == 15 else None,
-                    phone=s.phone or None,
-                    email=s.email or None,
-                    categories=s.categories
-                )
-            )
-        db.commit()
-    finally:
-        db.close()
+    await save_collected(list(resp), [], [])
+
+
+async def add_seller(s: SellerOut) -> None:
+    await save_collected([s], [], [])
 
 
-def add_seller(s: SellerOut) -> None:
-    if not s.phone:
-        add_to_cache(s)
+async def get_seller(supplier_id: int) -> Optional[SellerModel]:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(
+            select(SellerModel).where(SellerModel.supplier_id == supplier_id)
+        )
+
+async def update_seller_sale_count(seller_id: int, sale_count: int) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(SellerModel)
+              .where(SellerModel.supplier_id == seller_id)
+              .values(sale_count=sale_count, last_refreshed_at=func.now())
+        )
+        await db.commit()
+
+async def get_stale_sellers(limit: int, before: datetime) -> List[Tuple[int, int]]:
+    """
+    (supplier_id, sale_count) самых давно не обновлявшихся продавцов:
+    сначала ни разу не обновлённые, потом по last_refreshed_at.
+    `before` — начало прогона: то, что уже обновлено в нём, не берём.
+    """
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(
+            select(SellerModel.supplier_id, SellerModel.sale_count)
+            .where(or_(SellerModel.last_refreshed_at.is_(None), SellerModel.last_refreshed_at < before))
+            .order_by(SellerModel.last_refreshed_at.asc().nulls_first(), SellerModel.id)
+            .limit(limit)
+        )
+        return [(sid, sc) for sid, sc in rows]
+
+async def apply_sale_counts(
+    changed: Dict[int, int],
+    refreshed: List[int],
+    at: datetime,
+) -> None:
+    """
+    Одна транзакция на пачку: всем `refreshed` — last_refreshed_at,
+    изменившимся — новый sale_count одним UPDATE … FROM (VALUES …).
+    """
+    if not refreshed:
         return
-    remove_from_cache(s.seller_id)
-
-    with SessionLocal() as db:
-        db.merge(
-            SellerModel(
-                supplier_id=s.seller_id,
-                store_name=s.store_name,
-                inn=s.inn,
-                url=s.url,
-                sale_count=s.saleCount,
-                reg_date=s.reg_date,
-                tax_office=s.tax_office,
-                director=s.director or None,
-                ogrn=s.ogrn if s.ogrn and len(s.ogrn) == 13 else None,
-                ogrnip=s.ogrnip if s.ogrnip and len(s.ogrnip) == 15 else None,
-                phone=s.phone or None,
-                email=s.email or None,
-                categories=s.categories
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(SellerModel)
+            .where(SellerModel.supplier_id.in_(refreshed))
+            .values(last_refreshed_at=at)
+            .execution_options(synchronize_session=False)
+        )
+        if changed:
+            v = values(column("sid", Integer), column("sc", Integer), name="v").data(list(changed.items()))
+            await db.execute(
+                update(SellerModel)
+                .where(SellerModel.supplier_id == v.c.sid)
+                .values(sale_count=v.c.sc)
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+
+async def get_supplier_infos(supplier_ids: List[int], fresh_after: datetime) -> List[SupplierInfoModel]:
+    """Реквизиты supplier-by-id, полученные не раньше `fresh_after`."""
+    if not supplier_ids:
+        return []
+    async with AsyncSessionLocal() as db:
+        rows = await db.scalars(
+            select(SupplierInfoModel).where(
+                SupplierInfoModel.supplier_id.in_(supplier_ids),
+                SupplierInfoModel.fetched_at >= fresh_after,
             )
         )
-        db.commit()
+        return list(rows)
 
+async def upsert_supplier_infos(infos: Dict[int, Dict[str, str]]) -> None:
+    """Один INSERT … ON CONFLICT на всю пачку реквизитов."""
+    if not infos:
+        return
+    stmt = pg_insert(SupplierInfoModel).values([
+        dict(
+            supplier_id=sid,
+            inn=info["inn"],
+            ogrn=info.get("ogrn") or None,
+            ogrnip=info.get("ogrnip") or None,
+            trademark=info.get("trademark") or None,
+        )
+        for sid, info in infos.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SupplierInfoModel.supplier_id],
+        set_={
+            "inn": stmt.excluded.inn,
+            "ogrn": stmt.excluded.ogrn,
+            "ogrnip": stmt.excluded.ogrnip,
+            "trademark": stmt.excluded.trademark,
+            "fetched_at": func.now(),
+        },
+    )
+    async with AsyncSessionLocal() as db:
+        await db.execute(stmt)
+        await db.commit()
 
-def get_seller(supplier_id: int) -> Optional[SellerModel]:
-    with SessionLocal() as db:
-        return (
-            db.query(SellerModel)
-              .filter(SellerModel.supplier_id == supplier_id)
-              .first()
+async def get_company_infos(queries: List[str], hit_after: datetime, miss_after: datetime) -> List[CompanyRecord]:
+    """Карточки rusprofile: найденные — не старше `hit_after`, «не найдено» — `miss_after`."""
+    if not queries:
+        return []
+    async with AsyncSessionLocal() as db:
+        rows = await db.scalars(
+            select(CompanyRecord).where(
+                CompanyRecord.query.in_(queries),
+                or_(
+                    CompanyRecord.found & (CompanyRecord.fetched_at >= hit_after),
+                    ~CompanyRecord.found & (CompanyRecord.fetched_at >= miss_after),
+                ),
+            )
         )
+        return list(rows)
 
-def update_seller_sale_count(seller_id: int, sale_count: int) -> None:
-    with SessionLocal() as db:
-        rec = (
-            db.query(SellerModel)
-              .filter(SellerModel.supplier_id == seller_id)
-              .first()
+async def upsert_company_infos(infos: Dict[str, Optional[Dict[str, Optional[str]]]]) -> None:
+    """Один INSERT … ON CONFLICT на пачку; None — компания не найдена."""
+    if not infos:
+        return
+    stmt = pg_insert(CompanyRecord).values([
+        dict(
+            query=query,
+            found=info is not None,
+            inn=(info or {}).get("inn"),
+            ogrn=(info or {}).get("ogrn"),
+            ogrnip=(info or {}).get("ogrnip"),
+            tax_office=(info or {}).get("tax_office"),
+            director=(info or {}).get("director"),
         )
-        if rec:
-            rec.sale_count = sale_count
-            db.commit()
\ No newline at end of file
+        for query, info in infos.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CompanyRecord.query],
+        set_={
+            "found": stmt.excluded.found,
+            "inn": stmt.excluded.inn,
+            "ogrn": stmt.excluded.ogrn,
+            "ogrnip": stmt.excluded.ogrnip,
+            "tax_office": stmt.excluded.tax_office,
+            "director": stmt.excluded.director,
+            "fetched_at": func.now(),
+        },
+    )
+    async with AsyncSessionLocal() as db:
+        await db.execute(stmt)
+        await db.commit()
+
+async def get_card_url(query: str) -> Optional[str]:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(CompanyCardUrl.card_url).where(CompanyCardUrl.query == query))
+
+async def upsert_card_urls(urls: Dict[str, str]) -> None:
+    if not urls:
+        return
+    stmt = pg_insert(CompanyCardUrl).values([
+        dict(query=query, card_url=url) for query, url in urls.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CompanyCardUrl.query],
+        set_={"card_url": stmt.excluded.card_url, "learned_at": func.now()},
+    )
+    async with AsyncSessionLocal() as db:
+        await db.execute(stmt)
+        await db.commit()
+
+async def delete_card_url(query: str) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(CompanyCardUrl).where(CompanyCardUrl.query == query))
+        await db.commit()
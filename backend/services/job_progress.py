@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from config import settings
+from parser.HTTPClient import RequestCounter, request_counter
+from services.job_queue import status_key
+from utils.rowpack import pack_rows, unpack_rows
+
+logger = logging.getLogger(__name__)
+
+# ───────── ключи ────────────────────────────────────────────────
+# job:{id}:progress        — HASH счётчиков (PROGRESS_FIELDS)
+# job:{id}:results:{n}     — строки [n*chunk, (n+1)*chunk) в utils.rowpack
+# Все ключи задачи живут JOB_RESULT_TTL с последней записи — ни один
+# не растёт больше chunk строк. Значения бинарные: клиент Redis нужен
+# с decode_responses=False (app.state.redis_bin).
+
+PROGRESS_FIELDS = ("subcats_total", "subcats_done", "sellers", "requests")
+TERMINAL = ("finished", "failed")
+
+
+def _progress(job_id: str) -> str:
+    return f"job:{job_id}:progress"
+
+
+def _chunk(job_id: str, n: int) -> str:
+    return f"job:{job_id}:results:{n}"
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, default=str)
+
+
+class JobProgress:
+    """
+    Прогресс и результаты одной задачи — пишутся по ходу работы.
+
+    Незаполненный последний кусок держится в памяти и перезаписывается
+    целиком при каждом `append` — не больше chunk строк за раз.
+
+    Счётчик запросов берётся из `parser.HTTPClient.request_counter`:
+    `start()` кладёт туда свежий RequestCounter, и все отправленные HTTP-попытки
+    задачи (включая дочерние asyncio-задачи) считаются в него.
+    """
+
+    def __init__(
+        self,
+        redis,
+        job_id: str,
+        *,
+        chunk: int = settings.JOB_RESULT_CHUNK,
+        ttl: int = settings.JOB_RESULT_TTL,
+    ) -> None:
+        self._redis = redis
+        self._job_id = job_id
+        self._chunk = chunk
+        self._ttl = ttl
+        self._total = 0
+        self._tail: List[Dict[str, Any]] = []
+        self._counter = RequestCounter()
+
+    async def start(self, subcats_total: int) -> None:
+        """Сбросить прошлую попытку (повтор из очереди) и начать счёт заново."""
+        await self._clear()
+        request_counter.set(self._counter)
+        await self._write({
+            "subcats_total": subcats_total,
+            "subcats_done": 0,
+            "sellers": 0,
+            "requests": 0,
+        })
+
+    async def subcat_done(self, n: int = 1) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hincrby(_progress(self._job_id), "subcats_done", n)
+            pipe.hset(_progress(self._job_id), "requests", self._counter.n)
+            pipe.expire(_progress(self._job_id), self._ttl)
+            await pipe.execute()
+
+    async def append(self, rows: Iterable[Dict[str, Any]]) -> None:
+        rows = list(rows)
+        if not rows:
+            return
+        async with self._redis.pipeline(transaction=True) as pipe:
+            self._push(pipe, rows)
+            await pipe.execute()
+
+    async def replace(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Переписать результаты целиком (например, после проставления всех
+        категорий) одной транзакцией. Порядок и число строк те же —
+        смещения клиентов не сбиваются.
+        """
+        rows = list(rows)
+        stale = await self._chunk_keys()
+        async with self._redis.pipeline(transaction=True) as pipe:
+            if stale:
+                pipe.delete(*stale)
+            self._total = 0
+            self._tail = []
+            self._push(pipe, rows)
+            await pipe.execute()
+
+    def _push(self, pipe, rows: List[Dict[str, Any]]) -> None:
+        """Дописать строки: полные куски пишутся один раз, хвост — заново."""
+        for row in rows:
+            self._tail.append(row)
+            self._total += 1
+            if len(self._tail) == self._chunk:
+                self._set_chunk(pipe, (self._total - 1) // self._chunk, self._tail)
+                self._tail = []
+        if self._tail:
+            self._set_chunk(pipe, self._total // self._chunk, self._tail)
+        pipe.hset(_progress(self._job_id), mapping={"sellers": self._total, "requests": self._counter.n})
+        pipe.expire(_progress(self._job_id), self._ttl)
+
+    def _set_chunk(self, pipe, n: int, rows: List[Dict[str, Any]]) -> None:
+        pipe.set(_chunk(self._job_id, n), pack_rows(rows), ex=self._ttl)
+
+    async def _chunk_keys(self) -> List[str]:
+        raw = await self._redis.hget(_progress(self._job_id), "sellers")
+        total = max(int(raw or 0), self._total)
+        return [_chunk(self._job_id, n) for n in range((total + self._chunk - 1) // self._chunk)]
+
+    async def _clear(self) -> None:
+        await self._redis.delete(*await self._chunk_keys(), _progress(self._job_id))
+        self._total = 0
+        self._tail = []
+
+    async def _write(self, fields: Dict[str, Any]) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(_progress(self._job_id), mapping={**fields, "requests": self._counter.n})
+            pipe.expire(_progress(self._job_id), self._ttl)
+            await pipe.execute()
+
+
+# ───────── чтение ───────────────────────────────────────────────
+async def read_job(redis, job_id: str) -> Optional[Dict[str, Any]]:
+    raw = await redis.get(status_key(job_id))
+    return json.loads(raw) if raw else None
+
+
+async def read_progress(redis, job_id: str) -> Dict[str, int]:
+    raw = await redis.hmget(_progress(job_id), PROGRESS_FIELDS)
+    return {f: int(v or 0) for f, v in zip(PROGRESS_FIELDS, raw)}
+
+
+async def read_results(
+    redis,
+    job_id: str,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    *,
+    chunk: int = settings.JOB_RESULT_CHUNK,
+) -> List[Dict[str, Any]]:
+    """Строки [offset, offset+limit) — читаются только нужные куски."""
+    total = int(await redis.hget(_progress(job_id), "sellers") or 0)
+    end = total if limit is None else min(total, offset + limit)
+    if offset >= end:
+        return []
+    first, last = offset // chunk, (end - 1) // chunk
+    blobs = await redis.mget([_chunk(job_id, n) for n in range(first, last + 1)])
+    out: List[Dict[str, Any]] = []
+    for n, blob in zip(range(first, last + 1), blobs):
+        rows = unpack_rows(blob) if blob else []
+        out += rows[max(offset - n * chunk, 0) : end - n * chunk]
+    return out
+
+
+async def iter_results(
+    redis,
+    job_id: str,
+    offset: int = 0,
+    *,
+    chunk: int = settings.JOB_RESULT_CHUNK,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Все результаты пачками по куску — для стриминга без сборки списка."""
+    while True:
+        batch = await read_results(redis, job_id, offset, chunk, chunk=chunk)
+        if not batch:
+            return
+        yield batch
+        offset += len(batch)
+
+
+async def iter_rows(redis, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+    async for batch in iter_results(redis, job_id):
+        for row in batch:
+            yield row
+
+
+async def job_events(
+    redis,
+    job_id: str,
+    after: int = 0,
+    *,
+    interval: float = 1.0,
+    batch: int = settings.JOB_RESULT_CHUNK,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    События для EventSourceResponse:
+      progress — счётчики (когда изменились);
+      results  — новые строки, id события = смещение после них
+                 (EventSource переподключится с Last-Event-ID и продолжит);
+      done     — итоговый статус, после него поток закрывается.
+    Redis опрашивается раз в `interval` — воркер и API в разных процессах.
+    """
+    last_progress = None
+    while True:
+        job = await read_job(redis, job_id)
+        if job is None:
+            yield {"event": "done", "data": _dumps({"status": "expired"})}
+            return
+
+        progress = await read_progress(redis, job_id)
+        if progress != last_progress:
+            yield {"event": "progress", "data": _dumps({"status": job["status"], **progress})}
+            last_progress = progress
+
+        while after < progress["sellers"]:
+            rows = await read_results(redis, job_id, after, batch)
+            if not rows:
+                break
+            after += len(rows)
+            yield {"event": "results", "id": str(after), "data": _dumps(rows)}
+
+        if job["status"] in TERMINAL:
+            yield {"event": "done", "data": _dumps({"status": job["status"], "error": job.get("error")})}
+            return
+        await asyncio.sleep(interval)
+
+
+__all__ = [
+    "JobProgress",
+    "read_job",
+    "read_progress",
+    "read_results",
+    "iter_results",
+    "iter_rows",
+    "job_events",
+]
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, Iterable, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# ───────── ключи ────────────────────────────────────────────────
+# job:{id}                 — статус для клиентов: {"status", "result", "error"}
+# jobs:spec:{id}           — HASH: kind, payload (JSON), attempts
+# jobs:queue:{kind}        — LIST id: LPUSH новых, RPOP в работу, RPUSH — вне очереди
+# jobs:leases:{kind}       — ZSET id → срок аренды (visibility timeout)
+# jobs:delayed:{kind}      — ZSET id → когда вернуть в очередь (повтор после ошибки)
+
+
+def status_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def _spec(job_id: str) -> str:
+    return f"jobs:spec:{job_id}"
+
+
+def _queue(kind: str) -> str:
+    return f"jobs:queue:{kind}"
+
+
+def _leases(kind: str) -> str:
+    return f"jobs:leases:{kind}"
+
+
+def _delayed(kind: str) -> str:
+    return f"jobs:delayed:{kind}"
+
+
+# Взять задачу, если у вида не исчерпан общий (на все воркеры) лимит
+# одновременных задач. RPOP и аренда в одном скрипте — задача всегда
+# либо в очереди, либо в аренде.
+_RESERVE = """
+local limit = tonumber(ARGV[3])
+if limit > 0 and redis.call('ZCARD', KEYS[2]) >= limit then
+  return false
+end
+local id = redis.call('RPOP', KEYS[1])
+if not id then
+  return false
+end
+redis.call('ZADD', KEYS[2], tonumber(ARGV[1]) + tonumber(ARGV[2]), id)
+return id
+"""
+
+# Просроченные аренды (воркер умер) и созревшие повторы — обратно
+# в голову очереди.
+_REAP = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+for _, id in ipairs(expired) do
+  redis.call('ZREM', KEYS[1], id)
+  redis.call('RPUSH', KEYS[2], id)
+end
+local ready = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[1])
+for _, id in ipairs(ready) do
+  redis.call('ZREM', KEYS[3], id)
+  redis.call('RPUSH', KEYS[2], id)
+end
+return #expired
+"""
+
+# Снять аренду и (опционально) переложить задачу: ARGV[2] — куда:
+# "" — никуда (ack), "queue" — в голову очереди, "delayed" — в отложенные.
+# Если аренды уже нет (истекла и её забрал reap), ничего не делаем.
+_SETTLE = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+  return 0
+end
+if ARGV[2] == 'queue' then
+  redis.call('RPUSH', KEYS[2], ARGV[1])
+elseif ARGV[2] == 'delayed' then
+  redis.call('ZADD', KEYS[3], tonumber(ARGV[3]), ARGV[1])
+end
+return 1
+"""
+
+
+class Job:
+    __slots__ = ("id", "kind", "payload", "attempts")
+
+    def __init__(self, job_id: str, kind: str, payload: Dict[str, Any], attempts: int) -> None:
+        self.id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+
+
+class JobQueue:
+    """
+    Надёжная очередь задач поверх Redis приложения.
+
+    API кладёт задачу (`enqueue`) и сразу отвечает job_id; выполняют её
+    отдельные процессы worker.py. Задача выдаётся воркеру в аренду на
+    `visibility_timeout` секунд, воркер продлевает аренду, пока работает
+    (`heartbeat`). Не продлил — воркер считается мёртвым, и `reap`
+    возвращает задачу в очередь. После ошибки — повтор с задержкой,
+    пока не кончатся `max_attempts`. Лимит одновременных задач каждого
+    вида — общий на все воркеры (`limits`).
+    """
+
+    def __init__(
+        self,
+        redis,
+        *,
+        visibility_timeout: int = settings.JOB_VISIBILITY_TIMEOUT,
+        max_attempts: int = settings.JOB_MAX_ATTEMPTS,
+        retry_delay: int = settings.JOB_RETRY_DELAY,
+        limits: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self._redis = redis
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.limits = dict(settings.JOB_KIND_LIMITS if limits is None else limits)
+        self._reserve = redis.register_script(_RESERVE)
+        self._reap = redis.register_script(_REAP)
+        self._settle = redis.register_script(_SETTLE)
+
+    # ───────── API ──────────────────────────────────────────────
+    async def enqueue(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None) -> str:
+        job_id = job_id or uuid.uuid4().hex
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(
+                status_key(job_id),
+                json.dumps({"status": "pending", "result": None, "error": None}),
+                ex=settings.JOB_RESULT_TTL,
+            )
+            pipe.hset(_spec(job_id), mapping={
+                "kind": kind,
+                "payload": json.dumps(payload, default=str),
+                "attempts": 0,
+            })
+            pipe.lpush(_queue(kind), job_id)
+            await pipe.execute()
+        return job_id
+
+    async def depth(self, kinds: Iterable[str]) -> Dict[str, Dict[str, int]]:
+        out = {}
+        for kind in kinds:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.llen(_queue(kind))
+                pipe.zcard(_leases(kind))
+                pipe.zcard(_delayed(kind))
+                queued, running, delayed = await pipe.execute()
+            out[kind] = {"queued": queued, "running": running, "delayed": delayed}
+        return out
+
+    # ───────── воркер ───────────────────────────────────────────
+    async def reserve(self, kind: str) -> Optional[Job]:
+        job_id = await self._reserve(
+            keys=[_queue(kind), _leases(kind)],
+            args=[time.time(), self.visibility_timeout, self.limits.get(kind, 0)],
+        )
+        if not job_id:
+            return None
+        attempts = await self._redis.hincrby(_spec(job_id), "attempts", 1)
+        spec = await self._redis.hgetall(_spec(job_id))
+        if not spec.get("kind"):
+            logger.warning("Job %s has no spec, dropping", job_id)
+            await self.ack(kind, job_id)
+            return None
+        if attempts > self.max_attempts:
+            # воркеры падали на этой задаче, не успев вызвать fail
+            await self.ack(kind, job_id)
+            await self._set_status(job_id, "failed", error="lease expired too many times")
+            return None
+        return Job(job_id, kind, json.loads(spec["payload"]), attempts)
+
+    async def heartbeat(self, job: Job) -> bool:
+        """Продлить аренду. False — аренда уже потеряна (задачу забрал reap)."""
+        deadline = time.time() + self.visibility_timeout
+        changed = await self._redis.zadd(_leases(job.kind), {job.id: deadline}, xx=True, ch=True)
+        return bool(changed)
+
+    async def ack(self, kind: str, job_id: str) -> bool:
+        settled = await self._settle(keys=[_leases(kind), _queue(kind), _delayed(kind)], args=[job_id, "", 0])
+        await self._redis.delete(_spec(job_id))
+        return bool(settled)
+
+    async def fail(self, job: Job, error: str) -> bool:
+        """
+        Ошибка выполнения. Есть попытки — задача уходит в отложенные,
+        True; попытки кончились — статус failed, False.
+        """
+        if job.attempts < self.max_attempts:
+            delay = self.retry_delay * job.attempts
+            settled = await self._settle(
+                keys=[_leases(job.kind), _queue(job.kind), _delayed(job.kind)],
+                args=[job.id, "delayed", time.time() + delay],
+            )
+            if settled:
+                await self._set_status(job.id, "pending", error=f"attempt {job.attempts} failed: {error}")
+            return True
+        await self.ack(job.kind, job.id)
+        await self._set_status(job.id, "failed", error=error)
+        return False
+
+    async def release(self, job: Job) -> None:
+        """Вернуть задачу в голову очереди без траты попытки (остановка воркера)."""
+        settled = await self._settle(keys=[_leases(job.kind), _queue(job.kind), _delayed(job.kind)], args=[job.id, "queue", 0])
+        if settled:
+            await self._redis.hincrby(_spec(job.id), "attempts", -1)
+            await self._set_status(job.id, "pending")
+
+    async def reap(self, kinds: Iterable[str]) -> int:
+        now = time.time()
+        total = 0
+        for kind in kinds:
+            n = await self._reap(keys=[_leases(kind), _queue(kind), _delayed(kind)], args=[now])
+            if n:
+                logger.warning("Requeued %s %s job(s) with expired lease", n, kind)
+            total += n
+        return total
+
+    async def _set_status(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        raw = await self._redis.get(status_key(job_id))
+        job = json.loads(raw) if raw else {"result": None}
+        job.update(status=status, error=error)
+        await self._redis.set(status_key(job_id), json.dumps(job, default=str), ex=settings.JOB_RESULT_TTL)
+
+
+__all__ = ["Job", "JobQueue", "status_key"]
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import settings
+from parser.client_registry import HttpClientRegistry
+from schemas.wb import SellerOut, WBParams
+from services.collection_log_utils import touch_collection
+from services.db_utils import _save_parse_data
+from services.job_progress import JobProgress
+from services.job_queue import status_key
+from services.sale_refresh import refresh_sale_counts
+from services.sweep import SweepRegistry
+from services.wb_service import collect_data
+from utils.category_index import category_index
+
+logger = logging.getLogger(__name__)
+
+# Обработчики задач очереди. Выполняются в worker.py; ошибку не глотают —
+# повтор или failed решает очередь (services.job_queue). Строки результата
+# копятся не в job:{id}, а кусками по ходу работы (services.job_progress).
+Handler = Callable[..., Awaitable[None]]
+
+
+async def _set_job(redis, job_id: str, **fields: Any) -> None:
+    raw = await redis.get(status_key(job_id))
+    job = json.loads(raw) if raw else {"status": "pending", "result": None, "error": None}
+    job.update(fields)
+    await redis.set(status_key(job_id), json.dumps(job, default=str), ex=settings.JOB_RESULT_TTL)
+
+
+# ───────── /wb/cat/jobs ─────────────────────────────────────────
+async def run_cat_parse_job(
+    job_id: str,
+    redis,
+    http: HttpClientRegistry,
+    *,
+    params: Dict[str, Any],
+    region_id: str,
+    limit: Optional[int],
+) -> None:
+    params = WBParams(**params)
+    progress = JobProgress(redis, job_id)
+    await progress.start(subcats_total=1)
+    await _set_job(redis, job_id, status="in_progress")
+
+    data, _log = await collect_data(params, region_id=region_id, limit=limit, http=http)
+    await progress.append(item.dict() for item in data)
+    await progress.subcat_done()
+
+    await touch_collection("cat", {**params.dict(exclude_none=True), "region_id": region_id})
+    await _save_parse_data(
+        {
+            "category": params.cat,
+            "shard": params.shard,
+            "region_id": region_id,
+            "sale_item_count": params.saleItemCount,
+            "max_sale_count": params.maxSaleCount or 0,
+            "reg_date": params.regDate or datetime.utcnow(),
+            "max_reg_date": params.maxRegDate or datetime.utcnow(),
+            "data": [item.dict() for item in data],
+        }
+    )
+
+    await _set_job(redis, job_id, status="finished", error=None)
+
+
+# ───────── /parse ───────────────────────────────────────────────
+async def run_parse_job(
+    job_id: str,
+    redis,
+    http: HttpClientRegistry,
+    *,
+    main_id: int,
+    pages: int,
+    region_id: str,
+    saleItemCount: int,
+    maxSaleCount: Optional[int],
+    regDate: Optional[str],
+    maxRegDate: Optional[str],
+    limit: Optional[int],
+    concurrency: int,
+) -> None:
+    results: List[SellerOut] = []
+    remaining = limit
+
+    subcats = category_index.leaves(main_id)
+    sweep = SweepRegistry(subcats)
+    progress = JobProgress(redis, job_id)
+    await progress.start(subcats_total=len(subcats))
+    await _set_job(redis, job_id, status="in_progress")
+    sem = asyncio.Semaphore(concurrency)
+
+    async def fetch_cat(cat_query: dict) -> List[SellerOut]:
+        params = WBParams(
+            cat=cat_query["query"],
+            shard=cat_query["shard"],
+            region_id=region_id,
+            saleItemCount=saleItemCount,
+            maxSaleCount=maxSaleCount,
+            pages=pages,
+            regDate=regDate,
+            maxRegDate=maxRegDate,
+        )
+        async with sem:
+            data, _ = await collect_data(
+                params,
+                region_id=region_id,
+                limit=remaining,
+                http=http,
+                sweep=sweep,
+            )
+            return data
+
+    tasks = [asyncio.create_task(fetch_cat(cat)) for cat in subcats]
+    try:
+        for coro in asyncio.as_completed(tasks):
+            data = await coro
+            if remaining is not None:
+                data = data[:remaining]
+                remaining -= len(data)
+            results.extend(data)
+            # категории, известные на сейчас; полные — в replace ниже
+            sweep.attribute(data)
+            await progress.append(item.dict() for item in data)
+            await progress.subcat_done()
+            if remaining == 0:
+                break
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+
+    sweep.attribute(results)
+    await progress.replace(item.dict() for item in results)
+    if results:
+        await touch_collection(
+            "all",
+            {
+                "main_id": main_id,
+                "pages": pages,
+                "region_id": region_id,
+                "saleItemCount": saleItemCount,
+                "maxSaleCount": maxSaleCount,
+            },
+        )
+
+        await _save_parse_data(
+            {
+                "category": str(main_id),  # для «all» кладём main_id
+                "shard": "",
+                "region_id": region_id,
+                "sale_item_count": saleItemCount,
+                "max_sale_count": maxSaleCount or 0,
+                "reg_date": regDate or datetime.utcnow(),
+                "max_reg_date": maxRegDate or datetime.utcnow(),
+                "data": [item.dict() for item in results],
+            }
+        )
+
+    await _set_job(redis, job_id, status="finished", error=None)
+
+
+# ───────── /wb/refresh_sale_counts ──────────────────────────────
+async def run_refresh_job(
+    job_id: str,
+    redis,
+    http: HttpClientRegistry,
+    *,
+    budget: int,
+    concurrency: int,
+) -> None:
+    await _set_job(redis, job_id, status="in_progress")
+    stats = await refresh_sale_counts(http.wb_shipment, budget=budget, concurrency=concurrency)
+    await _set_job(redis, job_id, status="finished", result=stats.model_dump(), error=None)
+
+
+HANDLERS: Dict[str, Handler] = {
+    "cat_parse": run_cat_parse_job,
+    "parse": run_parse_job,
+    "refresh_sale_counts": run_refresh_job,
+}
+
+__all__ = ["HANDLERS", "run_cat_parse_job", "run_parse_job", "run_refresh_job"]
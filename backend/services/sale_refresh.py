@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from parser.HTTPClient import AsyncHttpClient
+from parser.WbFetcher import WBSellerFetcher
+from parser.parser_cfg import settings as ParserConfig
+from services import db_utils as dbu
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshStats(BaseModel):
+    requested: int = 0      # запросов suppliers-shipment (расход бюджета)
+    refreshed: int = 0      # получили saleItemQuantity
+    changed: int = 0        # sale_count реально изменился
+    failed: int = 0         # пустой ответ / 404 / исчерпаны повторы
+    batches: int = 0
+    exhausted: bool = False  # обошли всех, бюджет не кончился
+
+
+async def _fetch_batch(
+    fetcher: WBSellerFetcher,
+    batch: List[Tuple[int, int]],
+    sem: asyncio.Semaphore,
+) -> List[Tuple[int, int, Optional[int]]]:
+    async def one(sid: int, old: int) -> Tuple[int, int, Optional[int]]:
+        async with sem:
+            payload = await fetcher.fetch_one(sid)
+        new = payload.get("saleItemQuantity") if payload else None
+        return sid, old, new if isinstance(new, int) else None
+
+    return await asyncio.gather(*(one(sid, old) for sid, old in batch))
+
+
+async def refresh_sale_counts(
+    client: AsyncHttpClient,
+    budget: int = ParserConfig.REFRESH_BUDGET,
+    batch_size: int = ParserConfig.REFRESH_BATCH,
+    concurrency: int = ParserConfig.SHIPMENT_CONCURRENCY,
+) -> RefreshStats:
+    """
+    Инкрементальное обновление sale_count из suppliers-shipment-2.
+
+    Идём по sellers пачками, начиная с самых несвежих (last_refreshed_at
+    NULLS FIRST), пока не потратим `budget` запросов или не обойдём всех.
+    В БД пишем только изменившиеся sale_count; last_refreshed_at ставим
+    всем, по кому был запрос, — в т.ч. неудачным, иначе мёртвые продавцы
+    навсегда застрянут в голове очереди и съедят бюджет следующих прогонов.
+    """
+    started = datetime.now(tz=timezone.utc)
+    stats = RefreshStats()
+    fetcher = WBSellerFetcher((), client)
+    sem = asyncio.Semaphore(concurrency)
+
+    while stats.requested < budget:
+        batch = await dbu.get_stale_sellers(min(batch_size, budget - stats.requested), started)
+        if not batch:
+            stats.exhausted = True
+            break
+
+        results = await _fetch_batch(fetcher, batch, sem)
+        changed: Dict[int, int] = {}
+        for sid, old, new in results:
+            if new is None:
+                stats.failed += 1
+                continue
+            stats.refreshed += 1
+            if new != old:
+                changed[sid] = new
+
+        await dbu.apply_sale_counts(changed, [sid for sid, _ in batch], datetime.now(tz=timezone.utc))
+        stats.requested += len(batch)
+        stats.changed += len(changed)
+        stats.batches += 1
+        logger.info(
+            "sale_count refresh: batch %s, %s/%s requests, %s changed, %s failed",
+            stats.batches, stats.requested, budget, stats.changed, stats.failed,
+        )
+
+    return stats
+
+
+__all__ = ["RefreshStats", "refresh_sale_counts"]
+
+
+if __name__ == "__main__":
+    # Ночной прогон по cron. Запуск из backend/:
+    #   python -m services.sale_refresh --budget 200000
+    import argparse
+
+    from database import async_engine
+    from parser.client_registry import HttpClientRegistry
+
+    ap = argparse.ArgumentParser(description="Инкрементальное обновление sale_count продавцов")
+    ap.add_argument("--budget", type=int, default=ParserConfig.REFRESH_BUDGET)
+    ap.add_argument("--batch", type=int, default=ParserConfig.REFRESH_BATCH)
+    ap.add_argument("--concurrency", type=int, default=ParserConfig.SHIPMENT_CONCURRENCY)
+    args = ap.parse_args()
+
+    async def _main() -> None:
+        http = await HttpClientRegistry().start()
+        try:
+            stats = await refresh_sale_counts(http.wb_shipment, args.budget, args.batch, args.concurrency)
+        finally:
+            await http.close()
+            await async_engine.dispose()
+        print(stats.model_dump_json())
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
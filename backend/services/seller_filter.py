@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import Select
+from sqlalchemy.sql.elements import ColumnElement
+
+from models.seller import Seller
+from utils.wb_utils import parse_regions
+
+
+def like_escape(s: str) -> str:
+    """Экранирование для LIKE … ESCAPE '!'."""
+    return s.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+
+class SellerFilter(BaseModel):
+    """
+    Фильтры поиска по базе продавцов — одни на /search, /search/results,
+    /search/xlsx и /search/stats. Используется как `Depends()`.
+
+    Все предикаты sargable: даты — полуоткрытые диапазоны по самой колонке
+    (без date(col)), регион — IN по region_code. Под них есть индексы:
+    region_code, (sale_count, reg_date), (categories, created_at), created_at, trgm
+    по store_name.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    q: Optional[str] = Field(None, min_length=1, description="Часть названия магазина")
+    region: Optional[str] = Field(None, description="Код региона или несколько через запятую")
+    salesFrom: Optional[int] = Field(None, ge=0)
+    salesTo: Optional[int] = Field(None, ge=0)
+    dateFrom: Optional[date] = Field(None, description="Дата регистрации магазина, с")
+    dateTo: Optional[date] = Field(None, description="Дата регистрации магазина, по (включительно)")
+    category: Optional[str] = None
+    createdFrom: Optional[date] = Field(None, description="Добавлен в базу, с")
+    createdTo: Optional[date] = Field(None, description="Добавлен в базу, по (включительно)")
+
+    def regions(self) -> Tuple[str, ...]:
+        return tuple(sorted(set(parse_regions(self.region))))
+
+    def key(self, *, with_q: bool = True) -> Tuple:
+        """Нормализованный ключ фильтра — для кэшей."""
+        return (
+            " ".join(self.q.lower().split()) if with_q and self.q else None,
+            self.regions(),
+            self.salesFrom, self.salesTo,
+            self.dateFrom, self.dateTo,
+            self.category,
+            self.createdFrom, self.createdTo,
+        )
+
+    def digest(self, *, with_q: bool = True) -> str:
+        raw = json.dumps(self.key(with_q=with_q), default=str, ensure_ascii=False)
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def clauses(self, *, with_q: bool = True) -> List[ColumnElement]:
+        return list(_clauses(self, with_q))
+
+    def apply(self, stmt: Select, *, with_q: bool = True) -> Select:
+        """`with_q=False` — название фильтрует/ранжирует сам вызывающий (автодополнение)."""
+        clauses = _clauses(self, with_q)
+        return stmt.where(*clauses) if clauses else stmt
+
+
+@lru_cache(maxsize=1024)
+def _clauses(f: SellerFilter, with_q: bool) -> Tuple[ColumnElement, ...]:
+    """
+    Условия собираются один раз на набор фильтров. Параметры в них
+    связанные, так что SQLAlchemy переиспользует и скомпилированный SQL.
+    """
+    out: List[ColumnElement] = []
+    if with_q and f.q:
+        out.append(Seller.store_name.ilike(f"%{like_escape(f.q)}%", escape="!"))
+    regions = f.regions()
+    if regions:
+        out.append(Seller.region_code.in_(regions))
+    if f.salesFrom is not None:
+        out.append(Seller.sale_count >= f.salesFrom)
+    if f.salesTo is not None:
+        out.append(Seller.sale_count <= f.salesTo)
+    if f.dateFrom:
+        out.append(Seller.reg_date >= f.dateFrom)
+    if f.dateTo:
+        out.append(Seller.reg_date < f.dateTo + timedelta(days=1))
+    if f.category:
+        out.append(Seller.categories == f.category)
+    if f.createdFrom:
+        out.append(Seller.created_at >= f.createdFrom)
+    if f.createdTo:
+        out.append(Seller.created_at < f.createdTo + timedelta(days=1))
+    return tuple(out)
+
+
+__all__ = ["SellerFilter", "like_escape"]
+
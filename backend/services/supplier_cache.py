@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Tuple
+
+from parser.parser_cfg import settings as ParserConfig
+from services import db_utils as dbu
+
+logger = logging.getLogger(__name__)
+
+SupplierCreds = Dict[str, str]      # формат WBSellerInnParser: inn / ogrn / ogrnip / trademark
+
+
+class SupplierInfoCache:
+    """
+    Двухуровневый кэш реквизитов supplier-by-id:
+    in-process LRU → таблица supplier_info (долгий TTL).
+
+    `get_many` отдаёт найденное и список промахов — по сети идут только промахи.
+    Свежие ответы сразу попадают в LRU, а в БД уходят пачкой через `flush`.
+    """
+
+    FLUSH_SIZE = 200
+
+    def __init__(
+        self,
+        maxsize: int = ParserConfig.SUPPLIER_INFO_LRU_SIZE,
+        ttl: timedelta = timedelta(days=ParserConfig.SUPPLIER_INFO_TTL_DAYS),
+    ) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._lru: "OrderedDict[int, Tuple[float, SupplierCreds]]" = OrderedDict()
+        self._pending: Dict[int, SupplierCreds] = {}
+
+    # ───────── LRU ──────────────────────────────────────────────
+    def _lru_get(self, sid: int) -> SupplierCreds | None:
+        item = self._lru.get(sid)
+        if item is None:
+            return None
+        ts, creds = item
+        if time.time() - ts > self._ttl.total_seconds():
+            self._lru.pop(sid, None)
+            return None
+        self._lru.move_to_end(sid)
+        return creds
+
+    def _lru_put(self, sid: int, creds: SupplierCreds, ts: float | None = None) -> None:
+        if not self._maxsize:
+            return
+        self._lru[sid] = (ts or time.time(), creds)
+        self._lru.move_to_end(sid)
+        while len(self._lru) > self._maxsize:
+            self._lru.popitem(last=False)
+
+    # ───────── API ──────────────────────────────────────────────
+    async def get_many(self, supplier_ids: Iterable[int]) -> Tuple[Dict[int, SupplierCreds], List[int]]:
+        hits: Dict[int, SupplierCreds] = {}
+        rest: List[int] = []
+        for sid in supplier_ids:
+            creds = self._lru_get(sid)
+            if creds is None:
+                creds = self._pending.get(sid)
+            if creds is not None:
+                hits[sid] = creds
+            else:
+                rest.append(sid)
+
+        if rest:
+            fresh_after = datetime.now(tz=timezone.utc) - self._ttl
+            try:
+                rows = await dbu.get_supplier_infos(rest, fresh_after)
+            except Exception as e:
+                logger.warning("supplier_info lookup failed: %s", e)
+                rows = []
+            for r in rows:
+                creds = {
+                    "inn": r.inn,
+                    "ogrn": r.ogrn or "",
+                    "ogrnip": r.ogrnip or "",
+                    "trademark": r.trademark or "",
+                }
+                hits[r.supplier_id] = creds
+                self._lru_put(r.supplier_id, creds, r.fetched_at.timestamp())
+
+        misses = [sid for sid in rest if sid not in hits]
+        return hits, misses
+
+    async def put(self, supplier_id: int, creds: SupplierCreds) -> None:
+        self._lru_put(supplier_id, creds)
+        self._pending[supplier_id] = creds
+        if len(self._pending) >= self.FLUSH_SIZE:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            await dbu.upsert_supplier_infos(batch)
+        except Exception as e:
+            logger.warning("supplier_info upsert failed (%s rows): %s", len(batch), e)
+
+
+supplier_cache = SupplierInfoCache()
+
+__all__ = ["SupplierInfoCache", "supplier_cache"]
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping, Sequence
+
+from schemas.wb import SellerOut
+
+
+class SweepRegistry:
+    """
+    Реестр продавцов, общий для всех подкатегорий одного обхода
+    (/wb/all, /parse). Каждый supplierId забирает первая подкатегория,
+    в которой он встретился, — только она тратит запросы на ИНН, shipment,
+    rusprofile и usersbox. Остальные подкатегории лишь дописывают себя
+    в список категорий продавца.
+    """
+
+    def __init__(self, subcategories: Sequence[Mapping[str, Any]] = ()) -> None:
+        self._labels: Dict[str, str] = {
+            c["query"]: c.get("name") or c["query"] for c in subcategories
+        }
+        self._categories: Dict[int, List[str]] = {}
+
+    def claim(self, supplier_id: int, category: str) -> bool:
+        """True — продавец достался этой категории; False — уже занят другой."""
+        cats = self._categories.get(supplier_id)
+        if cats is None:
+            self._categories[supplier_id] = [category]
+            return True
+        if category not in cats:
+            cats.append(category)
+        return False
+
+    def categories(self, supplier_id: int) -> List[str]:
+        return [self._labels.get(c, c) for c in self._categories.get(supplier_id, [])]
+
+    def attribute(self, items: Iterable[SellerOut]) -> None:
+        """Проставляет результатам все категории, где встретился продавец."""
+        for item in items:
+            cats = self.categories(item.seller_id)
+            if cats:
+                item.categories = ", ".join(cats)
+
+    def __len__(self) -> int:
+        return len(self._categories)
+
+
+__all__ = ["SweepRegistry"]
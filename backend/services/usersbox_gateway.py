@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from config import USERBOX_KEY
+from parser.HTTPClient import AsyncHttpClient
+from parser.cpu_pool import Contacts, parse_pool
+from parser.parser_cfg import settings as ParserConfig
+from parser.userbox import parse_me
+from parser.userboxFetcher import UsersboxFetcher
+from parser.userboxParser import UsersboxParser
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetExceeded(Exception):
+    """Баланса Usersbox не хватает на пачку — запрос не отправлялся (это не «контактов нет»)."""
+
+
+class UsersboxGateway:
+    """
+    Единая точка запросов контактов в Usersbox (каждый запрос платный).
+
+    ▸ LRU по ИНН с TTL — повторный продавец/категория не тратит запрос;
+    ▸ single-flight — одновременные запросы одного ИНН ждут один ответ;
+      ИНН, который все ждущие бросили до отправки, из очереди убирается;
+    ▸ ИНН копятся `batch_window` секунд и уходят пачкой через общий клиент;
+    ▸ бюджет — баланс из /getMe (не чаще раза в `balance_ttl`), между
+      чтениями уменьшается на `query_cost` за каждый отправленный ИНН;
+      пачка, после которой баланс упал бы ниже `min_balance`, не
+      отправляется — её ждущие получают BudgetExceeded.
+    Ошибки запроса и неуспешные ответы не кэшируются.
+    """
+
+    def __init__(
+        self,
+        ttl: timedelta = timedelta(hours=ParserConfig.USERSBOX_CACHE_TTL_HOURS),
+        maxsize: int = ParserConfig.USERSBOX_CACHE_SIZE,
+        batch_size: int = ParserConfig.USERSBOX_BATCH_SIZE,
+        batch_window: float = ParserConfig.USERSBOX_BATCH_WINDOW,
+        min_balance: float = ParserConfig.USERSBOX_MIN_BALANCE,
+        query_cost: float = ParserConfig.USERSBOX_QUERY_COST,
+        balance_ttl: int = ParserConfig.USERSBOX_BALANCE_TTL,
+    ) -> None:
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._batch_size = batch_size
+        self._batch_window = batch_window
+        self._min_balance = min_balance
+        self._query_cost = query_cost
+        self._balance_ttl = balance_ttl
+        self._lru: "OrderedDict[str, Tuple[float, Contacts]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[str, int] = {}
+        self._queue: Dict[str, Optional[AsyncHttpClient]] = {}
+        self._flusher: asyncio.Task | None = None
+        self._batches: Set[asyncio.Task] = set()
+        self._balance: float | None = None
+        self._balance_at = 0.0
+        self._balance_lock = asyncio.Lock()
+
+    # ───────── LRU ──────────────────────────────────────────────
+    def _lru_get(self, inn: str) -> Contacts | None:
+        item = self._lru.get(inn)
+        if item is None:
+            return None
+        ts, contacts = item
+        if time.time() - ts > self._ttl.total_seconds():
+            self._lru.pop(inn, None)
+            return None
+        self._lru.move_to_end(inn)
+        return contacts
+
+    def _lru_put(self, inn: str, contacts: Contacts) -> None:
+        if not self._maxsize:
+            return
+        self._lru[inn] = (time.time(), contacts)
+        self._lru.move_to_end(inn)
+        while len(self._lru) > self._maxsize:
+            self._lru.popitem(last=False)
+
+    # ───────── API ──────────────────────────────────────────────
+    async def contacts(self, inn: str, client: AsyncHttpClient | None = None) -> Contacts:
+        """
+        Контакты по ИНН. `client` — общий клиент usersbox (без него — своя сессия на пачку).
+        BudgetExceeded — запрос пропущен из-за баланса.
+        """
+        inn = str(inn).strip()
+        cached = self._lru_get(inn)
+        if cached is not None:
+            return cached
+
+        fut = self._inflight.get(inn)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            self._inflight[inn] = fut
+            self._queue[inn] = client
+            if self._flusher is None or self._flusher.done():
+                self._flusher = asyncio.create_task(self._flush_loop())
+        # отмена одного ждущего не должна отменять ответ для остальных
+        self._waiters[inn] = self._waiters.get(inn, 0) + 1
+        try:
+            return await asyncio.shield(fut)
+        finally:
+            left = self._waiters.pop(inn) - 1
+            if left:
+                self._waiters[inn] = left
+            elif not fut.done() and inn in self._queue:
+                # ждать больше некому, а пачка ещё не ушла — не платим за ответ
+                del self._queue[inn]
+                self._inflight.pop(inn, None)
+                fut.cancel()
+
+    # ───────── пачки ────────────────────────────────────────────
+    async def _flush_loop(self) -> None:
+        while self._queue:
+            await asyncio.sleep(self._batch_window)
+            while self._queue:
+                inns = list(self._queue)[: self._batch_size]
+                batch = {inn: self._queue.pop(inn) for inn in inns}
+                task = asyncio.create_task(self._dispatch(batch))
+                self._batches.add(task)
+                task.add_done_callback(self._batches.discard)
+
+    async def _dispatch(self, batch: Dict[str, Optional[AsyncHttpClient]]) -> None:
+        groups: Dict[int, Tuple[Optional[AsyncHttpClient], List[str]]] = {}
+        for inn, client in batch.items():
+            groups.setdefault(id(client), (client, []))[1].append(inn)
+        try:
+            for client, inns in groups.values():
+                try:
+                    results = await self._fetch(inns, client)
+                except BudgetExceeded as e:
+                    self._fail(inns, e)
+                    continue
+                except Exception as e:
+                    logger.exception("Usersbox batch of %s failed", len(inns))
+                    self._fail(inns, e)
+                    continue
+                for inn, (contacts, cacheable) in results.items():
+                    if cacheable:
+                        self._lru_put(inn, contacts)
+                    fut = self._inflight.pop(inn, None)
+                    if fut is not None and not fut.done():
+                        fut.set_result(contacts)
+        finally:
+            # пачку отменили (остановка приложения) — ждущие не должны висеть
+            # вечно, но и отмену получить не должны: она ушла бы выше их
+            # `except Exception` и отменила бы весь сбор
+            self._fail(batch, RuntimeError("Usersbox batch was cancelled"))
+
+    def _fail(self, inns: Iterable[str], exc: Exception) -> None:
+        for inn in inns:
+            fut = self._inflight.pop(inn, None)
+            if fut is not None and not fut.done():
+                fut.set_exception(exc)
+
+    async def _fetch(
+        self,
+        inns: List[str],
+        client: AsyncHttpClient | None,
+    ) -> Dict[str, Tuple[Contacts, bool]]:
+        """ИНН → (контакты, можно ли кэшировать)."""
+        if client is None:
+            async with AsyncHttpClient(headers={"Authorization": USERBOX_KEY}) as session:
+                return await self._fetch(inns, session)
+
+        if not await self._budget_ok(client, len(inns)):
+            raise BudgetExceeded(f"Usersbox balance too low for {len(inns)} lookups")
+
+        raw = await UsersboxFetcher(inns, client).fetch()
+        parser = UsersboxParser()
+        out: Dict[str, Tuple[Contacts, bool]] = {}
+        for inn, resp in zip(inns, raw):
+            infos = parser.parse([resp])
+            contacts = await parse_pool.contacts([i.payload for i in infos])
+            out[inn] = (contacts, bool(resp) and resp.get("status") == "success")
+        return out
+
+    # ───────── бюджет ───────────────────────────────────────────
+    async def _budget_ok(self, client: AsyncHttpClient, n: int) -> bool:
+        """
+        Хватит ли баланса на `n` запросов; если да — они сразу списываются
+        с локального баланса (под блокировкой, чтобы параллельные пачки
+        не тратили одни и те же деньги до следующего /getMe).
+        """
+        if not self._min_balance:
+            return True
+        cost = n * self._query_cost
+        async with self._balance_lock:
+            if self._balance is None or time.monotonic() - self._balance_at > self._balance_ttl:
+                balance = await parse_me(client)
+                try:
+                    self._balance = float(balance)
+                    self._balance_at = time.monotonic()
+                except (TypeError, ValueError):
+                    # баланс неизвестен — не блокируем сбор, спросим позже
+                    logger.warning("Usersbox balance unavailable: %r", balance)
+            if self._balance is None:
+                return True
+            if self._balance - cost >= self._min_balance:
+                self._balance -= cost
+                return True
+            balance = self._balance
+        logger.warning(
+            "Usersbox balance %.2f minus %.2f for %s lookups is below %.2f, skipping",
+            balance, cost, n, self._min_balance,
+        )
+        return False
+
+
+usersbox_gateway = UsersboxGateway()
+
+__all__ = ["BudgetExceeded", "UsersboxGateway", "usersbox_gateway"]
@@ -3,14 +3,20 @@ from typing import List, Optional, Tuple, Dict, Set
 from datetime import datetime, timedelta, timezone
 import asyncio
 import logging
+from contextlib import AsyncExitStack, aclosing
 
 from config import settings
 from schemas.wb import WBParams, SellerOut
-from parser.wb_parser import parse_sellers, SellerStats
-from parser.rusprofile import parse_companies
-from parser.userbox import parse_records as parse_usersbox
-from utils.contacts import collect_contacts
+from parser.wb_parser import SellerPipeline, SellerStats
+from parser.rusprofile import CompanyLookup
+from parser.HTTPClient import AsyncHttpClient
+from parser.client_registry import HttpClientRegistry
+from parser.parser_cfg import settings as ParserConfig
 from services import db_utils as dbu
+from services.sweep import SweepRegistry
+from services.company_cache import company_cache
+from services.usersbox_gateway import BudgetExceeded, usersbox_gateway
+from utils.rusprofile_utils import _is_valid_inn
 
 logger = logging.getLogger(__name__)
 
@@ -23,14 +29,19 @@ def _make_key(params: WBParams) -> str:
         params.pages, params.regDate or "", params.maxRegDate or ""
     ]))
 
-async def _contacts_from_usersbox(inn: str) -> Tuple[Set[str], Set[str]]:
-    """Один запрос → Usersbox → (phones, emails). Ошибки = пустые множества."""
+async def _contacts_from_usersbox(
+    inn: str,
+    client: AsyncHttpClient | None = None,
+) -> Optional[Tuple[Set[str], Set[str]]]:
+    """
+    ИНН → Usersbox (через кэш и пачки шлюза) → (phones, emails). Ошибки = пустые множества.
+    None — запрос не отправлялся из-за баланса: продавец не проверен.
+    """
     try:
-        infos = await parse_usersbox([inn])
-        if not infos:
-            return set(), set()
-        phone, email = collect_contacts(i.payload for i in infos)
-        return phone, email
+        contacts = await usersbox_gateway.contacts(inn, client)
+        return set(contacts.phones), set(contacts.emails)
+    except BudgetExceeded:
+        return None
     except Exception as e:
         logger.exception("Usersbox parse failed for %s: %s", inn, e)
         return set(), set()
@@ -44,20 +55,31 @@ async def collect_data(
     params: WBParams,
     region_id: str,
     limit: Optional[int] = None,
+    http: HttpClientRegistry | None = None,
+    sweep: SweepRegistry | None = None,
 ) -> Tuple[List[SellerOut], bool]:
+    """
+    `http` — общие клиенты приложения; без него (скрипты) каждая стадия
+    открывает собственную сессию на время вызова.
+    `sweep` — реестр обхода нескольких подкатегорий: продавцы, уже взятые
+    другой подкатегорией, здесь пропускаются (и кэш результата не используется).
+    """
 
     flag_limit = False
     key = _make_key(params)
     now = _utc_now()
 
-    if key in _cache:
+    if sweep is None and key in _cache:
         ts, cached, cached_limit = _cache[key]
         if now - ts < settings.CACHE_TTL and cached_limit == limit:
             return cached, True
 
     region_list = [r.strip() for r in region_id.replace(";", ",").split(",") if r.strip()]
 
-    new_stats, already_full_ids = await parse_sellers(
+    THRESHOLD_DAYS = 30
+    retry_deadline = now - timedelta(days=THRESHOLD_DAYS)
+
+    pipeline = SellerPipeline(
         category=params.cat,
         shard=params.shard,
         pages=params.pages,
@@ -66,55 +88,41 @@ async def collect_data(
         max_sales=params.maxSaleCount,
         min_registration_date=params.regDate,
         max_registration_date=params.maxRegDate,
+        client=http.wb_catalog if http else None,
+        inn_client=http.wb_basket if http else None,
+        shipment_client=http.wb_shipment if http else None,
+        sweep=sweep,
+        retry_deadline=retry_deadline,
     )
 
     data: List[SellerOut] = []
-    contact_tasks: Dict[int, asyncio.Task[Tuple[Set[str], Set[str]]]] = {}
+    contact_tasks: Dict[int, asyncio.Task[Optional[Tuple[Set[str], Set[str]]]]] = {}
     tmp_models: Dict[int, dict] = {}
 
-    THRESHOLD_DAYS = 30
-    retry_deadline = now - timedelta(days=THRESHOLD_DAYS)
-
-
-    for seller in new_stats:
-        if limit is not None and (len(data) + len(tmp_models)) >= limit:
-            flag_limit = True
-            break
+    def _enrich_cap() -> int:
+        """Сколько продавцов ещё можно держать в обогащении, не превышая limit."""
+        cap = ParserConfig.ENRICH_CONCURRENCY
+        if limit is not None:
+            cap = min(cap, limit - len(tmp_models))
+        return cap
 
+    async def _enrich(seller: SellerStats, query: str, lookup: CompanyLookup) -> None:
         sid = seller.seller_id
+        seller_tax = await lookup.lookup(query, seller_id=sid)
+        if seller_tax is None:
+            return
 
-        if sid in already_full_ids:
-            continue
-
-        cache_rec = dbu.get_cached(sid)
-        if cache_rec and cache_rec.last_try_at > retry_deadline:
-            dbu.touch_cache(sid)
-            continue
-
-        if seller.ogrn and len(seller.ogrn) == 13:
-            query = f"{seller.ogrn}&type=ul"
-        elif seller.ogrnip and len(seller.ogrnip) == 15:
-            query = f"{seller.ogrnip}&type=ip"
-        else:
-            query = seller.inn
-
-        seller_tax = await parse_companies(ids=[query], seller_id=sid)
-        if not seller_tax:
-            continue
-
-        inn_for_contacts = seller_tax[0].inn or seller.inn
-
+        inn_for_contacts = seller_tax.inn or seller.inn
 
         contact_tasks[sid] = asyncio.create_task(
-            _contacts_from_usersbox(inn_for_contacts)
+            _contacts_from_usersbox(inn_for_contacts, http.usersbox if http else None)
         )
 
-
         tmp_models[sid] = dict(
             seller_id=sid,
-            tax_office=seller_tax[0].tax_office,
+            tax_office=seller_tax.tax_office,
             store_name=seller.trademark or None,
-            inn=seller_tax[0].inn,
+            inn=seller_tax.inn,
             url=f"https://www.wildberries.ru/seller/{sid}",
             reg_date=seller.registration_date,
             saleCount=seller.sale_item_quantity,
@@ -122,10 +130,58 @@ async def collect_data(
             ogrnip=seller.ogrnip or None,
         )
 
-
+    # Продавцы приходят из конвейера по мере готовности и сразу уходят
+    # в rusprofile через общий клиент. В обогащении одновременно не больше
+    # ENRICH_CONCURRENCY продавцов и не больше, чем осталось до limit.
+    pending: Set[asyncio.Task[None]] = set()
+    async with AsyncExitStack() as stack:
+        if http is not None:
+            rp_client = http.rusprofile
+        else:
+            rp_client = await stack.enter_async_context(AsyncHttpClient(proxy="random"))
+        lookup = CompanyLookup(rp_client)
+        try:
+            async with aclosing(pipeline.stream()) as new_stats:
+                async for seller in new_stats:
+                    while pending and len(pending) >= _enrich_cap():
+                        _, pending = await asyncio.wait(
+                            pending, return_when=asyncio.FIRST_COMPLETED
+                        )
+                    if limit is not None and len(tmp_models) >= limit:
+                        flag_limit = True
+                        break
+
+                    if seller.ogrn and len(seller.ogrn) == 13:
+                        query = f"{seller.ogrn}&type=ul"
+                    elif seller.ogrnip and len(seller.ogrnip) == 15:
+                        query = f"{seller.ogrnip}&type=ip"
+                    else:
+                        query = str(seller.inn or "").strip()
+                    # как в parse_companies: пустой/битый номер в rusprofile не шлём
+                    if not _is_valid_inn(query.split("&", 1)[0]):
+                        logger.debug("Skip seller %s: invalid INN %r", seller.seller_id, query)
+                        continue
+
+                    pending.add(asyncio.create_task(_enrich(seller, query, lookup)))
+
+            if pending:
+                await asyncio.gather(*pending)
+            done = await asyncio.gather(*contact_tasks.values())
+        finally:
+            # сбой или отмена (клиент отключился) — незавершённое обогащение
+            # и запросы контактов отменяем, чтобы не тратить на них Usersbox
+            for t in (*pending, *contact_tasks.values()):
+                if not t.done():
+                    t.cancel()
+            await company_cache.flush()
+
+    no_contacts: List[SellerOut] = []
     if contact_tasks:
-        done = await asyncio.gather(*contact_tasks.values())
-        for sid, (phones, emails) in zip(contact_tasks.keys(), done):
+        for sid, found in zip(contact_tasks.keys(), done):
+            if found is None:
+                # не проверен из-за баланса — не в кэш, иначе его не спросят TTL дней
+                continue
+            phones, emails = found
             base_kwargs = tmp_models[sid]
 
             if phones or emails:
@@ -135,8 +191,6 @@ async def collect_data(
                     phone=sorted(phones),
                     email=sorted(emails),
                 )
-                dbu.add_seller(sModel)
-                dbu.remove_from_cache(sid)
                 data.append(sModel)
             else:
 
@@ -145,10 +199,11 @@ async def collect_data(
                     phone=[],
                     email=[],
                 )
-                if dbu.get_cached(sid):
-                    dbu.touch_cache(sid)
-                else:
-                    dbu.add_to_cache(sModel)
+                no_contacts.append(sModel)
+
+    # Всё, что нашли за прогон, пишем одной транзакцией
+    await dbu.save_collected(data, no_contacts, pipeline.recent_ids)
 
-    _cache[key] = (now, data, limit)
+    if sweep is None:
+        _cache[key] = (now, data, limit)
     return data, flag_limit
@@ -0,0 +1,90 @@
+"""
+Планы запросов поиска (services.seller_filter): каждый вариант фильтра
+должен идти по своему индексу с условием из фильтра (Index Cond).
+Одного «нет Seq Scan» мало: с enable_seqscan=off планировщик уходит
+в полный проход по первичному ключу, и такой тест не падает никогда.
+
+Нужна база с применёнными миграциями (настройки из .env / окружения);
+без неё тест пропускается. enable_seqscan=off — чтобы на маленькой базе
+планировщик показал, есть ли вообще индексный путь.
+"""
+from datetime import date
+from typing import Iterator, List, Set
+
+import pytest
+from sqlalchemy import inspect, select, text
+
+try:
+    from database import engine
+except Exception as e:      # нет настроек БД (config.Settings не собрался)
+    pytest.skip(f"database is not configured: {e}", allow_module_level=True)
+
+from models.seller import Seller
+from services.seller_filter import SellerFilter
+
+# вариант → (фильтр, индекс, который должен его обслуживать)
+VARIANTS = {
+    "q": (SellerFilter(q="ромашка"), "ix_sellers_store_name_trgm"),
+    "region": (SellerFilter(region="77,50"), "ix_sellers_region_code"),
+    "sales": (SellerFilter(salesFrom=10, salesTo=1000), "ix_sellers_sale_count_reg_date"),
+    "sales+reg_date": (
+        SellerFilter(salesFrom=10, dateFrom=date(2023, 1, 1), dateTo=date(2023, 12, 31)),
+        "ix_sellers_sale_count_reg_date",
+    ),
+    "category": (SellerFilter(category="Платья"), "ix_sellers_categories_created_at"),
+    "category+created": (
+        SellerFilter(category="Платья", createdFrom=date(2025, 1, 1)),
+        "ix_sellers_categories_created_at",
+    ),
+    "created": (
+        SellerFilter(createdFrom=date(2025, 1, 1), createdTo=date(2025, 6, 30)),
+        "ix_sellers_created_at",
+    ),
+}
+
+_INDEX_NODES = ("Index Scan", "Index Only Scan", "Bitmap Index Scan")
+
+
+def _nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for sub in plan.get("Plans", ()):
+        yield from _nodes(sub)
+
+
+def _seq_scans(plan: dict) -> List[dict]:
+    return [
+        n for n in _nodes(plan)
+        if n.get("Node Type") == "Seq Scan" and n.get("Relation Name") == "sellers"
+    ]
+
+
+def _indexes_with_cond(plan: dict) -> Set[str]:
+    """Индексы, по которым план реально ищет (а не просто перебирает их целиком)."""
+    return {
+        n["Index Name"] for n in _nodes(plan)
+        if n.get("Node Type") in _INDEX_NODES and n.get("Index Cond")
+    }
+
+
+@pytest.fixture(scope="module")
+def conn():
+    try:
+        connection = engine.connect()
+    except Exception as e:
+        pytest.skip(f"database is unavailable: {e}")
+    with connection:
+        if not inspect(connection).has_table("sellers"):
+            pytest.skip("sellers table is missing (migrations not applied)")
+        connection.execute(text("SET enable_seqscan = off"))
+        yield connection
+
+
+@pytest.mark.parametrize("name", list(VARIANTS))
+def test_filter_uses_index(conn, name):
+    flt, index = VARIANTS[name]
+    stmt = flt.apply(select(Seller.id))
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()[0]["Plan"]
+    assert not _seq_scans(plan), f"{name}: Seq Scan on sellers\n{sql}"
+    used = _indexes_with_cond(plan)
+    assert index in used, f"{name}: expected {index}, plan searches {sorted(used) or 'no index'}\n{sql}"
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES_PATH = Path(__file__).resolve().parent.parent / "categories.json"
+
+Node = Dict[str, Any]
+
+
+class CategoryIndex:
+    """
+    Дерево категорий WB, разобранное один раз и разложенное по словарям:
+    id → узел, id → родитель, id → готовый список листьев, shard/query → id.
+
+    Файл перечитывается, только если изменился его mtime (проверка не чаще
+    раза в CHECK_INTERVAL секунд). Узлы отдаются как есть — не мутировать.
+    """
+
+    CHECK_INTERVAL = 5.0
+
+    def __init__(self, path: Path = CATEGORIES_PATH) -> None:
+        self._path = path
+        self._mtime: float | None = None
+        self._checked_at = 0.0
+        self._roots: Tuple[int, ...] = ()
+        self._nodes: Dict[int, Node] = {}
+        self._parent: Dict[int, Optional[int]] = {}
+        self._children: Dict[int, Tuple[int, ...]] = {}
+        self._leaves: Dict[int, Tuple[Node, ...]] = {}
+        self._by_query: Dict[str, int] = {}
+        self._by_shard: Dict[str, List[int]] = {}
+        self._names: List[Tuple[str, int]] = []
+
+    # ───────── загрузка ─────────────────────────────────────────
+    def load(self) -> "CategoryIndex":
+        mtime = os.stat(self._path).st_mtime
+        tree = json.loads(self._path.read_text(encoding="utf-8"))
+        self._build(tree)
+        self._mtime = mtime
+        self._checked_at = time.monotonic()
+        logger.info("category index: %s nodes, %s roots", len(self._nodes), len(self._roots))
+        return self
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        if self._mtime is not None and now - self._checked_at < self.CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self._path).st_mtime
+        except OSError as e:
+            if self._mtime is None:
+                raise
+            logger.warning("categories.json недоступен, работаем со старым индексом: %s", e)
+            return
+        if mtime != self._mtime:
+            self.load()
+
+    def _build(self, tree: List[Node]) -> None:
+        nodes: Dict[int, Node] = {}
+        parent: Dict[int, Optional[int]] = {}
+        children: Dict[int, Tuple[int, ...]] = {}
+        leaves: Dict[int, Tuple[Node, ...]] = {}
+        by_query: Dict[str, int] = {}
+        by_shard: Dict[str, List[int]] = {}
+
+        def _walk(node: Node, parent_id: Optional[int]) -> Tuple[Node, ...]:
+            cid = node["id"]
+            nodes[cid] = node
+            parent[cid] = parent_id
+            if node.get("query"):
+                by_query[node["query"]] = cid
+            if node.get("shard"):
+                by_shard.setdefault(node["shard"], []).append(cid)
+
+            kids = node.get("childs") or []
+            children[cid] = tuple(k["id"] for k in kids)
+            if not kids:
+                leaves[cid] = ()
+                return (node,)
+            acc: List[Node] = []
+            for k in kids:
+                acc.extend(_walk(k, cid))
+            leaves[cid] = tuple(acc)
+            return leaves[cid]
+
+        for root in tree:
+            _walk(root, None)
+
+        # подменяем целиком — читатели на том же loop не увидят полусобранный индекс
+        self._roots = tuple(r["id"] for r in tree)
+        self._nodes, self._parent, self._children = nodes, parent, children
+        self._leaves, self._by_query, self._by_shard = leaves, by_query, by_shard
+        self._names = [((n.get("name") or "").lower(), cid) for cid, n in nodes.items()]
+
+    # ───────── API ──────────────────────────────────────────────
+    def roots(self) -> List[Node]:
+        self._ensure_fresh()
+        return [self._nodes[i] for i in self._roots]
+
+    def get(self, category_id: int) -> Optional[Node]:
+        self._ensure_fresh()
+        return self._nodes.get(category_id)
+
+    def by_query(self, query: str) -> Optional[Node]:
+        self._ensure_fresh()
+        cid = self._by_query.get(query)
+        return None if cid is None else self._nodes[cid]
+
+    def by_shard(self, shard: str) -> List[Node]:
+        self._ensure_fresh()
+        return [self._nodes[i] for i in self._by_shard.get(shard, ())]
+
+    def children(self, category_id: int) -> List[Node]:
+        self._ensure_fresh()
+        return [self._nodes[i] for i in self._children.get(category_id, ())]
+
+    def leaves(self, category_id: int) -> List[Node]:
+        """Все конечные подкатегории под `category_id` (у листа — пусто)."""
+        self._ensure_fresh()
+        return list(self._leaves.get(category_id, ()))
+
+    def path(self, category_id: int) -> List[Node]:
+        """Цепочка от корня до категории включительно."""
+        self._ensure_fresh()
+        out: List[Node] = []
+        cid: Optional[int] = category_id
+        while cid is not None and cid in self._nodes:
+            out.append(self._nodes[cid])
+            cid = self._parent.get(cid)
+        return out[::-1]
+
+    def search(self, q: str, limit: int = 20) -> List[Node]:
+        """Подстрока в названии без учёта регистра; сначала совпадения с начала."""
+        self._ensure_fresh()
+        q = q.strip().lower()
+        if not q:
+            return []
+        prefix: List[int] = []
+        inner: List[int] = []
+        for name, cid in self._names:
+            pos = name.find(q)
+            if pos == 0:
+                prefix.append(cid)
+            elif pos > 0:
+                inner.append(cid)
+        return [self._nodes[i] for i in (prefix + inner)[:limit]]
+
+    def __len__(self) -> int:
+        self._ensure_fresh()
+        return len(self._nodes)
+
+
+category_index = CategoryIndex()
+
+__all__ = ["CategoryIndex", "category_index", "CATEGORIES_PATH"]
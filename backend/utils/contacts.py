@@ -1,11 +1,9 @@
-import itertools
-import json
 import re
 import phonenumbers
 
 from phonenumbers import PhoneNumberMatcher, PhoneNumberFormat
 
-from typing import Iterable, Tuple, Set, Mapping, Any
+from typing import Iterable, Iterator, List, Tuple, Set, Mapping, Any
 
 EMAIL_RE = re.compile(
     r'''(?<![\w@.+-])                       
@@ -23,17 +21,32 @@ FMT = PhoneNumberFormat.E164
 MOBILE_RE = re.compile(r'^\+79\d{9}$')      # мобильные: +7 9XXXXXXXXX
 LANDLINE_RE = re.compile(r'^\+74\d{9}$')
 
-def extract_phones_any(payload, default_region="RU"):
-    """
-    ▸ Не зависит от названий полей;
-    ▸ Отсекает ИНН/ОГРН и прочие «голые» цифровые строки;
-    ▸ Возвращает уникальные телефоны в E.164.
-    """
-    whole_text = json.dumps(payload, ensure_ascii=False)
+MAX_PHONES = 10
+
+# Дешёвый предфильтр: ≥10 цифр с промежутками не длиннее 3 символов —
+# «+7 (916) 123-45-67», «89161234567». Без этого libphonenumber
+# гоняется по каждой строке ответа.
+PHONE_CANDIDATE = re.compile(r"(?:\d\D{0,3}){10}")
 
-    phones = set()
-    for m in PhoneNumberMatcher(whole_text, default_region):
-        raw = whole_text[m.start:m.end]
+
+def _leaves(payload: Any) -> Iterator[str]:
+    """Строковые листья дерева (числа — строкой) в порядке документа, без рекурсии."""
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            yield node
+        elif isinstance(node, Mapping):
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, (list, tuple)):
+            stack.extend(reversed(node))
+        elif isinstance(node, (int, float)) and not isinstance(node, bool):
+            yield str(node)
+
+
+def _phones_in(text: str, default_region: str) -> Iterator[str]:
+    for m in PhoneNumberMatcher(text, default_region):
+        raw = m.raw_string
         digits_only = DIGITS.sub('', raw)
 
         looks_like_phone = (
@@ -58,17 +71,39 @@ def extract_phones_any(payload, default_region="RU"):
         if not MOBILE_RE.match(formatted):
             continue
 
-        phones.add(formatted)
+        yield formatted
 
-        if len(phones) >= 10:
-            break
 
-    return sorted(phones)
+def extract_contacts(payload, default_region="RU", max_phones=MAX_PHONES) -> Tuple[List[str], List[str]]:
+    """
+    Телефоны и почты за один обход ответа:
+    ▸ Не зависит от названий полей — смотрим все строковые/числовые листья;
+    ▸ libphonenumber вызывается только для строк, похожих на телефон
+      (PHONE_CANDIDATE), почтовый regex — только для строк с «@»;
+    ▸ Отсекает ИНН/ОГРН и прочие «голые» цифровые строки;
+    ▸ Телефоны — уникальные мобильные в E.164, не больше `max_phones`.
+    """
+    phones: Set[str] = set()
+    emails: Set[str] = set()
+
+    for text in _leaves(payload):
+        if '@' in text:
+            emails.update(m.group(0).lower() for m in EMAIL_RE.finditer(text))
+        if len(phones) < max_phones and PHONE_CANDIDATE.search(text):
+            for ph in _phones_in(text, default_region):
+                phones.add(ph)
+                if len(phones) >= max_phones:
+                    break
+
+    return sorted(phones), sorted(emails)
+
+
+def extract_phones_any(payload, default_region="RU"):
+    return extract_contacts(payload, default_region)[0]
 
 
 def extract_emails_any(payload) -> list[str]:
-    blob = json.dumps(payload, ensure_ascii=False)
-    return sorted({m.group(0).lower() for m in EMAIL_RE.finditer(blob)})
+    return extract_contacts(payload)[1]
 
 
 def collect_contacts(payloads: Iterable[Mapping[str, Any]]
@@ -78,7 +113,9 @@ def collect_contacts(payloads: Iterable[Mapping[str, Any]]
     emails: Set[str]  = set()
 
     for p in payloads:
-        phones.update(extract_phones_any(p))
-        emails.update(extract_emails_any(p))
+        ph, em = extract_contacts(p)
+        phones.update(ph)
+        emails.update(em)
+
+    return phones, emails
 
-    return phones, emails
\ No newline at end of file
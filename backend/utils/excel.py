@@ -1,208 +1,294 @@
-from typing import List, Dict, Any
-from datetime import datetime, time
-import openpyxl.utils.cell
-from openpyxl import load_workbook, Workbook
-from openpyxl.formatting.rule import ColorScaleRule
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional, Union
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, PatternFill
 from openpyxl.styles.borders import Border, Side
+from starlette.responses import StreamingResponse
+
 from schemas.wb import SellerOut
 
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+MAX_PHONES = 10
+
+HEADER = [
+    "Айди продавца",
+    "Наименование магазина",
+    "Ссылка",
+    "ИНН",
+    "ОГРН",
+    "ОГРНИП",
+    "Регистратор",
+    "Продаж",
+    "Дата создание магазина",
+    "Телефон",
+    *(f"Телефон {i}" for i in range(2, MAX_PHONES + 1)),
+    "Почта",
+]
+
+WIDTHS = {
+    "A": 16.67, "B": 40.67, "C": 44.67, "D": 15.67, "E": 17.67,
+    "F": 19.67, "G": 60.67, "H": 15.67, "I": 24.67,
+    **{col: 20.67 for col in "JKLMNOPQRS"},
+    "T": 25.67,
+}
+
+HEADER_HEIGHT = 36.67
+
+Rows = Union[Iterable[Any], AsyncIterable[Any]]
+
+
+# ───────── строки ───────────────────────────────────────────────
+def seller_row(seller: Any) -> List[Any]:
+    """SellerOut / SellerDetail / dict из результата задачи → значения строки."""
+    if isinstance(seller, dict):
+        seller = SellerOut(**seller)
+    row = [
+        seller.seller_id,
+        seller.store_name,
+        seller.url,
+        seller.inn,
+        seller.ogrn or None,
+        seller.ogrnip or None,
+        seller.tax_office,
+        seller.saleCount,
+        str(seller.reg_date).split("+")[0] if seller.reg_date else None,
+    ]
+    phones = seller.phone or []
+    row.extend(phones[i] if i < len(phones) else None for i in range(MAX_PHONES))
+    row.extend(seller.email or [])
+    return row
+
+
+class _Styles:
+    """
+    Стили заголовка и тела, собранные один раз на книгу.
+    Ячейкам раздаётся готовый StyleArray — openpyxl не ищет
+    Border/Font в своих реестрах на каждую ячейку.
+    """
+
+    def __init__(self, ws) -> None:
+        thin = Side(border_style="thin", color="16365C")
+        border = Border(left=thin, right=thin, bottom=thin)
+
+        head = WriteOnlyCell(ws)
+        head.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+        head.font = Font(size=14)
+        head.fill = PatternFill("solid", fgColor="bfbfbf")
+        head.border = border
+        body = WriteOnlyCell(ws)
+        body.border = border
+
+        self._ws = ws
+        self._head = head._style
+        self._body = body._style
+
+    def _cells(self, values: List[Any], style) -> List[WriteOnlyCell]:
+        out = []
+        for v in values:
+            c = WriteOnlyCell(self._ws, v)
+            c._style = style
+            out.append(c)
+        return out
+
+    def header(self, values: List[Any]) -> List[WriteOnlyCell]:
+        return self._cells(values, self._head)
+
+    def body(self, values: List[Any]) -> List[WriteOnlyCell]:
+        # добиваем до ширины заголовка, чтобы рамка была у пустых телефонов
+        if len(values) < len(HEADER):
+            values = values + [None] * (len(HEADER) - len(values))
+        return self._cells(values, self._body)
+
+
+# ───────── запись ───────────────────────────────────────────────
+def write_xlsx(rows: Iterable[Any], sink, title: str = "Sellers") -> None:
+    """
+    Write-only книга: строки уходят во временный файл openpyxl по мере
+    поступления, в памяти держится одна строка. `sink` — путь или
+    файлоподобный объект (в т.ч. без seek).
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+
+    it = iter(rows)
+    first = next(it, None)
+    if first is not None:
+        for col, width in WIDTHS.items():
+            ws.column_dimensions[col].width = width
+        ws.row_dimensions[1].height = HEADER_HEIGHT
+
+        styles = _Styles(ws)
+        ws.append(styles.header(HEADER))
+        ws.append(styles.body(seller_row(first)))
+        for seller in it:
+            ws.append(styles.body(seller_row(seller)))
+
+    wb.save(sink)
+
+
+def generate_excel(data: List[SellerOut], filename: str = "sellers.xlsx") -> str:
+    write_xlsx(data, filename, title="Sellers")
+    return filename
+
+
 def generate_excel_search(data: list, filename: str = "search_results.xlsx") -> str:
     """
     Генерация Excel-файла для результатов поиска SellerDetail.
     Форматирование такое же, как в generate_excel.
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "SearchResults"
-
-    if not data:
-        wb.save(filename)
-        return filename
-
-    ws.append(
-        [
-            "Айди продавца",
-            "Наименование магазина",
-            "Ссылка",
-            "ИНН",
-            "ОГРН",
-            "ОГРНИП",
-            "Регистратор",
-            "Продаж",
-            "Дата создание магазина",
-            "Телефон",
-            "Телефон 2",
-            "Телефон 3",
-            "Телефон 4",
-            "Телефон 5",
-            "Телефон 6",
-            "Телефон 7",
-            "Телефон 8",
-            "Телефон 9",
-            "Телефон 10",
-            "Почта"
-        ]
-    )
-    MAX_PHONES = 10
-    for seller in data:
-        d = [
-            seller.seller_id,
-            seller.store_name,
-            seller.url,
-            seller.inn,
-            seller.ogrn if seller.ogrn else None,
-            seller.ogrnip if seller.ogrnip else None,
-            seller.tax_office,
-            seller.saleCount if seller.saleCount is not None else None,
-            str(seller.reg_date).split("+")[0] if seller.reg_date else None,
-        ]
-
-        phones = seller.phone or []
-        for i in range(MAX_PHONES):
-            d.append(phones[i] if i < len(phones) else None)
-
-        for email in (seller.email or []):
-            d.append(email)
-        ws.append(
-            d
-        )
-
-    # Форматирование заголовка
-    for cell in ws[1]:
-        cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        cell.font = Font(size=14)
-        cell.fill = PatternFill("solid", fgColor="bfbfbf")
-
-    # Границы для всех ячеек
-    thin = Side(border_style="thin", color="16365C")
-    for row in ws.iter_rows():
-        for cell in row:
-            cell.border = Border(left=thin, right=thin, bottom=thin)
-
-    ws.column_dimensions["A"].width = 16.67
-    ws.column_dimensions["B"].width = 40.67
-    ws.column_dimensions["C"].width = 44.67
-    ws.column_dimensions["D"].width = 15.67
-    ws.column_dimensions["E"].width = 17.67
-    ws.column_dimensions["F"].width = 19.67
-    ws.column_dimensions["G"].width = 60.67
-    ws.column_dimensions["H"].width = 15.67
-    ws.column_dimensions["I"].width = 24.67
-    ws.column_dimensions["J"].width = 20.67
-    ws.column_dimensions["K"].width = 20.67
-    ws.column_dimensions["L"].width = 20.67
-    ws.column_dimensions["M"].width = 20.67
-    ws.column_dimensions["N"].width = 20.67
-    ws.column_dimensions["O"].width = 20.67
-    ws.column_dimensions["P"].width = 20.67
-    ws.column_dimensions["Q"].width = 20.67
-    ws.column_dimensions["R"].width = 20.67
-    ws.column_dimensions["S"].width = 20.67
-    ws.column_dimensions["T"].width = 25.67
-
-    ws.row_dimensions[1].height = 36.67
-
-    wb.save(filename)
+    write_xlsx(data, filename, title="SearchResults")
     return filename
 
-def generate_excel(data: List[SellerOut], filename: str = "sellers.xlsx") -> str:
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Sellers"
-
-    normalized: List[SellerOut] = []
-    for item in data:
-        if isinstance(item, dict):
-            normalized.append(SellerOut(**item))
-        else:
-            normalized.append(item)
-    data = normalized
-
-    if not data:
-        wb.save(filename)
-        return filename
-
-    ws.append(
-        [
-            "Айди продавца",
-            "Наименование магазина",
-            "Ссылка",
-            "ИНН",
-            "ОГРН",
-            "ОГРНИП",
-            "Регистратор",
-            "Продаж",
-            "Дата создание магазина",
-            "Телефон",
-            "Телефон 2",
-            "Телефон 3",
-            "Телефон 4",
-            "Телефон 5",
-            "Телефон 6",
-            "Телефон 7",
-            "Телефон 8",
-            "Телефон 9",
-            "Телефон 10",
-            "Почта"
-        ]
+
+# ───────── стриминг ─────────────────────────────────────────────
+class _Aborted(Exception):
+    """Клиент ушёл — писатель в потоке бросает работу."""
+
+
+class _QueueSink:
+    """
+    Файлоподобный приёмник для zipfile: копит байты и отдаёт их
+    в asyncio.Queue кусками по `chunk_size`. Очередь ограничена —
+    поток-писатель ждёт, пока клиент заберёт данные (backpressure).
+    tell/seek нет намеренно: zipfile пишет без перемотки.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue, chunk_size: int) -> None:
+        self._loop = loop
+        self._queue = queue
+        self._chunk_size = chunk_size
+        self._buf = bytearray()
+        self.aborted = False
+        self._raised = False
+
+    def call(self, coro) -> Any:
+        """Выполнить корутину на loop из потока, не зависнув, если клиент ушёл."""
+        fut = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        while True:
+            try:
+                return fut.result(timeout=0.5)
+            except concurrent.futures.TimeoutError:
+                if self.aborted:
+                    fut.cancel()
+                    self._raised = True
+                    raise _Aborted()
+
+    def write(self, data) -> int:
+        if self.aborted:
+            if self._raised:
+                return len(data)    # добивает ZipFile.__del__ — молча выбрасываем
+            self._raised = True
+            raise _Aborted()
+        self._buf += data
+        if len(self._buf) >= self._chunk_size:
+            self._push()
+        return len(data)
+
+    def _push(self) -> None:
+        chunk, self._buf = bytes(self._buf), bytearray()
+        self.call(self._queue.put(chunk))
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if self._buf and not self.aborted:
+            self._push()
+
+
+_EOF = object()
+
+
+async def _take(ait, n: int) -> List[Any]:
+    batch = []
+    async for item in ait:
+        batch.append(item)
+        if len(batch) >= n:
+            break
+    return batch
+
+
+def _sync_rows(rows: Rows, sink: _QueueSink, batch: int = 500) -> Iterator[Any]:
+    """Асинхронный источник читаем пачками — один переход на loop на `batch` строк."""
+    if not hasattr(rows, "__aiter__"):
+        yield from rows
+        return
+    ait = rows.__aiter__()
+    while True:
+        items = sink.call(_take(ait, batch))
+        if not items:
+            return
+        yield from items
+
+
+async def stream_xlsx(
+    rows: Rows,
+    title: str = "Sellers",
+    chunk_size: int = 64 * 1024,
+    max_chunks: int = 16,
+) -> AsyncIterator[bytes]:
+    """
+    Книга отдаётся кусками по мере записи. openpyxl работает в потоке,
+    строки можно подавать и обычным, и асинхронным итератором —
+    асинхронный дочитывается на event loop.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_chunks)
+    sink = _QueueSink(loop, queue, chunk_size)
+
+    def _job() -> None:
+        err: Optional[BaseException] = None
+        try:
+            write_xlsx(_sync_rows(rows, sink), sink, title=title)
+            sink.close()
+        except _Aborted:
+            return
+        except BaseException as e:
+            err = e
+        try:
+            sink.call(queue.put(err or _EOF))
+        except _Aborted:
+            pass
+
+    writer = loop.run_in_executor(None, _job)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _EOF:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        sink.aborted = True
+        try:
+            await writer        # писатель замечает abort за ≤0.5 с
+        except Exception:
+            pass
+        aclose = getattr(rows, "aclose", None)
+        if aclose is not None:
+            await aclose()      # закрыть курсор/сессию источника сразу, а не на GC
+
+
+def xlsx_response(rows: Rows, filename: str, title: str = "Sellers") -> StreamingResponse:
+    return StreamingResponse(
+        stream_xlsx(rows, title=title),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
-    MAX_PHONES = 10
-    for seller in data:
-        d = [
-                seller.seller_id,
-                seller.store_name,
-                seller.url,
-                seller.inn,
-                seller.ogrn if seller.ogrn else None,
-                seller.ogrnip if seller.ogrnip else None,
-                seller.tax_office,
-                seller.saleCount,
-                str(seller.reg_date).split('+')[0] if seller.reg_date else None,
-            ]
-        phones = seller.phone or []
-        for i in range(MAX_PHONES):
-            d.append(phones[i] if i < len(phones) else None)
-
-        for email in (seller.email or []):
-            d.append(email)
-        ws.append(
-            d
-        )
-
-    for row in ws.iter_rows(max_row=1):
-        for cell in row:
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-            cell.font = Font(size=14)
-            cell.fill = PatternFill("solid", fgColor="bfbfbf")
-
-    thin_border = Side(border_style="thin", color="16365C")
-    for row in ws.iter_rows():
-        for cell in row:
-            cell.border = Border(left=thin_border, right=thin_border, bottom=thin_border)
-
-    ws.column_dimensions["A"].width = 16.67
-    ws.column_dimensions["B"].width = 40.67
-    ws.column_dimensions["C"].width = 44.67
-    ws.column_dimensions["D"].width = 15.67
-    ws.column_dimensions["E"].width = 17.67
-    ws.column_dimensions["F"].width = 19.67
-    ws.column_dimensions["G"].width = 60.67
-    ws.column_dimensions["H"].width = 15.67
-    ws.column_dimensions["I"].width = 24.67
-    ws.column_dimensions["J"].width = 20.67
-    ws.column_dimensions["K"].width = 20.67
-    ws.column_dimensions["L"].width = 20.67
-    ws.column_dimensions["M"].width = 20.67
-    ws.column_dimensions["N"].width = 20.67
-    ws.column_dimensions["O"].width = 20.67
-    ws.column_dimensions["P"].width = 20.67
-    ws.column_dimensions["Q"].width = 20.67
-    ws.column_dimensions["R"].width = 20.67
-    ws.column_dimensions["S"].width = 20.67
-    ws.column_dimensions["T"].width = 25.67
-
-    ws.row_dimensions[1].height = 36 + 0.67
-
-    wb.save(filename)
-    return filename
\ No newline at end of file
+
+
+__all__ = [
+    "XLSX_MEDIA_TYPE",
+    "generate_excel",
+    "generate_excel_search",
+    "write_xlsx",
+    "stream_xlsx",
+    "xlsx_response",
+]
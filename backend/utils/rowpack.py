@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import zlib
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List
+
+import msgpack
+
+# Формат: zlib( msgpack([VERSION, [колонки], [значения колонки 1], …]) ).
+# Колоночная раскладка: имя ключа хранится один раз на блок, а однотипные
+# значения подряд жмутся заметно лучше, чем строки JSON вперемешку.
+VERSION = 1
+LEVEL = 6
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    return str(obj)
+
+
+def pack_rows(rows: Iterable[Dict[str, Any]]) -> bytes:
+    rows = list(rows)
+    columns: Dict[str, None] = {}
+    for r in rows:
+        for k in r:
+            if k not in columns:
+                columns[k] = None
+    names = list(columns)
+    data = [[r.get(k) for r in rows] for k in names]
+    raw = msgpack.packb([VERSION, names, len(rows), *data], default=_default, use_bin_type=True)
+    return zlib.compress(raw, LEVEL)
+
+
+def unpack_rows(blob: bytes) -> List[Dict[str, Any]]:
+    if not blob:
+        return []
+    version, names, n, *data = msgpack.unpackb(zlib.decompress(blob), raw=False)
+    if version != VERSION:
+        raise ValueError(f"unsupported rowpack version {version}")
+    if not names:
+        return [{} for _ in range(n)]
+    return [dict(zip(names, values)) for values in zip(*data)]
+
+
+__all__ = ["pack_rows", "unpack_rows"]
+
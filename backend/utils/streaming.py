@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List
+
+from starlette.responses import StreamingResponse
+
+# Ответ уже в итоговом виде — middleware не должна его буферизовать и оборачивать
+STREAMED_HEADER = "X-Streamed"
+
+Batches = AsyncIterator[List[Dict[str, Any]]]
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, default=str)
+
+
+async def _json_array(batches: Batches, started: float, envelope: bool = True) -> AsyncIterator[bytes]:
+    """
+    {"time": …, "data": [ … ]} — та же обёртка, что делает middleware,
+    но строки уходят клиенту пачками по мере чтения курсора.
+    time — сколько прошло до первой пачки. envelope=False — голый массив
+    (пути, которые middleware не оборачивает).
+    """
+    def _head() -> bytes:
+        if not envelope:
+            return b"["
+        ms = int((time.monotonic() - started) * 1000)
+        return f'{{"time": "{ms}ms", "data": ['.encode()
+
+    head_sent = False
+    sep = ""
+    async for batch in batches:
+        if not head_sent:
+            yield _head()
+            head_sent = True
+        if not batch:
+            continue
+        yield (sep + ",".join(_dumps(r) for r in batch)).encode()
+        sep = ","
+    if not head_sent:
+        yield _head()
+    yield b"]}" if envelope else b"]"
+
+
+async def _ndjson(batches: Batches) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        if batch:
+            yield "".join(_dumps(r) + "\n" for r in batch).encode()
+
+
+def json_stream_response(batches: Batches, *, ndjson: bool = False, envelope: bool = True) -> StreamingResponse:
+    if ndjson:
+        return StreamingResponse(
+            _ndjson(batches),
+            media_type="application/x-ndjson",
+            headers={STREAMED_HEADER: "1"},
+        )
+    return StreamingResponse(
+        _json_array(batches, time.monotonic(), envelope),
+        media_type="application/json",
+        headers={STREAMED_HEADER: "1"},
+    )
+
+
+__all__ = ["STREAMED_HEADER", "json_stream_response"]
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import re
+import time
+from collections import OrderedDict
+from typing import Hashable, List, NamedTuple, Optional, Set, Tuple
+
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+class Suggestion(NamedTuple):
+    id: int
+    store_name: str
+    inn: Optional[str]
+    ogrn: Optional[str]
+    ogrnip: Optional[str]
+    sale_count: int
+
+
+def normalize(q: str) -> str:
+    return " ".join(q.lower().split())
+
+
+def trigrams(s: str) -> Set[str]:
+    """Как в pg_trgm: слова в нижнем регистре, «  слово » → тройки символов."""
+    out: Set[str] = set()
+    for w in _WORD.findall(s.lower()):
+        w = f"  {w} "
+        out.update(w[i : i + 3] for i in range(len(w) - 2))
+    return out
+
+
+def similarity(a: str, b: str) -> float:
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+def is_id_query(q: str) -> bool:
+    """Цифры — ищем ещё и по началу ИНН / ОГРН / ОГРНИП."""
+    return q.isdigit()
+
+
+def matches(s: Suggestion, q: str) -> bool:
+    """Python-зеркало SQL-фильтра автодополнения (q уже нормализован)."""
+    if q in (s.store_name or "").lower():
+        return True
+    return is_id_query(q) and any(v and v.startswith(q) for v in (s.inn, s.ogrn, s.ogrnip))
+
+
+def rank_key(s: Suggestion, q: str) -> Tuple:
+    """Python-зеркало ORDER BY автодополнения: по возрастанию ключа."""
+    name = (s.store_name or "").lower()
+    id_hit = is_id_query(q) and any(v and v.startswith(q) for v in (s.inn, s.ogrn, s.ogrnip))
+    return (not id_hit, not name.startswith(q), -similarity(name, q), -s.sale_count, s.id)
+
+
+class SuggestCache:
+    """
+    LRU с TTL для ответов автодополнения, по процессу.
+
+    Ключ — (фильтры, нормализованный q), хранится и limit ответа. Если на более короткий
+    префикс с теми же фильтрами уже был *полный* ответ (строк меньше limit),
+    то результат длинного запроса — его подмножество: фильтруем и
+    ранжируем в памяти, в БД не ходим.
+    """
+
+    MIN_PREFIX = 3
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 30.0) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: "OrderedDict[Tuple[Hashable, str], Tuple[float, int, List[Suggestion]]]" = OrderedDict()
+
+    def _fresh(self, key) -> Optional[Tuple[float, int, List[Suggestion]]]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if time.monotonic() - item[0] > self._ttl:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return item
+
+    def get(self, filters: Hashable, q: str, limit: int) -> Optional[List[Suggestion]]:
+        item = self._fresh((filters, q))
+        if item is not None:
+            _, cached_limit, rows = item
+            if len(rows) < cached_limit or cached_limit >= limit:
+                return rows[:limit]
+
+        # самый длинный префикс с полным ответом; короче MIN_PREFIX SQL ищет
+        # только по началу названия, а не по подстроке — такой не годится
+        for i in range(len(q) - 1, self.MIN_PREFIX - 1, -1):
+            item = self._fresh((filters, q[:i]))
+            if item is None:
+                continue
+            _, cached_limit, rows = item
+            if len(rows) >= cached_limit:
+                continue        # ответ обрезан limit — подмножество неполное
+            hits = sorted((r for r in rows if matches(r, q)), key=lambda r: rank_key(r, q))
+            self.put(filters, q, len(hits) + 1, hits)      # заведомо полный
+            return hits[:limit]
+        return None
+
+    def put(self, filters: Hashable, q: str, limit: int, rows: List[Suggestion]) -> None:
+        self._data[(filters, q)] = (time.monotonic(), limit, list(rows))
+        self._data.move_to_end((filters, q))
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+suggest_cache = SuggestCache()
+
+__all__ = ["Suggestion", "SuggestCache", "suggest_cache", "normalize", "is_id_query", "similarity"]
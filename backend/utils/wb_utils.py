@@ -1,8 +1,26 @@
+import re
 from datetime import datetime, timezone
 from parser.WbModels import SellerStats
 from typing import List, Optional, Dict, Any
-import json
-from pathlib import Path
+
+def region_code(ogrn: Optional[str], ogrnip: Optional[str], inn: Optional[str] = None) -> Optional[str]:
+    """
+    Код региона продавца: 4–5 цифры ОГРН, иначе ОГРНИП, иначе первые две ИНН.
+    Так же считается колонка region_code в sellers / seller_contacts_cache.
+    """
+    if ogrn and len(ogrn) >= 5:
+        return ogrn[3:5]
+    if ogrnip and len(ogrnip) >= 5:
+        return ogrnip[3:5]
+    if inn and len(inn) >= 2:
+        return inn[:2]
+    return None
+
+def parse_regions(raw: Optional[str]) -> List[str]:
+    """'77,50;16' → ['77', '50', '16']"""
+    if not raw:
+        return []
+    return [c for c in re.split(r"[,;\s]+", raw) if c]
 
 async def check_region(seller_list, regions: List[str]) -> List:
     """
@@ -10,12 +28,7 @@ async def check_region(seller_list, regions: List[str]) -> List:
     """
     result = []
     for x in seller_list:
-        code = None
-        if x.ogrn and len(x.ogrn) >= 5:
-            code = x.ogrn[3:5]
-        elif x.ogrnip and len(x.ogrnip) >= 5:
-            code = x.ogrnip[3:5]
-
+        code = region_code(x.ogrn, x.ogrnip)
         if code and code in regions:
             result.append(x)
     return result
@@ -48,29 +61,3 @@ def ok_date(s: SellerStats, min_dt: datetime, max_dt: datetime) -> bool:
     if max_dt and rd > max_dt:
         return False
     return True
-
-
-def _load_categories() -> List[Dict[str, Any]]:
-    path = Path(__file__).parent / "../categories.json"
-    return json.loads(path.read_text(encoding="utf-8"))
-
-def _collect_subcategories(main_id: int) -> List[Dict[str, Any]]:
-    cats = _load_categories()
-    leaves: List[Dict[str, Any]] = []
-
-    def _recurse(node: Dict[str, Any]):
-        children = node.get("childs") or []
-        if not children:
-            leaves.append(node)
-        else:
-            for child in children:
-                _recurse(child)
-
-    for cat in cats:
-        if cat.get("id") == main_id:
-            for child in cat.get("childs") or []:
-                _recurse(child)
-            break
-
-    return leaves
-
@@ -0,0 +1,154 @@
+"""
+Воркер очереди фоновых задач (services.job_queue).
+
+Запуск из backend/:
+    python worker.py                         # все виды задач
+    python worker.py --kinds parse --concurrency 1
+
+Процессов можно поднять сколько угодно (docker compose up --scale worker=N):
+общий лимит одновременных задач каждого вида держит сама очередь
+(settings.JOB_KIND_LIMITS), --concurrency — потолок на процесс.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+from typing import Dict, List
+
+import redis.asyncio as aioredis
+
+from config import settings
+from database import async_engine
+from parser.client_registry import HttpClientRegistry
+from parser.cpu_pool import parse_pool
+from proxy.scheduler import scheduler
+from services.job_queue import Job, JobQueue
+from services.jobs import HANDLERS
+from utils.category_index import category_index
+
+logger = logging.getLogger("worker")
+
+POLL_INTERVAL = 1.0
+REAP_INTERVAL = 5.0
+
+
+class Worker:
+    def __init__(self, queue: JobQueue, redis, http: HttpClientRegistry, kinds: List[str], concurrency: int) -> None:
+        """`redis` — бинарный клиент для обработчиков (services.job_progress)."""
+        self._queue = queue
+        self._redis = redis
+        self._http = http
+        self._kinds = kinds
+        self._concurrency = concurrency
+        self._running: Dict[asyncio.Task, Job] = {}
+        self._stop = asyncio.Event()
+        self._next = 0      # вид, с которого начнём следующий опрос (по кругу)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    async def run(self) -> None:
+        logger.info("Worker started: kinds=%s concurrency=%s", self._kinds, self._concurrency)
+        loop = asyncio.get_running_loop()
+        last_reap = 0.0
+        while not self._stop.is_set():
+            if loop.time() - last_reap >= REAP_INTERVAL:
+                await self._queue.reap(self._kinds)
+                last_reap = loop.time()
+
+            job = await self._reserve() if len(self._running) < self._concurrency else None
+            if job is not None:
+                task = asyncio.create_task(self._execute(job))
+                self._running[task] = job
+                task.add_done_callback(self._running.pop)
+                continue
+
+            try:
+                await asyncio.wait_for(self._stop.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+        # останов: незавершённые задачи — обратно в очередь, попытка не тратится
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+        logger.info("Worker stopped")
+
+    async def _reserve(self) -> Job | None:
+        for i in range(len(self._kinds)):
+            kind = self._kinds[(self._next + i) % len(self._kinds)]
+            job = await self._queue.reserve(kind)
+            if job is not None:
+                self._next = (self._next + i + 1) % len(self._kinds)
+                return job
+        return None
+
+    async def _heartbeat(self, job: Job, owner: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self._queue.visibility_timeout / 3)
+            if not await self._queue.heartbeat(job):
+                # аренда истекла и задача уже отдана другому воркеру
+                logger.warning("Lost lease on %s job %s, abandoning", job.kind, job.id)
+                owner.cancel()
+                return
+
+    async def _execute(self, job: Job) -> None:
+        logger.info("Start %s job %s (attempt %s)", job.kind, job.id, job.attempts)
+        hb = asyncio.create_task(self._heartbeat(job, asyncio.current_task()))
+        try:
+            await HANDLERS[job.kind](job.id, self._redis, self._http, **job.payload)
+        except asyncio.CancelledError:
+            await self._queue.release(job)
+            raise
+        except Exception as e:
+            logger.exception("%s job %s failed", job.kind, job.id)
+            await self._queue.fail(job, str(e))
+        else:
+            if not await self._queue.ack(job.kind, job.id):
+                logger.warning("%s job %s finished after its lease expired", job.kind, job.id)
+            logger.info("Done %s job %s", job.kind, job.id)
+        finally:
+            hb.cancel()
+
+
+async def main(kinds: List[str], concurrency: int) -> None:
+    url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    redis = aioredis.from_url(url, decode_responses=True)
+    redis_bin = aioredis.from_url(url)
+    http = await HttpClientRegistry().start()
+    await scheduler.refresh()
+    category_index.load()
+
+    worker = Worker(JobQueue(redis), redis_bin, http, kinds, concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await http.close()
+        parse_pool.shutdown()
+        await redis.close()
+        await redis_bin.close()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Воркер фоновых задач")
+    ap.add_argument("--kinds", default=",".join(HANDLERS), help="Виды задач через запятую")
+    ap.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY)
+    args = ap.parse_args()
+
+    kinds = [k for k in args.kinds.split(",") if k]
+    unknown = set(kinds) - set(HANDLERS)
+    if unknown:
+        ap.error(f"unknown job kinds: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="worker-%(process)d | %(levelname)s:%(name)s:%(message)s",
+    )
+    asyncio.run(main(kinds, args.concurrency))